@@ -0,0 +1,221 @@
+import numpy as np
+import pandas as pd
+from datetime import date, timedelta
+
+
+PERIODS = ["All Time", "Last 30 Days", "Last 3 Months", "Last 6 Months", "Last Year", "Custom"]
+PERIOD_DAYS = {"Last 30 Days": 30, "Last 3 Months": 90, "Last 6 Months": 180, "Last Year": 365}
+MATCH_TYPES = ["All", "Singles", "Doubles"]
+
+
+def period_start(period="All Time", date_range=None, today=None):
+    """First day a Dashboard period covers (None for All Time)"""
+    if period == "Custom" and date_range:
+        return date_range[0]
+    if PERIOD_DAYS.get(period):
+        return (today or date.today()) - timedelta(days=PERIOD_DAYS[period])
+    return None
+
+
+def filter_matches(df, period="All Time", match_type="All", date_range=None, today=None):
+    """Apply the Dashboard's time-period and match-type filters"""
+    if df.empty:
+        return df
+    dates = df["match_date"].dt.date
+    start = period_start(period, date_range, today)
+    if period == "Custom" and date_range:
+        df = df[(dates >= start) & (dates <= date_range[1])]
+    elif start is not None:
+        df = df[dates >= start]
+    if match_type != "All":
+        df = df[df["match_type"] == match_type.lower()]
+    return df
+
+
+def add_results(df):
+    """Win/loss column used by every aggregation"""
+    won = df["won"] if "won" in df.columns else df["user_team_score"] > df["opponent_team_score"]
+    return df.assign(result=np.where(won, "Win", "Loss"))
+
+
+# Frames can mix matches with archive rollup rows (see archive.MatchArchive),
+# which stand for `weight` matches each and carry point totals as scores. The
+# aggregations sum weights instead of counting rows; without the column every
+# row is one match.
+
+def _weights(df):
+    return df["weight"] if "weight" in df.columns else pd.Series(1, index=df.index)
+
+
+def summary(df):
+    weights = _weights(df)
+    total = int(weights.sum())
+    wins = int(weights[df["result"] == "Win"].sum())
+    return {
+        "total": total,
+        "wins": wins,
+        "losses": total - wins,
+        "win_rate": wins / total * 100 if total else 0.0,
+    }
+
+
+def match_counts(df, key):
+    """{value: number of matches} for one column"""
+    return df.assign(weight=_weights(df)).groupby(key)["weight"].sum().to_dict()
+
+
+def _months(df):
+    return df["match_date"].dt.to_period("M").dt.to_timestamp()
+
+
+def monthly_results(df):
+    """Wins and losses per month, one row per month"""
+    monthly_res = (
+        df
+        .assign(month=_months(df), weight=_weights(df))
+        .groupby(["month", "result"])["weight"]
+        .sum()
+        .unstack(fill_value=0)
+        .reindex(columns=["Win", "Loss"], fill_value=0)
+        .reset_index()
+    )
+    monthly_res["month_label"] = monthly_res["month"].dt.strftime("%B %Y")
+    return monthly_res
+
+
+def monthly_totals(df):
+    """Matches played per month"""
+    monthly = (
+        df
+        .assign(month=_months(df), weight=_weights(df))
+        .groupby("month")["weight"]
+        .sum()
+        .reset_index(name="matches")
+    )
+    monthly["month_label"] = monthly["month"].dt.strftime("%B %Y")
+    return monthly
+
+
+def average_points(df):
+    """Average points for/against per match type, in long form for plotting"""
+    totals = (
+        df
+        .assign(weight=_weights(df))
+        .groupby("match_type")[["user_team_score", "opponent_team_score", "weight"]]
+        .sum()
+    )
+    avg_scores = pd.DataFrame({
+        "Your_Score":     totals["user_team_score"] / totals["weight"],
+        "Opponent_Score": totals["opponent_team_score"] / totals["weight"],
+    }).reset_index()
+    return avg_scores.melt(
+        id_vars="match_type",
+        value_vars=["Your_Score", "Opponent_Score"],
+        var_name="Team",
+        value_name="Average Points"
+    )
+
+
+def _win_rate_by(df, key):
+    wins = df["result"] == "Win"
+    weights = _weights(df)
+    table = (
+        df
+        .assign(_win=weights.where(wins, 0), _loss=weights.where(~wins, 0), _total=weights)
+        .groupby(key)
+        .agg(
+            Wins   = ("_win", "sum"),
+            Losses = ("_loss", "sum"),
+            Total  = ("_total", "sum")
+        )
+        .reset_index()
+    )
+    table["Win Rate"] = (table["Wins"] / table["Total"] * 100).round(1)
+    return table.sort_values(key)
+
+
+def singles_by_level(df):
+    """Singles win rate per opponent level"""
+    return _win_rate_by(df[df["match_type"] == "singles"], "opponent_1_level")
+
+
+def doubles_by_level(df):
+    """Doubles win rate per average opponent team level"""
+    df_d = df[df["match_type"] == "doubles"]
+    df_d = df_d.assign(**{"Opponent Team Level": ((df_d["opponent_1_level"] + df_d["opponent_2_level"]) / 2).round(2)})
+    return _win_rate_by(df_d, "Opponent Team Level")
+
+
+def monthly_expected(df_exp):
+    """Expected (model) vs. actual wins per month"""
+    monthly_exp = (
+        df_exp
+        .assign(month=_months(df_exp),
+                expected=df_exp["expected"] * _weights(df_exp),
+                actual=_weights(df_exp).where(df_exp["result"] == "Win", 0))
+        .groupby("month")[["expected", "actual"]]
+        .sum()
+        .reset_index()
+    )
+    monthly_exp["month_label"] = monthly_exp["month"].dt.strftime("%B %Y")
+    return monthly_exp
+
+
+def upset_wins(df_exp, threshold):
+    """
+    Wins the model gave less than `threshold` probability, formatted for
+    display. Archive rollup rows aren't single matches, so they're left out.
+    """
+    single = df_exp["id"].notna() if "id" in df_exp.columns else True
+    upsets = df_exp[(df_exp["result"] == "Win") & (df_exp["expected"] < threshold) & single]
+    table = upsets.assign(
+        Date=upsets["match_date"].dt.strftime("%m/%d/%Y"),
+        Type=upsets["match_type"].str.title(),
+        Opponents=upsets["opponent_1"].str.cat(upsets["opponent_2"], sep=" & ", na_rep="").str.rstrip(" &"),
+        Score=upsets["user_team_score"].astype(str) + "-" + upsets["opponent_team_score"].astype(str),
+        **{"Win Probability": (upsets["expected"] * 100).round(1)}
+    )
+    return table[["Date", "Type", "Opponents", "Score", "Win Probability"]]
+
+
+def expectancy(df, model, threshold):
+    """Score every match with the win model; expected vs. actual wins and upsets"""
+    if model.user_level is None:
+        return {"has_level": False}
+    # Score every match in one vectorized call
+    df_exp = df.assign(expected=model.score(df)).dropna(subset=["expected"])
+    if df_exp.empty:
+        return {"has_level": True, "empty": True}
+    weights = _weights(df_exp)
+    wins = df_exp["result"] == "Win"
+    upsets = upset_wins(df_exp, threshold)
+    return {
+        "has_level": True,
+        "empty": False,
+        "is_global": model.is_global,
+        "expected_wins": float((df_exp["expected"] * weights).sum()),
+        "actual_wins": int(weights[wins].sum()),
+        "upsets": upsets,
+        # Upsets among archived matches: counted, but not listed (see upset_wins)
+        "archived_upsets": int(weights[wins & (df_exp["expected"] < threshold)].sum()) - len(upsets),
+        "monthly_exp": monthly_expected(df_exp),
+    }
+
+
+def dashboard(df, model, threshold):
+    """
+    Every Dashboard aggregation for an already filtered frame, for headless
+    callers (batch reports, the API). `df` needs the result column.
+    """
+    if df.empty:
+        return {"summary": None}
+    data = {
+        "summary": summary(df),
+        "monthly_res": monthly_results(df),
+        "monthly_totals": monthly_totals(df),
+        "avg_long": average_points(df),
+        "singles_level": singles_by_level(df),
+        "doubles_level": doubles_by_level(df),
+        "expectancy": expectancy(df, model, threshold),
+    }
+    return data
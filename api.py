@@ -0,0 +1,396 @@
+"""
+JSON API for SmashTrack data (for the mobile app and other non-Streamlit clients).
+
+Built on the same data layer as the Streamlit pages (utils.py, analytics.py),
+served with tornado, which Streamlit already depends on.
+
+    GET  /api/v1/matches?limit=50&offset=0&type=singles   paginated match history
+    POST /api/v1/matches                                  add a match (202, written behind)
+    GET  /api/v1/dashboard?period=Last+30+Days&type=All   Dashboard aggregates
+    GET  /api/v1/levels                                   level history
+    GET  /api/v1/health
+
+Requests authenticate with `Authorization: Bearer <Supabase access token>`.
+Every GET response carries an ETag; clients that send it back in
+If-None-Match get a 304 with no body until the user's data changes. Response
+bodies are cached per (user, data version, URL), so a 304 - and most 200s -
+are answered without rebuilding anything.
+
+    python api.py --port 8600 [--url local://.local_db]
+
+The server uses the key from --key/SUPABASE_KEY/secrets.toml for every query
+(queries are always scoped to the authenticated user's id), so give it the
+service-role key when running against Supabase.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+import tornado.web
+from tornado.ioloop import IOLoop
+
+import analytics
+import supabase_client
+import utils
+from win_model import UPSET_THRESHOLD, as_level
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+LEVELS = [2.0, 2.5, 3.0, 3.5, 4.0, 4.5, 5.0, 5.5]
+TOKEN_TTL = 60          # seconds a verified access token is trusted before re-checking
+CACHE_TTL = 300         # same lifetime as the data layer's caches
+
+# Fields a match comes back with
+MATCH_FIELDS = [
+    "id", "match_date", "match_type",
+    "opponent_1", "opponent_1_id", "opponent_1_level",
+    "opponent_2", "opponent_2_id", "opponent_2_level",
+    "player_partner", "player_partner_id", "player_partner_level",
+    "user_team_score", "opponent_team_score", "client_key",
+]
+
+
+class ApiError(tornado.web.HTTPError):
+    """A client-facing error; the message is returned as {"error": message}"""
+
+    def __init__(self, status, message):
+        super().__init__(status, reason=message)
+        self.message = message
+
+
+class ResponseCache:
+    """LRU of rendered GET responses: key -> (etag, body, stored_at)"""
+
+    def __init__(self, max_entries=2048, ttl=CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[2] > self.ttl:
+                return None
+            self._entries.move_to_end(key)
+            return entry[:2]
+
+    def put(self, key, etag, body):
+        with self._lock:
+            self._entries[key] = (etag, body, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class TokenCache:
+    """Verified access tokens: token -> (user_id, verified_at), oldest first"""
+
+    def __init__(self, max_entries=4096, ttl=TOKEN_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token):
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            if time.monotonic() - entry[1] >= self.ttl:
+                del self._entries[token]
+                return None
+            return entry[0]
+
+    def put(self, token, user_id):
+        with self._lock:
+            now = time.monotonic()
+            self._entries[token] = (user_id, now)
+            self._entries.move_to_end(token)
+            # Entries are in verification order, so expired ones are at the front
+            while self._entries:
+                oldest = next(iter(self._entries.values()))
+                if len(self._entries) <= self.max_entries and now - oldest[1] < self.ttl:
+                    break
+                self._entries.popitem(last=False)
+
+
+RESPONSES = ResponseCache()
+TOKENS = TokenCache()
+
+
+def authenticate(token):
+    """User id for a Supabase access token (verified at most once per TOKEN_TTL)"""
+    user_id = TOKENS.get(token)
+    if user_id is not None:
+        return user_id
+    try:
+        user = utils.get_supabase().auth.get_user(token).user
+    except Exception:
+        user = None
+    if user is None:
+        raise ApiError(401, "Invalid or expired access token")
+    TOKENS.put(token, user.id)
+    return user.id
+
+
+def render(payload):
+    """Serialize a response body and its ETag"""
+    body = json.dumps(payload, default=str, separators=(",", ":")).encode()
+    return f'"{hashlib.sha1(body).hexdigest()[:20]}"', body
+
+
+def _records(df, columns=None):
+    if columns is not None:
+        df = df[[c for c in columns if c in df.columns]]
+    return json.loads(df.to_json(orient="records", date_format="iso"))
+
+
+# ─── Resources ─────────────────────────────────────────────────────────────────
+# Each builder returns a JSON-able payload for one user; they run on a worker
+# thread because the data layer makes blocking Supabase calls.
+
+def list_matches(user_id, args):
+    limit = _int_arg(args, "limit", DEFAULT_PAGE_SIZE, 1, MAX_PAGE_SIZE)
+    offset = _int_arg(args, "offset", 0, 0, None)
+    df = utils.getMatches_safe(user_id)
+    match_type = args.get("type")
+    if match_type:
+        if match_type not in ("singles", "doubles"):
+            raise ApiError(400, "type must be singles or doubles")
+        df = df[df["match_type"] == match_type] if not df.empty else df
+    page = df.iloc[offset:offset + limit]
+    if not page.empty:
+        page = page.assign(match_date=page["match_date"].dt.strftime("%Y-%m-%d"))
+    total = len(df)
+    return {
+        "items": _records(page, MATCH_FIELDS) if not page.empty else [],
+        "total": total,
+        "limit": limit,
+        "offset": offset,
+        "next_offset": offset + limit if offset + limit < total else None,
+    }
+
+
+def dashboard(user_id, args):
+    period = args.get("period", "All Time")
+    match_type = args.get("type", "All")
+    if period not in analytics.PERIODS or period == "Custom":
+        raise ApiError(400, f"period must be one of {[p for p in analytics.PERIODS if p != 'Custom']}")
+    if match_type not in analytics.MATCH_TYPES:
+        raise ApiError(400, f"type must be one of {analytics.MATCH_TYPES}")
+    df = utils.get_dashboard_matches(user_id, period, match_type, None, date.today())
+    data = analytics.dashboard(df, utils.get_win_model(user_id), UPSET_THRESHOLD)
+    payload = {
+        "period": period,
+        "type": match_type,
+        "level": as_level(utils.getCurrentLevel_safe(user_id)),
+        "summary": data.pop("summary"),
+    }
+    exp = data.pop("expectancy", None)
+    if exp is not None:
+        if exp["has_level"] and not exp["empty"]:
+            data["monthly_expected"] = exp.pop("monthly_exp")
+            data["upsets"] = exp.pop("upsets")
+        payload["expectancy"] = exp
+    payload.update({name: _records(frame) for name, frame in data.items()})
+    return payload
+
+
+def level_history(user_id, args):
+    df = utils.get_level_history(user_id)
+    if df.empty:
+        return {"items": []}
+    df = df.assign(effective_date=df["effective_date"].dt.strftime("%Y-%m-%d"))
+    return {"items": _records(df)}
+
+
+def add_match(user_id, body, client_key):
+    """Validate like the Match Log forms, then queue the insert"""
+    match_type = body.get("match_type")
+    if match_type not in ("singles", "doubles"):
+        raise ApiError(400, "match_type must be singles or doubles")
+    try:
+        match_date = date.fromisoformat(str(body.get("match_date", date.today().isoformat())))
+        user_score = int(body["user_score"])
+        opponent_score = int(body["opponent_score"])
+    except (KeyError, TypeError, ValueError):
+        raise ApiError(400, "match_date (YYYY-MM-DD), user_score and opponent_score are required")
+    if match_date > date.today():
+        raise ApiError(400, "match_date cannot be in the future")
+    if user_score < 0 or opponent_score < 0 or user_score == opponent_score:
+        raise ApiError(400, "Scores must be 0 or more and cannot be tied")
+
+    players = ["opponent"] if match_type == "singles" else ["partner", "opponent_1", "opponent_2"]
+    for field in players:
+        name = body.get(field)
+        if not isinstance(name, str) or not re.fullmatch(r"[A-Za-z ]+", name.strip()):
+            raise ApiError(400, f"{field} is required and must contain only letters and spaces")
+        if body.get(f"{field}_level") not in LEVELS:
+            raise ApiError(400, f"{field}_level must be one of {LEVELS}")
+
+    if match_type == "singles":
+        rows = utils.addSinglesMatch(
+            user_id, match_date, body["opponent"].strip(), body["opponent_level"],
+            user_score, opponent_score, client_key=client_key
+        )
+    else:
+        names = [body[f].strip() for f in players]
+        if len({n.lower() for n in names}) < 3:
+            raise ApiError(400, "partner and opponents must be different players")
+        rows = utils.addDoublesMatch(
+            user_id, match_date,
+            names[0], body["partner_level"],
+            names[1], body["opponent_1_level"],
+            names[2], body["opponent_2_level"],
+            user_score, opponent_score, client_key=client_key
+        )
+    if not rows:
+        raise ApiError(502, "Couldn't save the match")
+    return {"match": rows[0], "status": "pending"}
+
+
+def _int_arg(args, name, default, low, high):
+    try:
+        value = int(args.get(name, default))
+    except ValueError:
+        raise ApiError(400, f"{name} must be an integer")
+    if value < low or (high is not None and value > high):
+        raise ApiError(400, f"{name} must be between {low} and {high}" if high else f"{name} must be >= {low}")
+    return value
+
+
+# ─── Handlers ──────────────────────────────────────────────────────────────────
+
+class BaseHandler(tornado.web.RequestHandler):
+    executor = None     # set by make_app
+
+    def set_default_headers(self):
+        self.set_header("Content-Type", "application/json")
+
+    def compute_etag(self):
+        return None     # ETags are set explicitly from the response cache
+
+    def write_error(self, status_code, **kwargs):
+        self.finish({"error": self._reason})
+
+    def run(self, fn, *args):
+        return IOLoop.current().run_in_executor(self.executor, fn, *args)
+
+    def user_id(self):
+        header = self.request.headers.get("Authorization", "")
+        if not header.startswith("Bearer "):
+            raise ApiError(401, "Missing bearer token")
+        return authenticate(header[len("Bearer "):].strip())
+
+    def send_cached(self, etag, body):
+        """200 with the body, or 304 if the client already has this version"""
+        self.set_header("ETag", etag)
+        self.set_header("Cache-Control", "private, no-cache")
+        if self.check_etag_header():
+            self.set_status(304)
+            return self.finish()
+        self.finish(body)
+
+
+class CachedResource(BaseHandler):
+    """GET handler for one resource builder, with ETags and response caching"""
+
+    def initialize(self, build):
+        self.build = build
+
+    def _respond(self, token_user, args):
+        # Touch the match store first so an expired frame is refetched (and
+        # gets a new fetch time) before the cache key is computed
+        utils.getMatches_safe(token_user)
+        key = (
+            token_user,
+            utils.get_data_version(token_user),
+            utils.get_match_store().fetched_at(token_user),
+            self.build.__name__,
+            tuple(sorted(args.items())),
+        )
+        cached = RESPONSES.get(key)
+        if cached is None:
+            cached = render(self.build(token_user, args))
+            RESPONSES.put(key, *cached)
+        return cached
+
+    async def get(self):
+        user_id = await self.run(self.user_id)
+        args = {k: self.get_query_argument(k) for k in self.request.query_arguments}
+        etag, body = await self.run(self._respond, user_id, args)
+        self.send_cached(etag, body)
+
+
+class MatchesHandler(CachedResource):
+    async def post(self):
+        user_id = await self.run(self.user_id)
+        try:
+            body = json.loads(self.request.body or b"{}")
+        except ValueError:
+            raise ApiError(400, "Body must be JSON")
+        client_key = self.request.headers.get("Idempotency-Key")
+        if client_key:
+            try:
+                client_key = str(uuid.UUID(client_key))
+            except ValueError:
+                raise ApiError(400, "Idempotency-Key must be a UUID")
+        else:
+            client_key = str(uuid.uuid4())
+        result = await self.run(add_match, user_id, body, client_key)
+        self.set_status(202)
+        self.finish(render(result)[1])
+
+
+class HealthHandler(BaseHandler):
+    def get(self):
+        self.finish({"ok": True, "pending_writes": len(utils.get_write_queue())})
+
+
+def make_app(workers=8):
+    BaseHandler.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api")
+    return tornado.web.Application([
+        (r"/api/v1/matches", MatchesHandler, {"build": list_matches}),
+        (r"/api/v1/dashboard", CachedResource, {"build": dashboard}),
+        (r"/api/v1/levels", CachedResource, {"build": level_history}),
+        (r"/api/v1/health", HealthHandler),
+    ])
+
+
+async def serve(port, workers):
+    make_app(workers).listen(port)
+    print(f"SmashTrack API on http://localhost:{port}/api/v1")
+    await asyncio.Event().wait()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="SmashTrack JSON API")
+    parser.add_argument("--port", type=int, default=8600)
+    parser.add_argument("--workers", type=int, default=8, help="threads for data-layer calls")
+    parser.add_argument("--url", help="Supabase URL, or local://<dir> for the local stand-in")
+    parser.add_argument("--key", help="Supabase service-role key")
+    args = parser.parse_args(argv)
+
+    from streamlit import config
+    from streamlit.logger import set_log_level
+    config.set_option("logger.level", "error")   # the data layer's caches warn outside `streamlit run`
+    set_log_level("error")
+
+    url, key = supabase_client.headless_settings(args.url, args.key)
+    if not url:
+        raise SystemExit("No Supabase URL: pass --url, set SUPABASE_URL, or add .streamlit/secrets.toml")
+    supabase_client.use_client(supabase_client.connect(url, key))
+    asyncio.run(serve(args.port, args.workers))
+
+
+if __name__ == "__main__":
+    main()
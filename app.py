@@ -5,11 +5,17 @@ st.set_page_config(
     initial_sidebar_state="auto",
 )
 
-from auth_utils import sign_out, auth_screen
-from utils import register_nav_pages, clear_user_cache
+import metrics
+from auth_utils import sign_out, auth_screen, clear_user_cache
+
+metrics.start_server()
 
 
 def main_app(user_email: str):
+    # The data layer (pandas, supabase, ...) is only imported once someone is logged in
+    from utils import register_nav_pages, SupabaseUnavailable, UNAVAILABLE_MESSAGE
+    from assets import logo_bytes
+
     # Add user email to sidebar for debugging/confirmation
     st.sidebar.text(f"Logged in as: {user_email}")
     st.sidebar.button("Sign Out", on_click=sign_out)
@@ -19,15 +25,22 @@ def main_app(user_email: str):
         {"page": "views/01_Profile.py",   "title": "Your Profile",     "icon": ":material/account_circle:"},
         {"page": "views/02_Match_Log.py",   "title": "Match History",      "icon": ":material/list_alt:"},
         {"page": "views/03_Dashboard.py",   "title": "Your Dashboard",     "icon": ":material/analytics:"},
+        {"page": "views/04_Leaderboard.py", "title": "Club Leaderboard",   "icon": ":material/leaderboard:"},
+        {"page": "views/05_Matchmaking.py", "title": "Matchmaking",        "icon": ":material/groups:"},
     ]
     
     pages = register_nav_pages(PAGE_DEFS)
     pg = st.navigation(pages=pages)
 
-    st.logo("assets/logo.png", size="large")
+    st.logo(logo_bytes(), size="large")
     st.sidebar.text("Made by Bao Le")
 
-    pg.run()
+    with metrics.PAGE_SECONDS.time(page=pg.title):
+        try:
+            pg.run()
+        except SupabaseUnavailable:
+            # Only reached when there's no cached copy of the data to fall back on
+            st.error(UNAVAILABLE_MESSAGE)
 
 
 # entrypoint
@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+
+# What archived matches are counted by (see migrations/004 and 005)
+ROLLUP_KEY = ["month", "match_type", "user_level", "partner_level", "opponent_level", "won"]
+ROLLUP_COLUMNS = ROLLUP_KEY + ["matches", "points_for", "points_against"]
+
+
+def rollup(df):
+    """
+    Roll a frame of matches up the way archive_user_matches does (for tests);
+    the user's level at each match comes from a `user_level` column
+    """
+    if df.empty:
+        return pd.DataFrame(columns=ROLLUP_COLUMNS)
+    doubles = df["match_type"] == "doubles"
+    levels = lambda col: pd.to_numeric(df[col], errors="coerce") if col in df.columns else np.nan
+    keyed = df.assign(
+        month=df["match_date"].dt.to_period("M").dt.to_timestamp(),
+        user_level=levels("user_level"),
+        partner_level=levels("player_partner_level"),
+        opponent_level=np.where(doubles, (levels("opponent_1_level") + levels("opponent_2_level")) / 2,
+                                levels("opponent_1_level")),
+        won=df["user_team_score"] > df["opponent_team_score"],
+    )
+    return (
+        keyed
+        .groupby(ROLLUP_KEY, dropna=False)
+        .agg(matches=("user_team_score", "size"),
+             points_for=("user_team_score", "sum"),
+             points_against=("opponent_team_score", "sum"))
+        .reset_index()
+    )
+
+
+def weighted(df):
+    """
+    Matches with the two columns the analytics use to mix in rollups: `weight`
+    (matches per row, 1 here) and `won`.
+    """
+    if df.empty:
+        return df
+    return df.assign(weight=1, won=(df["user_team_score"] > df["opponent_team_score"]).to_numpy())
+
+
+class MatchArchive:
+    """
+    What a player has archived: every match before `before` is in
+    matches_archive and counted in the rollups.
+
+    rows() turns the rollups into match-shaped rows that stand in for the
+    archived matches: one per rollup, at the start of its month, with the
+    point totals as scores, the match count as `weight` and the user's level
+    when they were played as `user_level` (see win_model). Aggregations that
+    sum weights instead of counting rows (see analytics) give the same
+    numbers over these as over the archived matches themselves.
+    """
+
+    def __init__(self, before=None, rollups=None):
+        self.before = before
+        self.rollups = rollups if rollups is not None else pd.DataFrame(columns=ROLLUP_COLUMNS)
+
+    @property
+    def matches(self):
+        return int(self.rollups["matches"].sum())
+
+    @property
+    def first_month(self):
+        return None if self.rollups.empty else pd.Timestamp(self.rollups["month"].min()).date()
+
+    def covers(self, start):
+        """Whether a window starting at `start` (None: all time) reaches archived matches"""
+        return self.before is not None and not self.rollups.empty and (start is None or start < self.before)
+
+    def rows(self):
+        r = self.rollups
+        doubles = (r["match_type"] == "doubles").to_numpy()
+        opponent_level = r["opponent_level"].astype(float).to_numpy()
+        return pd.DataFrame({
+            "id": np.nan,
+            "match_date": pd.to_datetime(r["month"]).to_numpy(),
+            "match_type": r["match_type"].to_numpy(),
+            "user_level": r["user_level"].astype(float).to_numpy(),
+            "player_partner_level": r["partner_level"].astype(float).to_numpy(),
+            "opponent_1_level": opponent_level,
+            "opponent_2_level": np.where(doubles, opponent_level, np.nan),
+            "user_team_score": r["points_for"].astype(int).to_numpy(),
+            "opponent_team_score": r["points_against"].astype(int).to_numpy(),
+            "weight": r["matches"].astype(int).to_numpy(),
+            "won": r["won"].astype(bool).to_numpy(),
+        })
+
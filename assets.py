@@ -0,0 +1,97 @@
+"""
+Static asset pipeline.
+
+The source images in assets/ are much larger than they're ever displayed
+(logo.png is a 1.4 MB 1024px PNG shown at 32-100px). Right-sized, optimized
+variants are written to static/ once - at startup, or ahead of time with
+`python assets.py` - and served by Streamlit's static file server. URLs carry
+a content hash (`?v=...`), which makes the server send long-lived cache
+headers, so browsers download each image once instead of on every rerun.
+"""
+import hashlib
+import io
+import os
+
+import streamlit as st
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+ASSETS_DIR = os.path.join(ROOT, "assets")
+STATIC_DIR = os.path.join(ROOT, "static")
+STATIC_URL = "app/static"
+
+# name -> (source file, width in px). Widths are 2x the display size for high-DPI screens.
+VARIANTS = {
+    "logo": ("logo.png", 96),            # st.logo(size="large") is 32px tall
+    "logo_header": ("logo.png", 200),    # About page header, shown at 100px
+    "tournament": ("tournament.png", 200),
+    "dashboard": ("dashboard.png", 200),
+    "user": ("user.png", 200),
+}
+
+
+def _encode_variant(source, width):
+    from PIL import Image  # only needed when a variant is (re)built
+
+    with Image.open(source) as im:
+        if im.width > width:
+            height = round(im.height * width / im.width)
+            im = im.resize((width, height), Image.LANCZOS)
+        buf = io.BytesIO()
+        im.save(buf, format="PNG", optimize=True)
+    return buf.getvalue()
+
+
+def build_static_files():
+    """
+    Write every variant to static/ (skipping ones newer than their source) and
+    return {name: png bytes}.
+    """
+    os.makedirs(STATIC_DIR, exist_ok=True)
+    built = {}
+    for name, (filename, width) in VARIANTS.items():
+        source = os.path.join(ASSETS_DIR, filename)
+        target = os.path.join(STATIC_DIR, f"{name}.png")
+        if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(source):
+            with open(target, "rb") as f:
+                built[name] = f.read()
+            continue
+        data = _encode_variant(source, width)
+        with open(target, "wb") as f:
+            f.write(data)
+        built[name] = data
+    return built
+
+
+@st.cache_resource
+def get_assets():
+    """{name: {"bytes", "url"}} for every variant, built once per process"""
+    return {
+        name: {
+            "bytes": data,
+            "url": f"{STATIC_URL}/{name}.png?v={hashlib.sha1(data).hexdigest()[:12]}",
+        }
+        for name, data in build_static_files().items()
+    }
+
+
+def show_image(name, width):
+    """
+    Render an asset by static URL, so the browser fetches (and caches) it itself
+    and no image bytes go over the websocket. Falls back to the in-memory
+    variant when static serving is turned off.
+    """
+    asset = get_assets()[name]
+    if st.get_option("server.enableStaticServing"):
+        st.markdown(f'<img src="{asset["url"]}" width="{width}">', unsafe_allow_html=True)
+    else:
+        st.image(asset["bytes"], width=width)
+
+
+def logo_bytes():
+    """Sidebar logo variant (st.logo only accepts absolute URLs, so it gets the bytes)"""
+    return get_assets()["logo"]["bytes"]
+
+
+if __name__ == "__main__":
+    for name, data in build_static_files().items():
+        print(f"static/{name}.png  {len(data) / 1024:.1f} KB")
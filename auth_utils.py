@@ -1,24 +1,50 @@
-from utils import get_supabase, clear_user_cache
 import streamlit as st
 import re
-from streamlit_cookies_manager import EncryptedCookieManager
+import sys
+from supabase_client import get_supabase
+from resilience import SupabaseUnavailable
+from metrics import AUTH_EVENTS
+
+# Nothing heavy is imported here: the login screen only needs Streamlit.
+# pandas/plotly/postgrest come in with `utils` once a page needs them, and the
+# Supabase client is created the first time an auth call is made.
 
 # ─── Cookie Manager Setup ──────────────────────────────────────────────────────
 
-cookies = EncryptedCookieManager(
-    prefix="pickleball_",
-    password=st.secrets["cookies"]["password"]
-)
-if not cookies.ready():
-    st.stop()
+def get_cookies():
+    """
+    This session's cookie manager, created on first use. The cookie component
+    needs one round trip to the browser before it's ready, so the first call
+    stops the run and the component's reply triggers the rerun.
+    """
+    cookies = st.session_state.get("cookie_manager")
+    if cookies is None or not cookies.ready():
+        from streamlit_cookies_manager import EncryptedCookieManager
+
+        cookies = EncryptedCookieManager(
+            prefix="pickleball_",
+            password=st.secrets["cookies"]["password"]
+        )
+        st.session_state["cookie_manager"] = cookies
+        if not cookies.ready():
+            st.stop()
+    return cookies
+
+def clear_user_cache():
+    """Clear cached user data - nothing to clear if no page has loaded the data layer yet"""
+    utils = sys.modules.get("utils")
+    if utils is not None:
+        utils.clear_user_cache()
 
 def save_session_to_cookie(session):
     if session and hasattr(session, "access_token") and hasattr(session, "refresh_token"):
+        cookies = get_cookies()
         cookies["access_token"] = session.access_token
         cookies["refresh_token"] = session.refresh_token
         cookies.save()
 
 def restore_session_from_cookie():
+    cookies = get_cookies()
     access_token = cookies.get("access_token")
     refresh_token = cookies.get("refresh_token")
     if access_token and refresh_token:
@@ -29,11 +55,17 @@ def restore_session_from_cookie():
                 # Only set session state if we successfully get user data
                 st.session_state["user"] = user_response.user
                 st.session_state["user_email"] = user_response.user.email
+                AUTH_EVENTS.inc(action="cookie_restore", outcome="ok")
                 return True
+        except SupabaseUnavailable:
+            # The session may be fine; keep the cookies so the next rerun tries again
+            AUTH_EVENTS.inc(action="cookie_restore", outcome="unavailable")
+            return False
         except Exception as e:
             # Clear invalid session data
             clear_session_state()
             clear_cookies()
+        AUTH_EVENTS.inc(action="cookie_restore", outcome="failed")
     return False
 
 def clear_session_state():
@@ -44,6 +76,7 @@ def clear_session_state():
 
 def clear_cookies():
     """Clear authentication cookies"""
+    cookies = get_cookies()
     cookies["access_token"] = ""
     cookies["refresh_token"] = ""
     cookies.save()
@@ -75,8 +108,10 @@ def sign_up(email: str, password: str, display_name: str):
         if hasattr(res, "session") and res.session:
             st.session_state["supabase_session"] = res.session
             save_session_to_cookie(res.session)
+        AUTH_EVENTS.inc(action="sign_up", outcome="ok")
         return res
     except Exception as e:
+        AUTH_EVENTS.inc(action="sign_up", outcome="failed")
         st.error(f"Registration failed: {e}")
 
 def sign_in(email: str, password: str):
@@ -102,8 +137,10 @@ def sign_in(email: str, password: str):
         if hasattr(res, "user") and res.user:
             st.session_state["user"] = res.user
             st.session_state["user_email"] = res.user.email
+        AUTH_EVENTS.inc(action="sign_in", outcome="ok")
         return res
     except Exception as e:
+        AUTH_EVENTS.inc(action="sign_in", outcome="failed")
         st.error(f"Login failed: {e}")
 
 def sign_out():
@@ -111,7 +148,9 @@ def sign_out():
     supabase = get_supabase()
     try:
         supabase.auth.sign_out()
+        AUTH_EVENTS.inc(action="sign_out", outcome="ok")
     except Exception as e:
+        AUTH_EVENTS.inc(action="sign_out", outcome="failed")
         st.error(f"Logout failed: {e}")
     finally:
         # Always clear session state and cache, even if sign_out fails
@@ -122,10 +161,6 @@ def sign_out():
 # ─── Streamlit Auth Screen ────────────────────────────────────────────────────
 
 def auth_screen():
-    # Only try to restore session if user is not already logged in
-    if not st.session_state.get("user_email"):
-        restore_session_from_cookie()
-
     st.title("Authentication Page")
     option = st.selectbox("Choose an action:", ["Login", "Sign Up"], key="auth_option")
 
@@ -175,4 +210,9 @@ def auth_screen():
                 st.error(f"Login failed: {res.error.message}")
             else:
                 st.success("Login successful!")
-                st.rerun()
\ No newline at end of file
+                st.rerun()
+
+    # Restore a remembered session after the form is drawn, so the first paint
+    # doesn't wait on the cookie component and the Supabase client
+    if not st.session_state.get("user_email") and restore_session_from_cookie():
+        st.rerun()
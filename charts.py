@@ -0,0 +1,84 @@
+import plotly.express as px
+import plotly.graph_objects as go
+
+
+def monthly_results_chart(monthly_res):
+    return px.bar(
+        monthly_res,
+        x="month_label",
+        y=["Win", "Loss"],
+        barmode="stack",
+        labels={"month_label": "Month", "value": "Count"},
+        title="Wins vs Losses per Month",
+        color_discrete_sequence=["#309bd4", "lightsalmon"]  # Win = light green, Loss = light orange
+    )
+
+
+def monthly_totals_chart(monthly_totals):
+    return px.bar(
+        monthly_totals,
+        x="month_label",
+        y="matches",
+        labels={"month_label": "Month", "matches": "Matches"},
+        title="Matches per Month",
+        color_discrete_sequence=["#309bd4"]
+    )
+
+
+def average_points_chart(avg_long):
+    return px.bar(
+        avg_long,
+        x="match_type",
+        y="Average Points",
+        color="Team",
+        barmode="group",
+        labels={
+            "match_type":    "Match Type",
+            "Average Points":"Avg Points",
+            "Team":          "Team"
+        },
+        title="Average Points Scored by Match Type"
+    )
+
+
+def singles_level_chart(singles_level):
+    return px.bar(
+        singles_level,
+        x="opponent_1_level",
+        y="Win Rate",
+        labels={"opponent_1_level": "Opponent Level", "Win Rate": "Win Rate (%)"},
+        title="Singles Win Rate by Opponent Level",
+        text_auto=True
+    )
+
+
+def doubles_level_chart(doubles_level):
+    return px.bar(
+        doubles_level,
+        x="Opponent Team Level",
+        y="Win Rate",
+        labels={"Opponent Team Level": "Opponent Team Level", "Win Rate": "Win Rate (%)"},
+        title="Doubles Win Rate by Opponent Team Level",
+        text_auto=True
+    )
+
+
+def level_gauge(current_level):
+    return go.Figure(go.Indicator(
+        mode="gauge+number",
+        value=current_level,
+        gauge={"axis":{"range":[1,5.5]}},
+        title={"text":"Player Level"}
+    ))
+
+
+def expected_wins_chart(monthly_exp):
+    return px.bar(
+        monthly_exp,
+        x="month_label",
+        y=["expected", "actual"],
+        barmode="group",
+        labels={"month_label": "Month", "value": "Wins", "variable": ""},
+        title="Expected vs. Actual Wins per Month",
+        color_discrete_sequence=["lightgray", "#309bd4"]
+    )
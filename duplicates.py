@@ -0,0 +1,162 @@
+import numpy as np
+import pandas as pd
+from pandas.util import hash_array
+
+from players import normalize_name
+
+# How a duplicate differs from the match it copies, most alike first
+KINDS = {
+    "exact": "Exact copy",
+    "swapped": "Opponents swapped",
+    "near": "Levels differ",
+}
+# Fields hashed besides the date and match type
+NAME_COLUMNS = ("player_partner", "opponent_1", "opponent_2")
+NUMBER_COLUMNS = ("user_team_score", "opponent_team_score",
+                  "player_partner_level", "opponent_1_level", "opponent_2_level")
+
+
+def _number(value):
+    """Scores and levels as hashed: floats to 2 places, -1 when missing"""
+    try:
+        value = round(float(value), 2)
+    except (TypeError, ValueError):
+        return -1.0
+    return -1.0 if np.isnan(value) else value
+
+
+def _frame_columns(df):
+    """The hashed fields of every match in a frame, normalized column by column"""
+    missing = pd.Series(None, index=df.index, dtype=object)
+    columns = {
+        "date": pd.to_datetime(df["match_date"]).to_numpy(dtype="datetime64[D]").astype("int64"),
+        "type": df["match_type"].fillna("").astype(str).to_numpy(dtype=object),
+    }
+    for name in NAME_COLUMNS:
+        # normalize_name, vectorized: strip, collapse whitespace, lowercase
+        columns[name] = (df.get(name, missing).fillna("").astype(str)
+                         .str.replace(r"\s+", " ", regex=True).str.strip().str.lower()
+                         .to_numpy(dtype=object))
+    for name in NUMBER_COLUMNS:
+        columns[name] = (pd.to_numeric(df.get(name, missing), errors="coerce").astype(float)
+                         .round(2).fillna(-1.0).to_numpy())
+    return columns
+
+
+def _match_columns(match):
+    """The same fields for one match dict, without building a frame"""
+    columns = {
+        "date": np.array([pd.Timestamp(match["match_date"]).to_datetime64()], dtype="datetime64[D]").astype("int64"),
+        "type": np.array([match.get("match_type") or ""], dtype=object),
+    }
+    for name in NAME_COLUMNS:
+        columns[name] = np.array([normalize_name(match.get(name))], dtype=object)
+    for name in NUMBER_COLUMNS:
+        columns[name] = np.array([_number(match.get(name))])
+    return columns
+
+
+def _row_hashes(columns):
+    """One 64-bit hash per row over equal-length columns (FNV-style mix of per-column hashes)"""
+    hashes = np.zeros(len(columns[0]), dtype=np.uint64)
+    for values in columns:
+        hashes = (hashes ^ hash_array(values, categorize=False)) * np.uint64(0x100000001B3)
+    return hashes
+
+
+def content_keys(columns):
+    """
+    Three 64-bit content hashes per match (columns from _frame_columns or
+    _match_columns):
+
+    - exact:   date, type, names, levels and scores as entered;
+    - swapped: the same with the two opponents (and their levels) in name
+               order, so a doubles match re-entered with the opponents the
+               other way round gets the same key;
+    - near:    the swapped key without levels, which are per-match guesses
+               that often differ when a match is entered twice.
+    """
+    c = columns
+    base = [c["date"], c["type"], c["player_partner"], c["user_team_score"], c["opponent_team_score"]]
+    first = c["opponent_1"] <= c["opponent_2"]
+    low = lambda a, b: np.where(first, c[a], c[b])
+
+    near = base + [low("opponent_1", "opponent_2"), low("opponent_2", "opponent_1")]
+    swapped = near + [c["player_partner_level"],
+                      low("opponent_1_level", "opponent_2_level"), low("opponent_2_level", "opponent_1_level")]
+    exact = base + [c["opponent_1"], c["opponent_2"],
+                    c["player_partner_level"], c["opponent_1_level"], c["opponent_2_level"]]
+    return _row_hashes(exact), _row_hashes(swapped), _row_hashes(near)
+
+
+class DuplicateIndex:
+    """
+    Content-hash index over one user's matches, built once per data version.
+
+    Matches with the same date, type, players (names normalized like the
+    player registry does) and score are duplicates; see content_keys for how
+    opponent order and levels are treated. Grouping is one vectorized pass
+    over the hashes, and checking a new match is a dict lookup.
+
+    The oldest match (lowest id) of each group is the one kept. Matches still
+    being saved (negative ids) can be found by find() but are never offered
+    for cleanup.
+    """
+
+    def __init__(self, matches_df):
+        df = matches_df
+        self.n = len(df)
+        if not self.n:
+            self._first = {}
+            self._groups = pd.DataFrame(columns=["id", "keep_id", "kind"])
+            return
+        exact, swapped, near = content_keys(_frame_columns(df))
+        keys = pd.DataFrame({"id": df["id"].to_numpy(), "exact": exact, "swapped": swapped, "near": near})
+        keys = keys.sort_values("id", kind="stable")
+
+        # key -> oldest match id with that key, for O(1) checks of new matches
+        self._first = {}
+        for kind in KINDS:
+            first = keys.drop_duplicates(kind)
+            self._first[kind] = dict(zip(first[kind].tolist(), first["id"].tolist()))
+
+        saved = keys[keys["id"] > 0]
+        keepers = saved.drop_duplicates("near").set_index("near")
+        copies = saved[saved.duplicated("near")]
+        keep = keepers.loc[copies["near"]]
+        self._groups = pd.DataFrame({
+            "id": copies["id"].to_numpy(),
+            "keep_id": keep["id"].to_numpy(),
+            "kind": np.select(
+                [copies["exact"].to_numpy() == keep["exact"].to_numpy(),
+                 copies["swapped"].to_numpy() == keep["swapped"].to_numpy()],
+                ["exact", "swapped"], "near"),
+        })
+
+    def find(self, match):
+        """
+        (kind, id of the existing match) for a match dict that duplicates one
+        already indexed, else None. `kind` is the closest of KINDS.
+        """
+        if not self.n:
+            return None
+        keys = content_keys(_match_columns(match))
+        for kind, key in zip(KINDS, keys):
+            match_id = self._first[kind].get(int(key[0]))
+            if match_id is not None:
+                return kind, match_id
+        return None
+
+    def duplicates(self, kinds=None):
+        """
+        Saved matches that repeat an older one, as a frame of (id, keep_id,
+        kind); `kinds` limits it to some of KINDS.
+        """
+        if kinds is None:
+            return self._groups
+        return self._groups[self._groups["kind"].isin(list(kinds))]
+
+    def counts(self):
+        """{kind: number of duplicates}"""
+        return self._groups["kind"].value_counts().to_dict()
+
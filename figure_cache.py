@@ -0,0 +1,71 @@
+import json
+import threading
+from collections import OrderedDict
+
+import plotly.graph_objects as go
+import plotly.io as pio
+
+
+class FigureCache:
+    """
+    LRU cache of built Plotly figures, stored as JSON.
+
+    Building a figure with plotly.express (and unpickling one, which re-runs
+    validation) costs tens of milliseconds; rebuilding a Figure from stored JSON
+    with validation off costs about one. Entries are evicted least-recently-used
+    once either the entry count or the total JSON size goes over its limit.
+    """
+
+    def __init__(self, max_entries=512, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def size_bytes(self):
+        return self._bytes
+
+    def get(self, key):
+        """Cached figure for `key`, or None"""
+        with self._lock:
+            spec = self._entries.get(key)
+            if spec is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return go.Figure(json.loads(spec), _validate=False)
+
+    def put(self, key, figure):
+        spec = pio.to_json(figure, validate=False)
+        if len(spec) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old)
+            self._entries[key] = spec
+            self._bytes += len(spec)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def get_or_build(self, key, build):
+        """Return the cached figure for `key`, calling `build()` only on a miss"""
+        figure = self.get(key)
+        if figure is None:
+            figure = build()
+            self.put(key, figure)
+        return figure
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
@@ -0,0 +1,101 @@
+import math
+import threading
+from bisect import bisect_left, insort
+
+# Players need this many matches before they're ranked on win rate or rating
+MIN_MATCHES = 10
+Z = 1.96    # 95% confidence for the rating's Wilson lower bound
+
+METRICS = {
+    "rating": "Rating",
+    "win_rate": "Win Rate",
+    "matches": "Matches Played",
+    "level": "Level",
+}
+
+
+def wilson_lower_bound(wins, matches, z=Z):
+    """
+    Lower bound of the win rate's confidence interval. Ranking on it instead of
+    the raw win rate keeps a 3-0 newcomer from topping someone who's 60-20.
+    """
+    if matches <= 0:
+        return 0.0
+    p = wins / matches
+    centre = p + z * z / (2 * matches)
+    margin = z * math.sqrt(p * (1 - p) / matches + z * z / (4 * matches * matches))
+    return (centre - margin) / (1 + z * z / matches)
+
+
+def metric_values(row):
+    """{metric: value} for one user_summaries row; unranked metrics are left out"""
+    matches = row.get("matches") or 0
+    wins = row.get("wins") or 0
+    values = {"matches": matches}
+    if matches >= MIN_MATCHES:
+        values["win_rate"] = wins / matches
+        values["rating"] = wilson_lower_bound(wins, matches)
+    if row.get("level") is not None:
+        values["level"] = float(row["level"])
+    return values
+
+
+class Leaderboard:
+    """
+    Sorted rankings over user_summaries rows.
+
+    Each metric keeps a list of (-value, user_id) in sorted order, so "top N"
+    is a slice and "my rank" is a binary search. `update` moves a single user's
+    entries, which is how changed rows are applied after the initial load.
+    """
+
+    def __init__(self, rows=()):
+        self.rows = {}                                   # user_id -> summary row
+        self._values = {}                                # user_id -> {metric: value}
+        self._ranked = {metric: [] for metric in METRICS}
+        self._lock = threading.Lock()
+        self.synced_at = None                            # newest updated_at applied
+        self.update(rows)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def update(self, rows):
+        """Insert or replace summary rows"""
+        with self._lock:
+            for row in rows:
+                user_id = row["user_id"]
+                for metric, value in self._values.pop(user_id, {}).items():
+                    ranked = self._ranked[metric]
+                    del ranked[bisect_left(ranked, (-value, user_id))]
+                values = metric_values(row)
+                for metric, value in values.items():
+                    insort(self._ranked[metric], (-value, user_id))
+                self._values[user_id] = values
+                self.rows[user_id] = row
+                if row.get("updated_at") and (self.synced_at is None or row["updated_at"] > self.synced_at):
+                    self.synced_at = row["updated_at"]
+
+    def top(self, metric, n=25):
+        """[(rank, row, value)] for the best n users on a metric; ties share a rank"""
+        with self._lock:
+            ranked = self._ranked[metric][:n]
+            out, rank = [], 0
+            for i, (neg, user_id) in enumerate(ranked):
+                if i == 0 or neg != ranked[i - 1][0]:
+                    rank = i + 1
+                out.append((rank, self.rows[user_id], -neg))
+            return out
+
+    def rank(self, metric, user_id):
+        """(rank, number ranked) for a user, or None if they don't qualify"""
+        with self._lock:
+            value = self._values.get(user_id, {}).get(metric)
+            if value is None:
+                return None
+            ranked = self._ranked[metric]
+            # "" sorts before every user id, so this counts users with a strictly better value
+            return bisect_left(ranked, (-value, "")) + 1, len(ranked)
+
+    def ranked_count(self, metric):
+        return len(self._ranked[metric])
@@ -0,0 +1,453 @@
+"""
+Local stand-in for the Supabase client.
+
+Stores each table as a JSON file in a directory and implements the subset of
+the supabase-py query builder the app uses (select/insert/upsert/update/delete
+with eq/in_/lt/lte/gt/gte filters, order, limit, range), the
+`get_current_level`, `archive_matches` and `win_model_buckets` RPCs, and just
+enough of `auth` to sign in. Point
+`[supabase] url` at `local://<directory>` to run the app, the batch report
+tool or the API without a Supabase project:
+
+    [supabase]
+    url = "local://.local_db"
+    key = "unused"
+
+It's meant for development and testing: there is no row level security, and
+constraints other than upsert conflict targets aren't enforced.
+
+Query parameters on the URL inject faults into every request, to see how the
+app copes with a slow or flaky backend:
+
+    url = "local://.local_db?fail=0.2&slow=0.1&delay=10&seed=1"
+
+`fail` and `slow` are probabilities per request, `delay` is how long a slow
+request takes (seconds), and `down=1` fails everything.
+"""
+import datetime
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+import types
+import uuid
+from urllib.parse import parse_qsl
+
+from postgrest.exceptions import APIError
+
+
+# Writes to these tables update user_summaries (triggers in migrations/003)
+SUMMARY_SOURCES = ("matches", "player_levels")
+# Archived matches are counted by these (see migrations/004 and 005)
+ROLLUP_KEY = ("user_id", "month", "match_type", "user_level", "partner_level", "opponent_level", "won")
+
+
+def _now():
+    return datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="microseconds")
+
+
+class Faults:
+    """Failures to inject into requests: an error rate, slow responses, or a full outage"""
+
+    def __init__(self, fail=0.0, slow=0.0, delay=10.0, down=False, seed=None):
+        self.fail = fail
+        self.slow = slow
+        self.delay = delay
+        self.down = down
+        self.injected = 0
+        self._rng = random.Random(seed)
+
+    def inject(self, what):
+        if self.down or self._rng.random() < self.fail:
+            self.injected += 1
+            raise ConnectionError(f"injected failure: {what}")
+        if self.slow and self._rng.random() < self.slow:
+            self.injected += 1
+            time.sleep(self.delay)
+
+
+class LocalResponse:
+    def __init__(self, data):
+        self.data = data
+        self.count = len(data) if isinstance(data, list) else None
+
+
+class LocalQuery:
+    """One query-builder chain, executed against the in-memory tables"""
+
+    def __init__(self, db, table):
+        self._db = db
+        self._table = table
+        self._op = "select"
+        self._columns = None
+        self._payload = None
+        self._on_conflict = None
+        self._ignore_duplicates = False
+        self._filters = []
+        self._order = []
+        self._range = None
+
+    # ─── Operations ──────────────────────────────────────────────────────────────
+
+    def select(self, columns="*", count=None):
+        self._columns = None if columns.strip() == "*" else [c.strip() for c in columns.split(",")]
+        return self
+
+    def insert(self, payload, **kwargs):
+        self._op, self._payload = "insert", payload
+        return self
+
+    def upsert(self, payload, on_conflict="id", ignore_duplicates=False, **kwargs):
+        self._op, self._payload = "upsert", payload
+        self._on_conflict = [c.strip() for c in (on_conflict or "id").split(",")]
+        self._ignore_duplicates = ignore_duplicates
+        return self
+
+    def update(self, payload, **kwargs):
+        self._op, self._payload = "update", payload
+        return self
+
+    def delete(self, **kwargs):
+        self._op = "delete"
+        return self
+
+    # ─── Filters and modifiers ───────────────────────────────────────────────────
+
+    def _where(self, column, test):
+        self._filters.append(lambda row: test(row.get(column)))
+        return self
+
+    def eq(self, column, value):
+        return self._where(column, lambda v: v == value)
+
+    def neq(self, column, value):
+        return self._where(column, lambda v: v != value)
+
+    def in_(self, column, values):
+        values = list(values)
+        return self._where(column, lambda v: v in values)
+
+    def lt(self, column, value):
+        return self._where(column, lambda v: v is not None and v < value)
+
+    def lte(self, column, value):
+        return self._where(column, lambda v: v is not None and v <= value)
+
+    def gt(self, column, value):
+        return self._where(column, lambda v: v is not None and v > value)
+
+    def gte(self, column, value):
+        return self._where(column, lambda v: v is not None and v >= value)
+
+    def order(self, column, desc=False, **kwargs):
+        self._order.append((column, desc))
+        return self
+
+    def limit(self, count, **kwargs):
+        start = self._range[0] if self._range else 0
+        self._range = (start, start + count - 1)
+        return self
+
+    def range(self, start, end, **kwargs):
+        self._range = (start, end)
+        return self
+
+    # ─── Execution ───────────────────────────────────────────────────────────────
+
+    def _project(self, row):
+        if self._columns is None:
+            return dict(row)
+        return {c: row.get(c) for c in self._columns}
+
+    def execute(self):
+        if self._db.faults:
+            self._db.faults.inject(self._table)
+        with self._db.lock:
+            rows = self._db.rows(self._table)
+            if self._op in ("insert", "upsert"):
+                out = self._write(rows)
+            else:
+                matched = [r for r in rows if all(f(r) for f in self._filters)]
+                if self._op == "select":
+                    for column, desc in reversed(self._order):
+                        # None sorts last, like Postgres' default for ascending order
+                        matched.sort(key=lambda r: (r.get(column) is None, r.get(column) or 0), reverse=desc)
+                    if self._range:
+                        matched = matched[self._range[0]:self._range[1] + 1]
+                    return LocalResponse([self._project(r) for r in matched])
+                if self._op == "update":
+                    for r in matched:
+                        r.update(self._payload)
+                else:
+                    deleted = {id(r) for r in matched}
+                    self._db.tables[self._table] = [r for r in rows if id(r) not in deleted]
+                out = [dict(r) for r in matched]
+            self._db.save(self._table)
+            if self._table in SUMMARY_SOURCES:
+                self._db.refresh_summaries({r.get("user_id") for r in out})
+        return LocalResponse(out)
+
+    def _write(self, rows):
+        payload = self._payload if isinstance(self._payload, list) else [self._payload]
+        out = []
+        for new in payload:
+            new = dict(new)
+            existing = None
+            if self._op == "upsert" and all(new.get(c) is not None for c in self._on_conflict):
+                existing = next(
+                    (r for r in rows if all(r.get(c) == new[c] for c in self._on_conflict)), None
+                )
+            if existing is not None:
+                if not self._ignore_duplicates:
+                    existing.update(new)
+                    out.append(dict(existing))
+                continue
+            new.setdefault("id", self._db.next_id(self._table))
+            new.setdefault("created_at", _now())
+            rows.append(new)
+            out.append(dict(new))
+        return out
+
+
+class LocalAuth:
+    """Email/password sign-in against a local `users` table"""
+
+    def __init__(self, db):
+        self._db = db
+        self._user = None
+
+    @staticmethod
+    def _hash(password):
+        return hashlib.sha256(password.encode()).hexdigest()
+
+    @staticmethod
+    def _as_user(row):
+        return types.SimpleNamespace(
+            id=row["id"], email=row["email"], user_metadata=row.get("user_metadata") or {},
+            created_at=row.get("created_at"),
+        )
+
+    def _session(self, row):
+        self._user = self._as_user(row)
+        token = f"local:{row['id']}"
+        session = types.SimpleNamespace(access_token=token, refresh_token=token, user=self._user)
+        return types.SimpleNamespace(user=self._user, session=session)
+
+    def sign_up(self, credentials):
+        users = LocalQuery(self._db, "users")
+        if users.select("id").eq("email", credentials["email"]).execute().data:
+            raise APIError({"message": "User already registered", "code": "23505"})
+        row = {
+            "id": str(uuid.uuid4()),
+            "email": credentials["email"],
+            "password": self._hash(credentials["password"]),
+            "user_metadata": credentials.get("options", {}).get("data", {}),
+        }
+        LocalQuery(self._db, "users").insert(row).execute()
+        return self._session(row)
+
+    def sign_in_with_password(self, credentials):
+        rows = LocalQuery(self._db, "users").select().eq("email", credentials["email"]).execute().data
+        if not rows or rows[0]["password"] != self._hash(credentials["password"]):
+            raise APIError({"message": "Invalid login credentials", "code": "400"})
+        return self._session(rows[0])
+
+    def get_user(self, jwt=None):
+        if jwt:
+            user_id = jwt.split(":", 1)[-1]
+            rows = LocalQuery(self._db, "users").select().eq("id", user_id).execute().data
+            return types.SimpleNamespace(user=self._as_user(rows[0]) if rows else None)
+        return types.SimpleNamespace(user=self._user)
+
+    def sign_out(self):
+        self._user = None
+
+
+class LocalSupabase:
+    """Drop-in for `supabase.Client`, backed by one JSON file per table"""
+
+    def __init__(self, directory, faults=None):
+        self.directory = directory
+        self.tables = {}
+        self.lock = threading.RLock()
+        self.auth = LocalAuth(self)
+        self.faults = faults
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, table):
+        return os.path.join(self.directory, f"{table}.json")
+
+    def rows(self, table):
+        if table not in self.tables:
+            path = self._path(table)
+            if os.path.exists(path):
+                with open(path) as f:
+                    self.tables[table] = json.load(f)
+            else:
+                self.tables[table] = []
+                if table == "user_summaries":
+                    # Backfill, like the migration does
+                    self.refresh_summaries({m.get("user_id") for m in self.rows("matches")})
+        return self.tables[table]
+
+    def save(self, table):
+        tmp = self._path(table) + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.tables[table], f, default=str)
+        os.replace(tmp, self._path(table))
+
+    def next_id(self, table):
+        ids = [r["id"] for r in self.rows(table) if isinstance(r.get("id"), int)]
+        return max(ids, default=0) + 1
+
+    def table(self, name):
+        return LocalQuery(self, name)
+
+    from_ = table
+
+    def current_level(self, user_id):
+        with self.lock:
+            levels = [r for r in self.rows("player_levels") if r.get("user_id") == user_id]
+        latest = max(levels, key=lambda r: (str(r.get("effective_date")), r.get("id", 0)), default=None)
+        return latest["level"] if latest else None
+
+    def level_on(self, user_id, day):
+        """The user's level in effect on `day` (their first level before that), like migrations/005"""
+        with self.lock:
+            levels = sorted((str(r.get("effective_date"))[:10], r.get("id", 0), r["level"])
+                            for r in self.rows("player_levels") if r.get("user_id") == user_id)
+        if not levels:
+            return None
+        in_effect = [level for start, _, level in levels if start <= str(day)[:10]]
+        return in_effect[-1] if in_effect else levels[0][2]
+
+    def win_model_buckets(self):
+        """Every player's matches with levels, counted by level differential, type and result"""
+        buckets = {}
+        with self.lock:
+            played = [
+                (m["match_type"] == "doubles", self.level_on(m["user_id"], m["match_date"]),
+                 m.get("player_partner_level"), m.get("opponent_1_level"), m.get("opponent_2_level"),
+                 m["user_team_score"] > m["opponent_team_score"], 1)
+                for m in self.rows("matches")
+            ] + [
+                (r["match_type"] == "doubles", r.get("user_level"), r.get("partner_level"),
+                 r.get("opponent_level"), r.get("opponent_level"), r["won"], r["matches"])
+                for r in self.rows("match_rollups")
+            ]
+        for doubles, level, partner, opp_1, opp_2, won, matches in played:
+            if doubles:
+                if None in (level, partner, opp_1, opp_2):
+                    continue
+                diff = (level + partner) / 2 - (opp_1 + opp_2) / 2
+            elif None in (level, opp_1):
+                continue
+            else:
+                diff = level - opp_1
+            key = (diff, doubles, won)
+            buckets[key] = buckets.get(key, 0) + matches
+        return [{"level_diff": d, "doubles": t, "won": w, "matches": n} for (d, t, w), n in buckets.items()]
+
+    def archive_matches(self, user_id, before):
+        """Move matches before `before` into matches_archive and match_rollups, like migrations/005"""
+        with self.lock:
+            moved = [m for m in self.rows("matches")
+                     if m.get("user_id") == user_id and str(m["match_date"])[:10] < before]
+            if not moved:
+                return 0
+            ids = {id(m) for m in moved}
+            self.tables["matches"] = [m for m in self.rows("matches") if id(m) not in ids]
+            archived_at = _now()
+            self.rows("matches_archive").extend({**m, "archived_at": archived_at} for m in moved)
+
+            rollups = {tuple(r[c] for c in ROLLUP_KEY): r for r in self.rows("match_rollups")
+                       if r["user_id"] == user_id}
+            for m in moved:
+                doubles = m["match_type"] == "doubles"
+                opponent_level = m.get("opponent_1_level")
+                if doubles and opponent_level is not None and m.get("opponent_2_level") is not None:
+                    opponent_level = (opponent_level + m["opponent_2_level"]) / 2
+                elif doubles:
+                    opponent_level = None
+                key = (user_id, str(m["match_date"])[:7] + "-01", m["match_type"],
+                       self.level_on(user_id, m["match_date"]), m.get("player_partner_level"),
+                       opponent_level, m["user_team_score"] > m["opponent_team_score"])
+                rollup = rollups.get(key)
+                if rollup is None:
+                    rollup = rollups[key] = {
+                        "id": self.next_id("match_rollups"), **dict(zip(ROLLUP_KEY, key)),
+                        "matches": 0, "points_for": 0, "points_against": 0,
+                    }
+                    self.rows("match_rollups").append(rollup)
+                rollup["matches"] += 1
+                rollup["points_for"] += m["user_team_score"]
+                rollup["points_against"] += m["opponent_team_score"]
+            for table in ("matches", "matches_archive", "match_rollups"):
+                self.save(table)
+
+            self.refresh_summaries({user_id})
+            summary = next(r for r in self.rows("user_summaries") if r["user_id"] == user_id)
+            summary["archived_before"] = max(summary.get("archived_before") or before, before)
+            self.save("user_summaries")
+        return len(moved)
+
+    def rpc(self, fn, params):
+        functions = {
+            "get_current_level": lambda: self.current_level(params["p_user_id"]),
+            "archive_matches": lambda: self.archive_matches(params["p_user_id"], params["p_before"]),
+            "win_model_buckets": self.win_model_buckets,
+        }
+        if fn not in functions:
+            raise APIError({"message": f"Unknown function {fn}", "code": "42883"})
+        # supabase-py returns a builder here too; the call only runs on .execute()
+        def execute():
+            if self.faults:
+                self.faults.inject(fn)
+            return LocalResponse(functions[fn]())
+        return types.SimpleNamespace(execute=execute)
+
+    def refresh_summaries(self, user_ids):
+        """
+        Recompute user_summaries rows for these users. The database maintains
+        them incrementally with triggers; recomputing one user is fine here.
+        """
+        with self.lock:
+            names = {u["id"]: (u.get("user_metadata") or {}).get("display_name") for u in self.rows("users")}
+            summaries = {r["user_id"]: r for r in self.rows("user_summaries")}
+            for user_id in user_ids - {None}:
+                matches = [m for m in self.rows("matches") if m.get("user_id") == user_id]
+                # Archived matches still count, through their rollups
+                rollups = [r for r in self.rows("match_rollups") if r["user_id"] == user_id]
+                archived = [str(m["match_date"]) for m in self.rows("matches_archive") if m.get("user_id") == user_id]
+                summaries[user_id] = {
+                    "user_id": user_id,
+                    "display_name": names.get(user_id) or "Player",
+                    "matches": len(matches) + sum(r["matches"] for r in rollups),
+                    "wins": sum(m["user_team_score"] > m["opponent_team_score"] for m in matches)
+                            + sum(r["matches"] for r in rollups if r["won"]),
+                    "points_for": sum(m["user_team_score"] for m in matches) + sum(r["points_for"] for r in rollups),
+                    "points_against": sum(m["opponent_team_score"] for m in matches)
+                                      + sum(r["points_against"] for r in rollups),
+                    "level": self.current_level(user_id),
+                    "last_match_date": max([str(m["match_date"]) for m in matches] + archived, default=None),
+                    "archived_before": summaries.get(user_id, {}).get("archived_before"),
+                    "updated_at": _now(),
+                }
+            self.tables["user_summaries"] = list(summaries.values())
+            self.save("user_summaries")
+
+
+def connect(url):
+    """`local://<directory>[?faults]` -> LocalSupabase (relative paths are taken from the cwd)"""
+    directory, _, query = url[len("local://"):].partition("?")
+    faults = None
+    if query:
+        params = dict(parse_qsl(query))
+        faults = Faults(
+            fail=float(params.get("fail", 0)), slow=float(params.get("slow", 0)),
+            delay=float(params.get("delay", 10)), down=params.get("down") in ("1", "true"),
+            seed=params.get("seed"),
+        )
+    return LocalSupabase(directory or ".local_db", faults)
@@ -0,0 +1,186 @@
+import re
+from bisect import bisect_left
+
+import numpy as np
+import pandas as pd
+
+from players import normalize_name
+
+# Name fields -> the `matches` columns they're built from; "notes" (level notes) is the other text field
+NAME_FIELDS = {
+    "opponent": ["opponent_1", "opponent_2"],
+    "partner": ["player_partner"],
+}
+# Range filters -> how each one is computed from the history
+RANGES = ("date", "your_score", "opponent_score", "margin", "opponent_level")
+
+
+def _tokens(text):
+    return [t for t in re.split(r"[^a-z0-9.]+", str(text).lower()) if t]
+
+
+class MatchSearchIndex:
+    """
+    Search over one user's match history, built once per data version.
+
+    Names and level notes go into an inverted index (token -> row positions)
+    with a sorted vocabulary, so every query token is a prefix lookup by
+    bisect. Scores, margin, opponent level and date are kept as sorted columns,
+    so a range is two binary searches. A query ANDs its parts as boolean masks
+    over the rows, which are stored newest first, so results come back in
+    display order.
+
+    Level notes belong to matches played while that level was current (from
+    its effective date until the next level change).
+    """
+
+    def __init__(self, matches_df, levels_df=None):
+        df = matches_df
+        if not df.empty:
+            df = df.sort_values(["match_date", "id"], ascending=False, kind="stable")
+        self.ids = df["id"].to_numpy() if "id" in df.columns else np.array([], dtype=int)
+        self.n = len(self.ids)
+        if not self.n:
+            self._postings, self._vocab, self._sorted, self.facets = {}, {}, {}, {}
+            return
+
+        user = df["user_team_score"].to_numpy(dtype=float)
+        opponent = df["opponent_team_score"].to_numpy(dtype=float)
+        levels = df[[c for c in ("opponent_1_level", "opponent_2_level") if c in df.columns]]
+        columns = {
+            "date": df["match_date"].to_numpy(dtype="datetime64[ns]").astype("int64").astype(float),
+            "your_score": user,
+            "opponent_score": opponent,
+            "margin": np.abs(user - opponent),
+            "opponent_level": levels.apply(pd.to_numeric, errors="coerce").mean(axis=1).to_numpy(dtype=float),
+        }
+        # Sorted (values, positions) per range column; rows without a value are left out
+        self._sorted = {}
+        for name, values in columns.items():
+            known = np.flatnonzero(~np.isnan(values))
+            order = known[np.argsort(values[known], kind="stable")]
+            self._sorted[name] = (values[order], order)
+
+        words = {
+            field: [normalize_name(" ".join(v for v in row if isinstance(v, str))).split(" ")
+                    for row in df[[c for c in cols if c in df.columns]].itertuples(index=False)]
+            for field, cols in NAME_FIELDS.items()
+        }
+        words["notes"] = [_tokens(note) for note in self._notes(df["match_date"], levels_df)]
+        self._postings = {}
+        for field, rows in words.items():
+            postings = {}
+            for position, row in enumerate(rows):
+                for token in set(filter(None, row)):
+                    postings.setdefault(token, []).append(position)
+            self._postings[field] = {token: np.array(p) for token, p in postings.items()}
+        self._vocab = {field: sorted(postings) for field, postings in self._postings.items()}
+
+        self.facets = {
+            "match_type": df["match_type"].to_numpy(),
+            "result": np.where(user > opponent, "Win", "Loss"),
+        }
+
+    @staticmethod
+    def _notes(match_dates, levels_df):
+        """The note of the level in effect on each match's date"""
+        if levels_df is None or levels_df.empty or "notes" not in levels_df.columns:
+            return [""] * len(match_dates)
+        levels = levels_df.dropna(subset=["effective_date"]).sort_values("effective_date")
+        starts = pd.to_datetime(levels["effective_date"]).to_numpy(dtype="datetime64[ns]")
+        notes = levels["notes"].fillna("").astype(str).to_numpy()
+        which = np.searchsorted(starts, match_dates.to_numpy(dtype="datetime64[ns]"), side="right") - 1
+        return [notes[i] if i >= 0 else "" for i in which]
+
+    # ─── Query parts ────────────────────────────────────────────────────────────
+
+    def _prefix(self, field, token):
+        """Positions where some token of `field` starts with `token`"""
+        vocab = self._vocab.get(field, [])
+        hits = []
+        i = bisect_left(vocab, token)
+        while i < len(vocab) and vocab[i].startswith(token):
+            hits.append(self._postings[field][vocab[i]])
+            i += 1
+        return np.concatenate(hits) if hits else np.array([], dtype=int)
+
+    def _text_mask(self, query, fields):
+        mask = np.ones(self.n, dtype=bool)
+        for token in _tokens(query):
+            token_mask = np.zeros(self.n, dtype=bool)
+            for field in fields:
+                token_mask[self._prefix(field, token if field == "notes" else normalize_name(token))] = True
+            mask &= token_mask
+        return mask
+
+    def _range_mask(self, name, low, high):
+        values, order = self._sorted[name]
+        start = 0 if low is None else np.searchsorted(values, low, side="left")
+        stop = len(values) if high is None else np.searchsorted(values, high, side="right")
+        mask = np.zeros(self.n, dtype=bool)
+        mask[order[start:stop]] = True
+        return mask
+
+    @staticmethod
+    def _date_bound(value):
+        return None if value is None else float(pd.Timestamp(value).value)
+
+    # ─── Queries ────────────────────────────────────────────────────────────────
+
+    def search(self, text="", fields=None, match_type=None, result=None, **ranges):
+        """
+        Row positions matching every given part, newest first.
+
+        `text` is prefix-matched word by word against `fields` (any of
+        "opponent", "partner", "notes"; default all). `match_type` and
+        `result` take one value or a list. Range keywords (see RANGES) take
+        (low, high) with either end None for open; `date` takes dates.
+        """
+        if not self.n:
+            return np.array([], dtype=int)
+        mask = np.ones(self.n, dtype=bool)
+        if text.strip():
+            mask &= self._text_mask(text, fields or list(self._postings))
+        for facet, wanted in (("match_type", match_type), ("result", result)):
+            if wanted:
+                mask &= np.isin(self.facets[facet], [wanted] if isinstance(wanted, str) else list(wanted))
+        for name, bounds in ranges.items():
+            if name not in RANGES:
+                raise TypeError(f"unknown filter {name!r}")
+            if bounds is None:
+                continue
+            low, high = bounds
+            if name == "date":
+                low, high = self._date_bound(low), self._date_bound(high)
+                if high is not None:
+                    high += pd.Timedelta(days=1).value - 1       # the whole last day
+            mask &= self._range_mask(name, low, high)
+        return np.flatnonzero(mask)
+
+    def match_ids(self, positions):
+        return self.ids[positions]
+
+    def facet_counts(self, positions):
+        """{facet: {value: count}} over a result set, for labelling the filters"""
+        counts = {}
+        for facet, values in self.facets.items():
+            labels, n = np.unique(values[positions], return_counts=True)
+            counts[facet] = dict(zip(labels.tolist(), n.tolist()))
+        return counts
+
+    def bounds(self, name):
+        """(min, max) of a range column, or None when no row has a value"""
+        values, _ = self._sorted.get(name, ([], None))
+        if not len(values):
+            return None
+        if name == "date":
+            return pd.Timestamp(int(values[0])).date(), pd.Timestamp(int(values[-1])).date()
+        return values[0], values[-1]
+
+
+def page(positions, number, size):
+    """(positions on page `number` (1-based), page count), clamping the page number"""
+    pages = max(1, -(-len(positions) // size))
+    number = min(max(1, number), pages)
+    return positions[(number - 1) * size:number * size], pages
+
@@ -0,0 +1,142 @@
+import threading
+import time
+
+import pandas as pd
+
+
+class TTLStore:
+    """
+    Per-user values with a TTL, kept in process memory.
+
+    Expired values aren't dropped: get() stops returning them, but get_stale()
+    still does, so a caller can serve one while it fetches a replacement.
+    """
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self._entries = {}    # user_id -> (value, fetched_at)
+        self._lock = threading.RLock()
+
+    def get(self, user_id):
+        """The cached value for a user, or None if missing or older than the TTL"""
+        value, fresh = self.get_stale(user_id)
+        return value if fresh else None
+
+    def get_stale(self, user_id):
+        """(value, fresh): the cached value even when expired, or (None, False)"""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None, False
+            return entry[0], time.monotonic() - entry[1] <= self.ttl
+
+    def fetched_at(self, user_id):
+        """When the user's cached value was fetched (None if not cached)"""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            return entry[1] if entry else None
+
+    def put(self, user_id, value):
+        with self._lock:
+            self._entries[user_id] = (value, time.monotonic())
+
+    def invalidate(self, user_id=None):
+        """Drop one user's value, or every value when user_id is None"""
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
+
+
+class MatchStore(TTLStore):
+    """
+    Per-user cache of match frames, kept in process memory.
+
+    Unlike st.cache_data this holds one mutable frame per user, so writes can
+    patch the cached rows in place instead of throwing the whole history away
+    and refetching it. Readers get shallow copies (see getMatches); with pandas
+    copy-on-write a patch copies only the columns it touches, so a frame
+    already handed out never changes under its reader.
+    """
+
+    def update_rows(self, user_id, rows):
+        """
+        Overwrite cached rows (matched on `id`) with the given column values.
+        Returns False when there's nothing cached to patch.
+        """
+        with self._lock:
+            df = self.get_stale(user_id)[0]     # an expired frame is still served, so patch it too
+            if df is None or df.empty:
+                return False
+            position = pd.Series(range(len(df)), index=df["id"])
+            for row in rows:
+                if row["id"] not in position.index:
+                    continue
+                i = position[row["id"]]
+                for col, value in row.items():
+                    if col == "id" or col not in df.columns:
+                        continue
+                    if col == "match_date":
+                        value = pd.Timestamp(value)
+                    df.iat[i, df.columns.get_loc(col)] = value
+            if any("match_date" in row for row in rows):
+                df.sort_values("match_date", ascending=False, inplace=True, kind="stable")
+            return True
+
+    def append(self, user_id, rows):
+        """
+        Optimistically add new rows (not yet confirmed by the server) to a cached
+        frame. Rows whose client_key is already cached are skipped. Returns False
+        when there's nothing cached to add to.
+        """
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return False
+            df, fetched_at = entry
+            if "client_key" in df.columns:
+                known = set(df["client_key"].dropna())
+                rows = [r for r in rows if r["client_key"] not in known]
+            if not rows:
+                return True
+            new = pd.DataFrame(rows)
+            new["match_date"] = pd.to_datetime(new["match_date"])
+            combined = pd.concat([df, new], ignore_index=True) if not df.empty else new
+            for col in df.columns.intersection(new.columns):
+                if str(df[col].dtype) == "Int64":
+                    combined[col] = combined[col].astype("Int64")
+            combined.sort_values("match_date", ascending=False, inplace=True, kind="stable")
+            self._entries[user_id] = (combined.reset_index(drop=True), fetched_at)
+            return True
+
+    def confirm(self, user_id, ids):
+        """Swap temporary ids for server ids, given {client_key: id}"""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0].empty or "client_key" not in entry[0].columns:
+                return
+            df = entry[0]
+            confirmed = df["client_key"].map(ids)
+            mask = confirmed.notna()
+            df.loc[mask, "id"] = confirmed[mask].astype(df["id"].dtype)
+
+    def remove(self, user_id, client_keys):
+        """Roll back optimistic rows that never made it to the server"""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0].empty or "client_key" not in entry[0].columns:
+                return
+            df, fetched_at = entry
+            keep = ~df["client_key"].isin(set(client_keys))
+            self._entries[user_id] = (df[keep].reset_index(drop=True), fetched_at)
+
+    def delete(self, user_id, ids):
+        """Drop rows the server has deleted"""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0].empty:
+                return
+            df, fetched_at = entry
+            keep = ~df["id"].isin(set(ids))
+            self._entries[user_id] = (df[keep].reset_index(drop=True), fetched_at)
@@ -0,0 +1,181 @@
+import heapq
+import math
+from bisect import bisect_left
+from datetime import datetime
+from itertools import combinations
+
+import pandas as pd
+
+# Player id column -> the level recorded for that player in the same match
+LEVEL_COLUMNS = {
+    "opponent_1_id": "opponent_1_level",
+    "opponent_2_id": "opponent_2_level",
+    "player_partner_id": "player_partner_level",
+}
+# How far (in level points) not having played someone for a year pushes them away
+RECENCY_WEIGHT = 0.5
+CANDIDATES = 8      # nearest players considered when building doubles suggestions
+
+
+def player_levels(df):
+    """Latest recorded level, last played date and match count per player id"""
+    frames = [
+        df[[id_col, level_col, "match_date"]].set_axis(["player_id", "level", "match_date"], axis=1)
+        for id_col, level_col in LEVEL_COLUMNS.items()
+        if id_col in df.columns and level_col in df.columns
+    ]
+    if df.empty or not frames:
+        return pd.DataFrame(columns=["level", "last_played", "matches"])
+    long = pd.concat(frames).dropna(subset=["player_id", "level"]).sort_values("match_date")
+    grouped = long.groupby(long["player_id"].astype(int))
+    return pd.DataFrame({
+        "level": grouped["level"].last().astype(float),
+        "last_played": grouped["match_date"].last(),
+        "matches": grouped.size(),
+    })
+
+
+class SkillIndex:
+    """
+    Exact k-nearest-neighbour search over (level, staleness) points.
+
+    Points are sorted by level; a query starts at the bisect position and walks
+    outward, stopping once the level gap alone is larger than the k-th best
+    distance. Staleness grows with time since the player was last seen, so
+    recent players win ties.
+    """
+
+    def __init__(self, players, today=None):
+        today = pd.Timestamp(today or datetime.now().date())
+        days = (today - pd.to_datetime(players["last_played"])).dt.days.clip(lower=0)
+        staleness = (days / 365).clip(upper=1.0) * RECENCY_WEIGHT
+        self._points = sorted(zip(players["level"], staleness, players.index))
+        self._levels = [p[0] for p in self._points]
+
+    def __len__(self):
+        return len(self._points)
+
+    def nearest(self, level, k=5, exclude=()):
+        """[(distance, player_id, level)] for the k players closest to `level`"""
+        exclude = set(exclude)
+        best = []   # max-heap of (-distance, player_id, level)
+        lo = bisect_left(self._levels, level) - 1
+        hi = lo + 1
+        while lo >= 0 or hi < len(self._points):
+            gap_lo = level - self._levels[lo] if lo >= 0 else math.inf
+            gap_hi = self._levels[hi] - level if hi < len(self._points) else math.inf
+            if len(best) == k and min(gap_lo, gap_hi) > -best[0][0]:
+                break
+            if gap_lo <= gap_hi:
+                point, lo = self._points[lo], lo - 1
+            else:
+                point, hi = self._points[hi], hi + 1
+            player_level, staleness, player_id = point
+            if player_id in exclude:
+                continue
+            distance = math.hypot(player_level - level, staleness)
+            entry = (-distance, player_id, player_level)
+            if len(best) < k:
+                heapq.heappush(best, entry)
+            elif entry > best[0]:
+                heapq.heapreplace(best, entry)
+        return sorted((-d, pid, lvl) for d, pid, lvl in best)
+
+
+# ─── Balancing ─────────────────────────────────────────────────────────────────
+
+def best_split(four):
+    """
+    Best 2v2 split of four (name, level) players: the one with the smallest
+    difference in team level. Returns (team_a, team_b, difference).
+    """
+    first, rest = four[0], four[1:]
+    splits = []
+    for partner in rest:
+        team_a = [first, partner]
+        team_b = [p for p in rest if p is not partner]
+        diff = abs(sum(p[1] for p in team_a) - sum(p[1] for p in team_b)) / 2
+        splits.append((diff, team_a, team_b))
+    diff, team_a, team_b = min(splits, key=lambda s: s[0])
+    return team_a, team_b, diff
+
+
+def split_session(players, mode="doubles"):
+    """
+    Split an open-play session into courts.
+
+    `players` is a list of (name, level) in arrival order. Players are grouped by
+    level so each court is evenly matched, then each doubles court takes its most
+    balanced team split. When the numbers don't divide evenly, the latest
+    arrivals sit out this round.
+    """
+    size = 4 if mode == "doubles" else 2
+    playing = len(players) - len(players) % size
+    sitting_out = players[playing:]
+    ranked = sorted(players[:playing], key=lambda p: p[1], reverse=True)
+
+    courts = []
+    for i in range(0, playing, size):
+        group = ranked[i:i + size]
+        if size == 4:
+            team_a, team_b, diff = best_split(group)
+        else:
+            team_a, team_b = [group[0]], [group[1]]
+            diff = abs(group[0][1] - group[1][1])
+        courts.append({"court": len(courts) + 1, "team_a": team_a, "team_b": team_b, "level_diff": diff})
+    return {"courts": courts, "sitting_out": sitting_out}
+
+
+# ─── Per-user suggestions ──────────────────────────────────────────────────────
+
+class Matchmaker:
+    """Opponent and partner suggestions from a user's own match history"""
+
+    def __init__(self, registry, matches_df, today=None):
+        self.registry = registry
+        known = player_levels(matches_df)
+        self.players = known[known.index.isin(list(registry.names))]
+        self.index = SkillIndex(self.players, today)
+
+    def level(self, player_id):
+        return float(self.players.at[player_id, "level"]) if player_id in self.players.index else None
+
+    def name(self, player_id):
+        return self.registry.name(player_id)
+
+    def singles(self, user_level, k=5):
+        """Closest opponents to the user's level: [(player_id, level, distance)]"""
+        return [(pid, lvl, d) for d, pid, lvl in self.index.nearest(user_level, k)]
+
+    def doubles(self, user_level, k=3, partner_id=None):
+        """
+        Balanced doubles: [(partner_id, (opp_1_id, opp_2_id), team level diff)],
+        best first. Candidates are the players nearest the user's level; every
+        partner/opponent assignment among them is scored.
+        """
+        exclude = [] if partner_id is None else [partner_id]
+        near = self.index.nearest(user_level, CANDIDATES, exclude=exclude)
+        levels = {pid: lvl for _, pid, lvl in near}
+        distance = {pid: d for d, pid, _ in near}
+        options = []
+        partners = [partner_id] if partner_id is not None else list(levels)
+        for partner in partners:
+            partner_level = levels.get(partner, self.level(partner))
+            team = (user_level + partner_level) / 2
+            for opp_1, opp_2 in combinations([p for p in levels if p != partner], 2):
+                diff = abs(team - (levels[opp_1] + levels[opp_2]) / 2)
+                closeness = distance.get(partner, 0) + distance[opp_1] + distance[opp_2]
+                options.append((diff, closeness, partner, (opp_1, opp_2)))
+        options.sort(key=lambda o: (o[0], o[1]))
+
+        suggestions, used = [], set()
+        for diff, _, partner, opponents in options:
+            # Vary the suggestions instead of repeating the same foursome
+            group = frozenset((partner,) + opponents)
+            if group in used:
+                continue
+            used.add(group)
+            suggestions.append((partner, opponents, diff))
+            if len(suggestions) == k:
+                break
+        return suggestions
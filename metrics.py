@@ -0,0 +1,357 @@
+"""
+Process-wide metrics in the Prometheus text format.
+
+Counters, gauges and histograms live in one registry and are served over
+plain HTTP on a side port, so Prometheus can scrape the Streamlit process
+directly:
+
+    METRICS_PORT=9464 streamlit run app.py
+    curl localhost:9464/metrics
+
+METRICS_PORT=off turns the endpoint off; METRICS_HOST picks the interface
+(default 127.0.0.1). Only the standard library is used, so importing this
+from the login screen costs nothing.
+"""
+import logging
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_PORT = 9464
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_registry = []
+log = logging.getLogger(__name__)
+
+
+def _escape(value):
+    return str(value).replace("\\", r"\\").replace("\n", r"\n").replace('"', r'\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"{self.name} takes labels {self.label_names}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def samples(self):
+        """[(suffix, label pairs, value)] for the exposition"""
+        with self._lock:
+            return [("", key, (), value) for key, value in sorted(self._values.items())]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, key, extra, value in self.samples():
+            lines.append(f"{self.name}{suffix}{_labels(self.label_names, key, extra)} {_number(value)}")
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """A value that goes up and down; `callback` computes it at scrape time instead"""
+    kind = "gauge"
+
+    def __init__(self, name, help, labels=(), callback=None):
+        super().__init__(name, help, labels)
+        self.callback = callback
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def samples(self):
+        if self.callback is None:
+            return super().samples()
+        try:
+            value = self.callback()
+        except Exception:
+            return []
+        return [] if value is None else [("", (), (), value)]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0.0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe how long the block takes, even if it raises"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self):
+        out = []
+        with self._lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                out.append(("_bucket", key, (("le", _number(bound)),), cumulative))
+            out.append(("_sum", key, (), total))
+            out.append(("_count", key, (), cumulative))
+        return out
+
+
+def render():
+    """Every registered metric in the Prometheus text format (version 0.0.4)"""
+    return "\n".join(metric.render() for metric in _registry) + "\n"
+
+
+# ─── Metrics ───────────────────────────────────────────────────────────────────
+
+SUPABASE_SECONDS = Histogram(
+    "smashtrack_supabase_request_seconds",
+    "Supabase request latency by kind (query, rpc, auth), target and operation.",
+    ["kind", "target", "op"],
+)
+SUPABASE_ERRORS = Counter(
+    "smashtrack_supabase_errors_total",
+    "Supabase requests that raised, by kind, target and operation.",
+    ["kind", "target", "op"],
+)
+SUPABASE_RETRIES = Counter(
+    "smashtrack_supabase_retries_total",
+    "Supabase reads retried after a timeout or transient error, by target.",
+    ["target"],
+)
+SUPABASE_REJECTED = Counter(
+    "smashtrack_supabase_rejected_total",
+    "Supabase requests failed at once because the circuit breaker was open.",
+)
+CIRCUIT_OPEN = Gauge(
+    "smashtrack_supabase_circuit_open",
+    "1 while the Supabase circuit breaker is open or half-open, else 0.",
+)
+CACHE_LOOKUPS = Counter(
+    "smashtrack_cache_lookups_total",
+    "Reads of a cached value. Hit ratio is 1 - misses / lookups.",
+    ["cache"],
+)
+CACHE_MISSES = Counter(
+    "smashtrack_cache_misses_total",
+    "Cached reads that had to go to Supabase.",
+    ["cache"],
+)
+CACHE_INVALIDATIONS = Counter(
+    "smashtrack_cache_invalidations_total",
+    "clear_user_cache() calls, which drop every user's cached data.",
+)
+STALE_READS = Counter(
+    "smashtrack_stale_reads_total",
+    "Expired cached data served while a background refresh runs, by cache.",
+    ["cache"],
+)
+COALESCED_CALLS = Counter(
+    "smashtrack_coalesced_calls_total",
+    "Data reads that waited on an identical in-flight fetch instead of sending their own, by query.",
+    ["query"],
+)
+AUTH_EVENTS = Counter(
+    "smashtrack_auth_events_total",
+    "Sign in, sign up, sign out and cookie session restores, by outcome.",
+    ["action", "outcome"],
+)
+PAGE_SECONDS = Histogram(
+    "smashtrack_page_run_seconds",
+    "Time to run one page script (a rerun), by page.",
+    ["page"],
+)
+MATCHES_QUEUED = Counter(
+    "smashtrack_matches_queued_total",
+    "New matches handed to the write queue.",
+)
+MATCH_WRITE_FAILURES = Counter(
+    "smashtrack_match_write_failures_total",
+    "Queued matches that couldn't be saved and were rolled back.",
+)
+
+
+def _active_sessions():
+    # Streamlit has no public session count; if its internals move, the gauge
+    # drops out of the scrape instead of failing it
+    try:
+        from streamlit.runtime import Runtime
+        if not Runtime.exists():
+            return None
+        return Runtime.instance()._session_mgr.num_active_sessions()
+    except (ImportError, AttributeError):
+        return None
+
+ACTIVE_SESSIONS = Gauge(
+    "smashtrack_active_sessions",
+    "Browser sessions connected to this Streamlit process.",
+    callback=_active_sessions,
+)
+
+
+# ─── Supabase instrumentation ──────────────────────────────────────────────────
+
+class _TimedQuery:
+    """
+    Wraps a query-builder chain. Builder calls are passed through (and their
+    results wrapped again); `.execute()` is timed as one request.
+    """
+
+    def __init__(self, target, kind, name, op=None):
+        self._target = target
+        self._kind = kind
+        self._name = name
+        self._op = op
+
+    def __getattr__(self, attr):
+        value = getattr(self._target, attr)
+        if attr == "execute":
+            return self._execute
+        if not callable(value):
+            return value
+
+        def call(*args, **kwargs):
+            op = self._op or (attr if attr in ("select", "insert", "upsert", "update", "delete") else None)
+            return _TimedQuery(value(*args, **kwargs), self._kind, self._name, op)
+        return call
+
+    def _execute(self, *args, **kwargs):
+        labels = {"kind": self._kind, "target": self._name, "op": self._op or self._kind}
+        try:
+            with SUPABASE_SECONDS.time(**labels):
+                return self._target.execute(*args, **kwargs)
+        except Exception:
+            SUPABASE_ERRORS.inc(**labels)
+            raise
+
+
+class _TimedAuth:
+    def __init__(self, auth):
+        self._auth = auth
+
+    def __getattr__(self, attr):
+        value = getattr(self._auth, attr)
+        if not callable(value):
+            return value
+
+        def call(*args, **kwargs):
+            labels = {"kind": "auth", "target": "auth", "op": attr}
+            try:
+                with SUPABASE_SECONDS.time(**labels):
+                    return value(*args, **kwargs)
+            except Exception:
+                SUPABASE_ERRORS.inc(**labels)
+                raise
+        return call
+
+
+class InstrumentedClient:
+    """A Supabase client whose requests are timed into SUPABASE_SECONDS"""
+
+    def __init__(self, client):
+        self._client = client
+        self.auth = _TimedAuth(client.auth)
+
+    def table(self, name):
+        return _TimedQuery(self._client.table(name), "query", name)
+
+    from_ = table
+
+    def rpc(self, fn, params=None, **kwargs):
+        return _TimedQuery(self._client.rpc(fn, params, **kwargs), "rpc", fn, fn)
+
+    def __getattr__(self, attr):
+        return getattr(self._client, attr)
+
+
+# ─── HTTP endpoint ─────────────────────────────────────────────────────────────
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server = None
+_server_started = False
+_server_lock = threading.Lock()
+
+
+def start_server(port=None, host=None):
+    """
+    Serve /metrics from a daemon thread, once per process (later calls are
+    free). Returns the server, or None when turned off or the port is taken.
+    """
+    global _server, _server_started
+    with _server_lock:
+        if _server_started:
+            return _server
+        _server_started = True
+        port = port or os.environ.get("METRICS_PORT", DEFAULT_PORT)
+        if str(port).lower() in ("off", "0", "false", ""):
+            return None
+        host = host or os.environ.get("METRICS_HOST", "127.0.0.1")
+        try:
+            _server = ThreadingHTTPServer((host, int(port)), _Handler)
+        except OSError as e:
+            log.warning("metrics: not serving on %s:%s: %s", host, port, e)
+            return None
+        _server.daemon_threads = True
+        threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+        return _server
@@ -0,0 +1,79 @@
+-- Per-user player registry.
+-- Players were stored as free text in matches.opponent_1 / opponent_2 / player_partner.
+-- This adds a `players` table with stable integer ids, links matches to it,
+-- and backfills every existing row. The text columns are kept (and kept in sync
+-- with the canonical name) so older clients and CSV exports keep working.
+
+create table if not exists public.players (
+    id              bigint generated always as identity primary key,
+    user_id         uuid not null references auth.users (id) on delete cascade,
+    name            text not null,
+    normalized_name text not null,
+    aliases         text[] not null default '{}',
+    created_at      timestamptz not null default now(),
+    unique (user_id, normalized_name)
+);
+
+alter table public.players enable row level security;
+
+create policy "players are private to their owner"
+    on public.players for all
+    using (auth.uid() = user_id)
+    with check (auth.uid() = user_id);
+
+alter table public.matches
+    add column if not exists opponent_1_id     bigint references public.players (id),
+    add column if not exists opponent_2_id     bigint references public.players (id),
+    add column if not exists player_partner_id bigint references public.players (id);
+
+create index if not exists matches_opponent_1_id_idx     on public.matches (opponent_1_id);
+create index if not exists matches_opponent_2_id_idx     on public.matches (opponent_2_id);
+create index if not exists matches_player_partner_id_idx on public.matches (player_partner_id);
+
+-- ─── Backfill ──────────────────────────────────────────────────────────────────
+-- normalized_name must match players.normalize_name() in the app.
+
+with raw as (
+    select user_id, opponent_1 as name, match_date from public.matches where opponent_1 is not null
+    union all
+    select user_id, opponent_2, match_date from public.matches where opponent_2 is not null
+    union all
+    select user_id, player_partner, match_date from public.matches where player_partner is not null
+),
+cleaned as (
+    select user_id,
+           regexp_replace(btrim(name), '\s+', ' ', 'g')        as name,
+           lower(regexp_replace(btrim(name), '\s+', ' ', 'g')) as normalized_name,
+           match_date
+    from raw
+    where btrim(name) <> ''
+)
+insert into public.players (user_id, name, normalized_name)
+select user_id,
+       -- the earliest spelling becomes the canonical name
+       (array_agg(name order by match_date))[1],
+       normalized_name
+from cleaned
+group by user_id, normalized_name
+on conflict (user_id, normalized_name) do nothing;
+
+update public.matches m
+set opponent_1_id = p.id
+from public.players p
+where p.user_id = m.user_id
+  and p.normalized_name = lower(regexp_replace(btrim(m.opponent_1), '\s+', ' ', 'g'))
+  and m.opponent_1_id is null;
+
+update public.matches m
+set opponent_2_id = p.id
+from public.players p
+where p.user_id = m.user_id
+  and p.normalized_name = lower(regexp_replace(btrim(m.opponent_2), '\s+', ' ', 'g'))
+  and m.opponent_2_id is null;
+
+update public.matches m
+set player_partner_id = p.id
+from public.players p
+where p.user_id = m.user_id
+  and p.normalized_name = lower(regexp_replace(btrim(m.player_partner), '\s+', ' ', 'g'))
+  and m.player_partner_id is null;
@@ -0,0 +1,15 @@
+-- Idempotent match inserts.
+-- New matches are written from a background queue that retries on flaky
+-- connections, and the same match can be submitted twice from the form. Each
+-- insert now carries a client-generated key; the app upserts with
+-- `on conflict (user_id, client_key) do nothing`, so retries and double submits
+-- collapse into one row. Existing rows keep a null key (nulls never conflict).
+
+alter table public.matches
+    add column if not exists client_key uuid;
+
+alter table public.matches
+    drop constraint if exists matches_user_id_client_key_key;
+
+alter table public.matches
+    add constraint matches_user_id_client_key_key unique (user_id, client_key);
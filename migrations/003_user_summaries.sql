@@ -0,0 +1,133 @@
+-- Club leaderboard.
+-- One summary row per user, maintained incrementally by triggers on every
+-- match and level write, so leaderboards read N small rows instead of scanning
+-- every user's matches. Summaries are readable by every signed-in member;
+-- only the triggers write them.
+
+create table if not exists public.user_summaries (
+    user_id         uuid primary key references auth.users (id) on delete cascade,
+    display_name    text not null default 'Player',
+    matches         integer not null default 0,
+    wins            integer not null default 0,
+    points_for      integer not null default 0,
+    points_against  integer not null default 0,
+    level           numeric,
+    last_match_date date,
+    updated_at      timestamptz not null default now()
+);
+
+-- The app syncs changed rows with `updated_at > last sync`
+create index if not exists user_summaries_updated_at_idx on public.user_summaries (updated_at);
+
+alter table public.user_summaries enable row level security;
+
+create policy "summaries are visible to members"
+    on public.user_summaries for select
+    to authenticated
+    using (true);
+
+-- ─── Incremental maintenance ───────────────────────────────────────────────────
+
+-- Add (sign = 1) or remove (sign = -1) one match from its owner's summary
+create or replace function public.apply_match_to_summary(m public.matches, sign integer)
+returns void
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+    insert into public.user_summaries as s
+        (user_id, display_name, matches, wins, points_for, points_against, last_match_date)
+    select m.user_id,
+           coalesce(u.raw_user_meta_data ->> 'display_name', 'Player'),
+           sign,
+           sign * (m.user_team_score > m.opponent_team_score)::int,
+           sign * m.user_team_score,
+           sign * m.opponent_team_score,
+           m.match_date
+    from auth.users u
+    where u.id = m.user_id
+    on conflict (user_id) do update set
+        display_name    = excluded.display_name,
+        matches         = s.matches + excluded.matches,
+        wins            = s.wins + excluded.wins,
+        points_for      = s.points_for + excluded.points_for,
+        points_against  = s.points_against + excluded.points_against,
+        last_match_date = case
+            when sign > 0 then greatest(s.last_match_date, excluded.last_match_date)
+            else (select max(match_date) from public.matches where user_id = m.user_id)
+        end,
+        updated_at      = now();
+end;
+$$;
+
+-- Only the triggers may call it; through /rpc it would let anyone rewrite any summary
+revoke execute on function public.apply_match_to_summary(public.matches, integer) from public, anon, authenticated;
+
+create or replace function public.matches_summary_trigger()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+    if tg_op in ('UPDATE', 'DELETE') then
+        perform public.apply_match_to_summary(old, -1);
+    end if;
+    if tg_op in ('INSERT', 'UPDATE') then
+        perform public.apply_match_to_summary(new, 1);
+    end if;
+    return null;
+end;
+$$;
+
+revoke execute on function public.matches_summary_trigger() from public, anon, authenticated;
+
+drop trigger if exists matches_summary on public.matches;
+create trigger matches_summary
+    after insert or update or delete on public.matches
+    for each row execute function public.matches_summary_trigger();
+
+create or replace function public.levels_summary_trigger()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+    insert into public.user_summaries as s (user_id, display_name, level)
+    select new.user_id,
+           coalesce(u.raw_user_meta_data ->> 'display_name', 'Player'),
+           public.get_current_level(new.user_id)
+    from auth.users u
+    where u.id = new.user_id
+    on conflict (user_id) do update set
+        level      = excluded.level,
+        updated_at = now();
+    return null;
+end;
+$$;
+
+revoke execute on function public.levels_summary_trigger() from public, anon, authenticated;
+
+drop trigger if exists player_levels_summary on public.player_levels;
+create trigger player_levels_summary
+    after insert or update on public.player_levels
+    for each row execute function public.levels_summary_trigger();
+
+-- ─── Backfill ──────────────────────────────────────────────────────────────────
+
+insert into public.user_summaries
+    (user_id, display_name, matches, wins, points_for, points_against, level, last_match_date)
+select u.id,
+       coalesce(u.raw_user_meta_data ->> 'display_name', 'Player'),
+       count(m.id),
+       count(m.id) filter (where m.user_team_score > m.opponent_team_score),
+       coalesce(sum(m.user_team_score), 0),
+       coalesce(sum(m.opponent_team_score), 0),
+       public.get_current_level(u.id),
+       max(m.match_date)
+from auth.users u
+left join public.matches m on m.user_id = u.id
+group by u.id
+on conflict (user_id) do nothing;
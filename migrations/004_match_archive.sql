@@ -0,0 +1,190 @@
+-- Match archive.
+-- Old matches move out of `matches` into `matches_archive`, so every full
+-- history fetch only reads the recent window. Each archived match is also
+-- counted into `match_rollups`: one row per user, month, match type, partner
+-- level, opponent (team) level and result. That is everything the Dashboard
+-- aggregates on, so "All Time" numbers come out exactly as if the rows were
+-- still there. Archived rows stay readable by their owner.
+--
+-- Archiving doesn't change a player's all-time totals, so the summary trigger
+-- skips the deletes it makes; user_summaries.archived_before tells the app
+-- which matches are in the archive (every match before that date).
+
+create table if not exists public.matches_archive (
+    like public.matches including defaults including constraints,
+    archived_at timestamptz not null default now()
+);
+
+create index if not exists matches_archive_user_date_idx on public.matches_archive (user_id, match_date);
+
+alter table public.matches_archive enable row level security;
+
+create policy "archived matches are visible to their owner"
+    on public.matches_archive for select
+    using (auth.uid() = user_id);
+
+-- `like` doesn't copy foreign keys: archived rows still reference the registry
+alter table public.matches_archive
+    add foreign key (opponent_1_id)     references public.players (id),
+    add foreign key (opponent_2_id)     references public.players (id),
+    add foreign key (player_partner_id) references public.players (id);
+
+-- Owners may repoint their archived matches' players (merging players does),
+-- but nothing else: scores and levels are counted in the rollups
+revoke update on public.matches_archive from anon, authenticated;
+grant update (opponent_1, opponent_1_id, opponent_2, opponent_2_id, player_partner, player_partner_id)
+    on public.matches_archive to authenticated;
+
+create policy "archived matches' players can be renamed by their owner"
+    on public.matches_archive for update
+    using (auth.uid() = user_id)
+    with check (auth.uid() = user_id);
+
+create table if not exists public.match_rollups (
+    id             bigint generated always as identity primary key,
+    user_id        uuid not null references auth.users (id) on delete cascade,
+    month          date not null,
+    match_type     text not null,
+    partner_level  numeric,             -- null for singles
+    opponent_level numeric,             -- opponent 1 for singles, the opponents' average for doubles
+    won            boolean not null,
+    matches        integer not null,
+    points_for     integer not null,
+    points_against integer not null
+);
+
+create unique index if not exists match_rollups_key on public.match_rollups
+    (user_id, month, match_type, coalesce(partner_level, -1), coalesce(opponent_level, -1), won);
+
+alter table public.match_rollups enable row level security;
+
+create policy "rollups are visible to their owner"
+    on public.match_rollups for select
+    using (auth.uid() = user_id);
+
+alter table public.user_summaries
+    add column if not exists archived_before date;
+
+-- ─── Summary trigger ───────────────────────────────────────────────────────────
+-- Same as 003, except while archiving: the rows leave `matches` but still count.
+
+create or replace function public.matches_summary_trigger()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+    if current_setting('smashtrack.archiving', true) = 'on' then
+        return null;
+    end if;
+    if tg_op in ('UPDATE', 'DELETE') then
+        perform public.apply_match_to_summary(old, -1);
+    end if;
+    if tg_op in ('INSERT', 'UPDATE') then
+        perform public.apply_match_to_summary(new, 1);
+    end if;
+    return null;
+end;
+$$;
+
+-- ─── Archiving ─────────────────────────────────────────────────────────────────
+
+-- Move one user's matches played before p_before into the archive; returns how many
+create or replace function public.archive_user_matches(p_user_id uuid, p_before date)
+returns integer
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    moved integer;
+begin
+    perform set_config('smashtrack.archiving', 'on', true);
+
+    with old as (
+        delete from public.matches
+        where user_id = p_user_id and match_date < p_before
+        returning *
+    )
+    insert into public.matches_archive
+    select old.*, now() from old;
+    get diagnostics moved = row_count;
+
+    perform set_config('smashtrack.archiving', 'off', true);
+    if moved = 0 then
+        return 0;
+    end if;
+
+    -- now() is fixed for the transaction, so this picks exactly the rows just moved
+    insert into public.match_rollups as r
+        (user_id, month, match_type, partner_level, opponent_level, won, matches, points_for, points_against)
+    select user_id,
+           date_trunc('month', match_date)::date,
+           match_type,
+           player_partner_level,
+           case when match_type = 'doubles'
+                then (opponent_1_level + opponent_2_level) / 2
+                else opponent_1_level end,
+           user_team_score > opponent_team_score,
+           count(*),
+           sum(user_team_score),
+           sum(opponent_team_score)
+    from public.matches_archive
+    where user_id = p_user_id and archived_at = now()
+    group by 1, 2, 3, 4, 5, 6
+    on conflict (user_id, month, match_type, coalesce(partner_level, -1), coalesce(opponent_level, -1), won)
+    do update set
+        matches        = r.matches + excluded.matches,
+        points_for     = r.points_for + excluded.points_for,
+        points_against = r.points_against + excluded.points_against;
+
+    -- Bumping updated_at also tells the app its history snapshots are stale
+    update public.user_summaries
+    set archived_before = greatest(archived_before, p_before),
+        updated_at      = now()
+    where user_id = p_user_id;
+    return moved;
+end;
+$$;
+
+revoke execute on function public.archive_user_matches(uuid, date) from public, anon, authenticated;
+
+-- What the app calls: players archive their own matches only
+create or replace function public.archive_matches(p_user_id uuid, p_before date)
+returns integer
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+    if p_user_id is distinct from auth.uid() then
+        raise exception 'can only archive your own matches' using errcode = '42501';
+    end if;
+    return public.archive_user_matches(p_user_id, p_before);
+end;
+$$;
+
+-- For a scheduled job: archive every player's matches older than p_horizon, e.g.
+--   select cron.schedule('archive-matches', '0 4 * * 0',
+--                        $$select public.archive_all_matches(interval '2 years')$$);
+create or replace function public.archive_all_matches(p_horizon interval)
+returns integer
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    u record;
+    total integer := 0;
+begin
+    for u in
+        select distinct user_id from public.matches where match_date < (current_date - p_horizon)::date
+    loop
+        total := total + public.archive_user_matches(u.user_id, (current_date - p_horizon)::date);
+    end loop;
+    return total;
+end;
+$$;
+
+revoke execute on function public.archive_all_matches(interval) from public, anon, authenticated;
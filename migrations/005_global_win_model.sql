@@ -0,0 +1,150 @@
+-- Global win model.
+-- The win-probability model shrinks each player's fit toward a global model,
+-- fit from every player's matches. Players can't read each other's matches, so
+-- win_model_buckets() counts them server-side into (level differential,
+-- doubles, result) buckets: everything the model's features depend on, and
+-- nothing about who played.
+--
+-- A match's level differential uses the player's level on the match date,
+-- not their current one. Archive rollups now record that level too, so
+-- archived matches keep counting the same way.
+
+-- ─── Level on a date ───────────────────────────────────────────────────────────
+
+-- The player's level in effect on p_date (their first level for earlier dates)
+create or replace function public.level_on(p_user_id uuid, p_date date)
+returns numeric
+language sql
+stable
+security definer
+set search_path = public
+as $$
+    select coalesce(
+        (select level from public.player_levels
+         where user_id = p_user_id and effective_date <= p_date
+         order by effective_date desc, id desc limit 1),
+        (select level from public.player_levels
+         where user_id = p_user_id
+         order by effective_date, id limit 1)
+    );
+$$;
+
+revoke execute on function public.level_on(uuid, date) from public, anon, authenticated;
+
+create index if not exists player_levels_user_date_idx on public.player_levels (user_id, effective_date);
+
+-- ─── Rollups keep the player's level ───────────────────────────────────────────
+
+alter table public.match_rollups
+    add column if not exists user_level numeric;
+
+-- Rollups made before this migration: the level at the start of their month
+update public.match_rollups
+set user_level = public.level_on(user_id, month)
+where user_level is null;
+
+drop index if exists public.match_rollups_key;
+create unique index match_rollups_key on public.match_rollups
+    (user_id, month, match_type, coalesce(user_level, -1), coalesce(partner_level, -1),
+     coalesce(opponent_level, -1), won);
+
+-- Same as 004, with user_level in the key
+create or replace function public.archive_user_matches(p_user_id uuid, p_before date)
+returns integer
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    moved integer;
+begin
+    perform set_config('smashtrack.archiving', 'on', true);
+
+    with old as (
+        delete from public.matches
+        where user_id = p_user_id and match_date < p_before
+        returning *
+    )
+    insert into public.matches_archive
+    select old.*, now() from old;
+    get diagnostics moved = row_count;
+
+    perform set_config('smashtrack.archiving', 'off', true);
+    if moved = 0 then
+        return 0;
+    end if;
+
+    -- now() is fixed for the transaction, so this picks exactly the rows just moved
+    insert into public.match_rollups as r
+        (user_id, month, match_type, user_level, partner_level, opponent_level, won,
+         matches, points_for, points_against)
+    select user_id,
+           date_trunc('month', match_date)::date,
+           match_type,
+           public.level_on(user_id, match_date),
+           player_partner_level,
+           case when match_type = 'doubles'
+                then (opponent_1_level + opponent_2_level) / 2
+                else opponent_1_level end,
+           user_team_score > opponent_team_score,
+           count(*),
+           sum(user_team_score),
+           sum(opponent_team_score)
+    from public.matches_archive
+    where user_id = p_user_id and archived_at = now()
+    group by 1, 2, 3, 4, 5, 6, 7
+    on conflict (user_id, month, match_type, coalesce(user_level, -1), coalesce(partner_level, -1),
+                 coalesce(opponent_level, -1), won)
+    do update set
+        matches        = r.matches + excluded.matches,
+        points_for     = r.points_for + excluded.points_for,
+        points_against = r.points_against + excluded.points_against;
+
+    -- Bumping updated_at also tells the app its history snapshots are stale
+    update public.user_summaries
+    set archived_before = greatest(archived_before, p_before),
+        updated_at      = now()
+    where user_id = p_user_id;
+    return moved;
+end;
+$$;
+
+revoke execute on function public.archive_user_matches(uuid, date) from public, anon, authenticated;
+
+-- ─── Training buckets ──────────────────────────────────────────────────────────
+
+-- Every player's matches (archived ones through their rollups) with levels,
+-- counted by level differential, match type and result
+create or replace function public.win_model_buckets()
+returns table (level_diff numeric, doubles boolean, won boolean, matches bigint)
+language sql
+stable
+security definer
+set search_path = public
+as $$
+    with played as (
+        select m.match_type = 'doubles' as doubles,
+               case when m.match_type = 'doubles'
+                    then (l.level + m.player_partner_level) / 2 - (m.opponent_1_level + m.opponent_2_level) / 2
+                    else l.level - m.opponent_1_level end as level_diff,
+               m.user_team_score > m.opponent_team_score as won,
+               1 as matches
+        from public.matches m
+        cross join lateral (select public.level_on(m.user_id, m.match_date) as level) l
+        union all
+        select r.match_type = 'doubles',
+               case when r.match_type = 'doubles'
+                    then (r.user_level + r.partner_level) / 2 - r.opponent_level
+                    else r.user_level - r.opponent_level end,
+               r.won,
+               r.matches
+        from public.match_rollups r
+    )
+    select level_diff, doubles, won, sum(matches)
+    from played
+    where level_diff is not null
+    group by 1, 2, 3;
+$$;
+
+revoke execute on function public.win_model_buckets() from public, anon;
+grant execute on function public.win_model_buckets() to authenticated;
@@ -0,0 +1,98 @@
+import threading
+
+from leaderboard import MIN_MATCHES
+from quantile_sketch import KLLSketch
+
+PEER_METRICS = {
+    "win_rate": "win rate",
+    "avg_margin": "average margin",
+    "matches": "matches played",
+}
+MIN_PEERS = 5               # don't compare against fewer players than this
+REBUILD_FRACTION = 0.1      # rebuild once this share of players have stale values
+
+
+def level_bucket(level):
+    """Levels are compared in 0.5 steps (3.25 counts as 3.5)"""
+    if level is None:
+        return None
+    return round(float(level) * 2) / 2
+
+
+def peer_values(row):
+    """{metric: value} from a user_summaries row"""
+    matches = row.get("matches") or 0
+    if not matches:
+        return {}
+    values = {"matches": matches}
+    if matches >= MIN_MATCHES:
+        values["win_rate"] = (row.get("wins") or 0) / matches
+        values["avg_margin"] = ((row.get("points_for") or 0) - (row.get("points_against") or 0)) / matches
+    return values
+
+
+def ordinal(n):
+    suffix = "th" if 10 <= n % 100 <= 20 else {1: "st", 2: "nd", 3: "rd"}.get(n % 10, "th")
+    return f"{n}{suffix}"
+
+
+class PeerPercentiles:
+    """
+    Quantile sketches of per-player metrics, one per (level bucket, metric).
+
+    Sketches can't delete, so when a player's values change the new values are
+    added and the old ones stay until enough have gone stale to rebuild. Queries
+    never touch the per-player values, so they cost the same however many
+    players there are.
+    """
+
+    def __init__(self, rows=(), k=200):
+        self.k = k
+        self.sketches = {}      # (bucket, metric) -> KLLSketch
+        self._values = {}       # user_id -> {(bucket, metric): value} as last added
+        self._counts = {}       # (bucket, metric) -> players currently in it
+        self._stale = 0
+        self._lock = threading.Lock()
+        self.update(rows)
+
+    def update(self, rows):
+        with self._lock:
+            for row in rows:
+                bucket = level_bucket(row.get("level"))
+                new = {} if bucket is None else {
+                    (bucket, metric): value for metric, value in peer_values(row).items()
+                }
+                old = self._values.get(row["user_id"])
+                if old == new:
+                    continue
+                if old:
+                    self._stale += 1
+                    for key in old:
+                        self._counts[key] -= 1
+                self._values[row["user_id"]] = new
+                for key, value in new.items():
+                    self._sketch(key).add(value)
+                    self._counts[key] = self._counts.get(key, 0) + 1
+            if self._stale > REBUILD_FRACTION * max(len(self._values), 1):
+                self._rebuild()
+
+    def _sketch(self, key):
+        if key not in self.sketches:
+            self.sketches[key] = KLLSketch(k=self.k)
+        return self.sketches[key]
+
+    def _rebuild(self):
+        self.sketches = {}
+        for values in self._values.values():
+            for key, value in values.items():
+                self._sketch(key).add(value)
+        self._stale = 0
+
+    def percentile(self, level, metric, value):
+        """(percentile 0-100, peers in the bucket) for a value, or None if too few peers"""
+        key = (level_bucket(level), metric)
+        with self._lock:
+            peers = self._counts.get(key, 0)
+            if peers < MIN_PEERS:
+                return None
+            return round(self.sketches[key].rank(value) * 100), peers
@@ -0,0 +1,102 @@
+import math
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import datetime
+
+import pandas as pd
+
+from players import PLAYER_ID_COLUMNS, normalize_name
+
+
+RECENCY_HALF_LIFE_DAYS = 60
+
+
+def _trigrams(key):
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class PlayerIndex:
+    """
+    Prefix + fuzzy search over a user's player names.
+
+    Built once per roster/data version. Every name, alias and word of a name is a
+    key in a sorted list, so prefix lookups are a bisect. Typos fall back to
+    trigram overlap. Results are ranked by how often and how recently the user
+    played with/against the player.
+    """
+
+    def __init__(self, registry, matches_df=None):
+        self.registry = registry
+        self.scores = self._activity_scores(matches_df)
+
+        keys = set()
+        self._trigram_ids = defaultdict(set)
+        for pid, name in registry.names.items():
+            spellings = [name] + registry.aliases.get(pid, [])
+            for spelling in spellings:
+                key = normalize_name(spelling)
+                keys.add((key, pid))
+                for word in key.split(" ")[1:]:
+                    keys.add((word, pid))
+                for gram in _trigrams(key):
+                    self._trigram_ids[gram].add(pid)
+        self._keys = sorted(keys)
+        self._ranked = sorted(registry.names, key=self._rank_key)
+
+    @staticmethod
+    def _activity_scores(df):
+        """Frequency + exponentially decayed recency per player id"""
+        if df is None or df.empty:
+            return {}
+        frames = [
+            df[[col, "match_date"]].rename(columns={col: "player_id"})
+            for col in PLAYER_ID_COLUMNS.values() if col in df.columns
+        ]
+        if not frames:
+            return {}
+        long = pd.concat(frames).dropna(subset=["player_id"])
+        if long.empty:
+            return {}
+        stats = long.groupby("player_id")["match_date"].agg(["count", "max"])
+        now = pd.Timestamp(datetime.now())
+        age_days = (now - pd.to_datetime(stats["max"])).dt.days.clip(lower=0)
+        recency = 0.5 ** (age_days / RECENCY_HALF_LIFE_DAYS)
+        score = stats["count"].map(math.log1p) + 2 * recency
+        return {int(pid): float(s) for pid, s in score.items()}
+
+    def _rank_key(self, pid):
+        return (-self.scores.get(pid, 0.0), normalize_name(self.registry.names[pid]))
+
+    def top(self, k=10):
+        """Most relevant players when nothing has been typed yet"""
+        return [self.registry.names[pid] for pid in self._ranked[:k]]
+
+    def search(self, query, k=10):
+        """Top-k canonical names matching `query` by prefix, then by fuzzy similarity"""
+        q = normalize_name(query)
+        if not q:
+            return self.top(k)
+
+        hits = set()
+        i = bisect_left(self._keys, (q, -1))
+        while i < len(self._keys) and self._keys[i][0].startswith(q):
+            hits.add(self._keys[i][1])
+            i += 1
+        ranked = sorted(hits, key=self._rank_key)
+
+        if len(ranked) < k:
+            grams = _trigrams(q)
+            overlap = defaultdict(int)
+            for gram in grams:
+                for pid in self._trigram_ids.get(gram, ()):
+                    if pid not in hits:
+                        overlap[pid] += 1
+            fuzzy = [
+                (count / len(grams), pid) for pid, count in overlap.items()
+                if count / len(grams) >= 0.4
+            ]
+            fuzzy.sort(key=lambda item: (-item[0],) + self._rank_key(item[1]))
+            ranked += [pid for _, pid in fuzzy]
+
+        return [self.registry.names[pid] for pid in ranked[:k]]
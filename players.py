@@ -0,0 +1,69 @@
+import re
+
+
+_WHITESPACE = re.compile(r"\s+")
+
+PLAYER_ID_COLUMNS = {
+    "opponent_1": "opponent_1_id",
+    "opponent_2": "opponent_2_id",
+    "player_partner": "player_partner_id",
+}
+
+
+def clean_name(name) -> str:
+    """Strip a free-text name and collapse inner whitespace ("  john   doe " -> "john doe")."""
+    if not name:
+        return ""
+    return _WHITESPACE.sub(" ", str(name)).strip()
+
+
+def normalize_name(name) -> str:
+    """
+    Lookup key for a player name. Must stay in sync with the SQL expression
+    used by migrations/001_players.sql: lower(regexp_replace(btrim(name), '\\s+', ' ', 'g'))
+    """
+    return clean_name(name).lower()
+
+
+class PlayerRegistry:
+    """
+    Per-user roster of players built from rows of the `players` table.
+    Maps stable integer ids to canonical names, and normalized names/aliases back to ids.
+    """
+
+    def __init__(self, rows):
+        self.names = {}       # id -> canonical name
+        self.aliases = {}     # id -> other spellings merged into this player
+        self._ids = {}        # normalized name or alias -> id
+        for r in rows:
+            pid = int(r["id"])
+            self.names[pid] = r["name"]
+            self.aliases[pid] = list(r.get("aliases") or [])
+            for alias in self.aliases[pid]:
+                self._ids.setdefault(normalize_name(alias), pid)
+        # canonical names win over aliases
+        for pid, name in self.names.items():
+            self._ids[normalize_name(name)] = pid
+        self._sorted_ids = sorted(self.names, key=lambda pid: normalize_name(self.names[pid]))
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return self.resolve(name) is not None
+
+    def resolve(self, name):
+        """Return the player id for a name or alias, or None if the player is unknown"""
+        return self._ids.get(normalize_name(name))
+
+    def name(self, player_id, default=None):
+        """Canonical name for a player id"""
+        if player_id is None:
+            return default
+        return self.names.get(int(player_id), default)
+
+    def sorted_ids(self):
+        return list(self._sorted_ids)
+
+    def sorted_names(self):
+        return [self.names[pid] for pid in self._sorted_ids]
@@ -0,0 +1,111 @@
+"""
+KLL quantile sketch (Karnin, Lang & Liberty, 2016).
+
+Keeps a few hundred values no matter how many are added, answers rank and
+quantile queries with a rank error of roughly 1.7/k (about 1% at the default
+k=200), and two sketches can be merged into one with the same guarantee - so
+sketches built separately (per level bucket, per process) can be combined.
+"""
+import bisect
+import random
+
+
+class KLLSketch:
+    def __init__(self, k=200, seed=None):
+        self.k = k
+        self.n = 0
+        self.compactors = [[]]      # level h holds items of weight 2**h
+        self._rng = random.Random(seed)
+        self._sorted = None         # (values, cumulative weights), cached between updates
+
+    def __len__(self):
+        return self.n
+
+    def _capacity(self, level):
+        depth = len(self.compactors) - level - 1
+        return max(2, int(self.k * (2 / 3) ** depth) + 1)
+
+    def _size(self):
+        return sum(len(c) for c in self.compactors)
+
+    def _max_size(self):
+        return sum(self._capacity(h) for h in range(len(self.compactors)))
+
+    def add(self, value):
+        self.compactors[0].append(value)
+        self.n += 1
+        self._sorted = None
+        if self._size() >= self._max_size():
+            self._compress()
+
+    def update(self, values):
+        for value in values:
+            self.add(value)
+
+    def _compress(self):
+        for level in range(len(self.compactors)):
+            if len(self.compactors[level]) >= self._capacity(level):
+                if level + 1 == len(self.compactors):
+                    self.compactors.append([])
+                # Keep every other item (from a random offset) at double the weight
+                items = sorted(self.compactors[level])
+                leftover = items[-1:] if len(items) % 2 else []
+                items = items[:len(items) - len(leftover)]
+                offset = int(self._rng.random() < 0.5)
+                self.compactors[level + 1].extend(items[offset::2])
+                self.compactors[level] = leftover
+                if self._size() < self._max_size():
+                    break
+
+    def merge(self, other):
+        """Fold another sketch into this one (in place) and return self"""
+        while len(self.compactors) < len(other.compactors):
+            self.compactors.append([])
+        for level, items in enumerate(other.compactors):
+            self.compactors[level].extend(items)
+        self.n += other.n
+        self._sorted = None
+        while self._size() >= self._max_size():
+            self._compress()
+        return self
+
+    def _weighted(self):
+        if self._sorted is None:
+            pairs = sorted(
+                (value, 2 ** level)
+                for level, items in enumerate(self.compactors)
+                for value in items
+            )
+            values, cumulative, total = [], [], 0
+            for value, weight in pairs:
+                total += weight
+                values.append(value)
+                cumulative.append(total)
+            self._sorted = (values, cumulative)
+        return self._sorted
+
+    def rank(self, value):
+        """Approximate fraction of added values <= value"""
+        if not self.n:
+            return 0.0
+        values, cumulative = self._weighted()
+        i = bisect.bisect_right(values, value)
+        return cumulative[i - 1] / cumulative[-1] if i else 0.0
+
+    def quantile(self, q):
+        """Approximate value at fraction q (0..1) of the distribution"""
+        if not self.n:
+            return None
+        values, cumulative = self._weighted()
+        i = bisect.bisect_left(cumulative, q * cumulative[-1])
+        return values[min(i, len(values) - 1)]
+
+    def to_dict(self):
+        return {"k": self.k, "n": self.n, "compactors": self.compactors}
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(k=data["k"])
+        sketch.n = data["n"]
+        sketch.compactors = [list(c) for c in data["compactors"]]
+        return sketch
@@ -0,0 +1,248 @@
+"""
+Resilient Supabase access: per-call timeouts, bounded retries with jitter and
+a circuit breaker.
+
+Every request made through `ResilientClient` runs under one `Policy`:
+
+- a read (selects, the RPCs in READ_RPCS, `auth.get_user`) gets
+  SUPABASE_TIMEOUT seconds (default 8) before it counts as failed, however
+  long the HTTP client itself would wait;
+- reads that fail transiently - timeouts, network errors, retryable Postgres
+  errors - are retried a couple of times with full-jitter exponential
+  backoff, so a burst of failing sessions doesn't retry in lockstep;
+- writes (inserts, updates, deletes and every other RPC) get one attempt and
+  no deadline of their own: a write abandoned mid-flight could still land
+  after its caller was told it failed. They're bounded by the HTTP client's
+  timeout instead (supabase_client sets it to twice SUPABASE_TIMEOUT). The
+  write queue retries inserts, which its idempotency keys make safe;
+- after BREAKER_THRESHOLD transient failures in a row the circuit opens, and
+  for the next BREAKER_RESET seconds requests fail at once with
+  `SupabaseUnavailable` instead of each waiting out a timeout. Then one trial
+  request is let through, and its outcome closes or reopens the circuit.
+
+Errors that mean Supabase answered (bad credentials, constraint violations)
+pass straight through and count as a healthy response.
+"""
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from metrics import CIRCUIT_OPEN, SUPABASE_REJECTED, SUPABASE_RETRIES
+
+TIMEOUT = float(os.environ.get("SUPABASE_TIMEOUT", 8))
+BREAKER_THRESHOLD = 5
+BREAKER_RESET = 15.0
+
+RETRYABLE_SQLSTATES = ("08", "40", "53", "57")  # connection, rollback, resources, shutdown
+GATEWAY_STATUSES = ("502", "503", "504")
+READS = ("select", "get_user")
+# RPCs that only read, so they're safe to cut off and retry
+READ_RPCS = ("get_current_level", "win_model_buckets")
+
+
+class SupabaseUnavailable(Exception):
+    """Supabase couldn't be reached: the call timed out, kept failing, or the circuit is open"""
+
+
+def is_transient(error):
+    """True for failures worth retrying: nothing (or a gateway error) came back from Supabase"""
+    if isinstance(error, (TimeoutError, ConnectionError, SupabaseUnavailable)):
+        return True
+    # Imported here: the login screen loads this module before any client exists
+    try:
+        import httpx
+        from gotrue.errors import AuthRetryableError
+        from postgrest.exceptions import APIError
+    except ImportError:
+        return False
+    if isinstance(error, APIError):
+        code = str(error.code or "")
+        return code.startswith(RETRYABLE_SQLSTATES) or code in GATEWAY_STATUSES
+    return isinstance(error, (httpx.TransportError, AuthRetryableError))
+
+
+class CircuitBreaker:
+    """closed -> open after `threshold` failures in a row -> half-open after `reset_after` s"""
+
+    def __init__(self, threshold=BREAKER_THRESHOLD, reset_after=BREAKER_RESET):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self._failures = 0
+        self._opened_at = None
+        self._trial = False             # a half-open trial request is in flight
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at < self.reset_after:
+            return "open"
+        return "half-open"
+
+    def retry_in(self):
+        """Seconds until the next trial request (0 unless open)"""
+        with self._lock:
+            if self._state() != "open":
+                return 0.0
+            return self.reset_after - (time.monotonic() - self._opened_at)
+
+    def allow(self):
+        with self._lock:
+            state = self._state()
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self._opened_at is not None:
+                CIRCUIT_OPEN.set(0)
+            self._failures = 0
+            self._opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial or self._failures >= self.threshold:
+                self._opened_at = time.monotonic()
+                CIRCUIT_OPEN.set(1)
+            self._trial = False
+
+
+class Policy:
+    """How every Supabase call is made: deadline, retries and the shared breaker"""
+
+    def __init__(self, timeout=TIMEOUT, attempts=3, backoff=0.2, max_backoff=2.0, breaker=None, workers=64):
+        self.timeout = timeout
+        self.attempts = attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.breaker = breaker or CircuitBreaker()
+        # Reads run here so the caller can stop waiting; a timed-out read
+        # finishes (or hits the HTTP client's own timeout) in the background
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="supabase-call")
+
+    def _with_timeout(self, fn):
+        from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+        ctx = get_script_run_ctx(suppress_warning=True)
+
+        def run():
+            # Keep the caller's session (auth state can live in session_state)
+            thread = add_script_run_ctx(threading.current_thread(), ctx)
+            try:
+                return fn()
+            finally:
+                add_script_run_ctx(thread, None)
+
+        future = self._pool.submit(run)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            raise TimeoutError(f"no response from Supabase within {self.timeout:g}s") from None
+
+    def call(self, fn, what, retry=False, deadline=True):
+        """
+        Run `fn` under the breaker; `retry` for idempotent reads, `deadline`
+        False to wait for `fn` however long it takes (writes)
+        """
+        attempts = self.attempts if retry else 1
+        error = None
+        for attempt in range(attempts):
+            if not self.breaker.allow():
+                SUPABASE_REJECTED.inc()
+                raise SupabaseUnavailable(
+                    f"Supabase is unavailable ({what}); trying again in {self.breaker.retry_in():.0f}s"
+                ) from error
+            try:
+                result = self._with_timeout(fn) if deadline else fn()
+            except Exception as e:
+                if not is_transient(e):
+                    self.breaker.record_success()
+                    raise
+                self.breaker.record_failure()
+                error = e
+                if attempt + 1 < attempts:
+                    SUPABASE_RETRIES.inc(target=what)
+                    time.sleep(random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt)))
+                continue
+            self.breaker.record_success()
+            return result
+        raise SupabaseUnavailable(f"Supabase is unavailable ({what}): {error}") from error
+
+
+# ─── Client wrappers ───────────────────────────────────────────────────────────
+
+class _ResilientQuery:
+    """A query-builder chain whose `.execute()` runs under the policy"""
+
+    def __init__(self, target, policy, name, op=None):
+        self._target = target
+        self._policy = policy
+        self._name = name
+        self._op = op
+
+    def __getattr__(self, attr):
+        value = getattr(self._target, attr)
+        if attr == "execute":
+            return self._execute
+        if not callable(value):
+            return value
+
+        def call(*args, **kwargs):
+            op = self._op or (attr if attr in ("select", "insert", "upsert", "update", "delete") else None)
+            return _ResilientQuery(value(*args, **kwargs), self._policy, self._name, op)
+        return call
+
+    def _execute(self, *args, **kwargs):
+        op = self._op or "select"
+        read = op in READS or (op == "rpc" and self._name in READ_RPCS)
+        return self._policy.call(lambda: self._target.execute(*args, **kwargs), self._name,
+                                 retry=read, deadline=read)
+
+
+class _ResilientAuth:
+    def __init__(self, auth, policy):
+        self._auth = auth
+        self._policy = policy
+
+    def __getattr__(self, attr):
+        value = getattr(self._auth, attr)
+        if not callable(value):
+            return value
+
+        def call(*args, **kwargs):
+            read = attr in READS
+            return self._policy.call(lambda: value(*args, **kwargs), "auth", retry=read, deadline=read)
+        return call
+
+
+class ResilientClient:
+    """A Supabase client whose requests go through `policy`"""
+
+    def __init__(self, client, policy=None):
+        self._client = client
+        self.policy = policy or Policy()
+        self.auth = _ResilientAuth(client.auth, self.policy)
+
+    def table(self, name):
+        return _ResilientQuery(self._client.table(name), self.policy, name)
+
+    from_ = table
+
+    def rpc(self, fn, params=None, **kwargs):
+        return _ResilientQuery(self._client.rpc(fn, params, **kwargs), self.policy, fn, "rpc")
+
+    def __getattr__(self, attr):
+        return getattr(self._client, attr)
@@ -0,0 +1,85 @@
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+        self.abandoned = False
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key into one.
+
+    The first caller for a key runs the function; callers arriving while it is
+    still running wait for it and get the same result (or the same exception)
+    instead of sending an identical request of their own. Nothing is cached:
+    once the call returns, the next caller for the key runs it again.
+
+    Only ordinary exceptions are shared. If the first caller is interrupted
+    (Streamlit stops or reruns its script by raising a BaseException), the
+    waiters aren't stopped with it: one of them runs the call instead.
+    """
+
+    def __init__(self):
+        self._calls = {}      # key -> _Call in flight
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, *args, **kwargs):
+        """Returns (value, shared); `shared` is True for callers that waited on another's call"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            call.done.wait()
+            if call.abandoned:
+                return self.do(key, fn, *args, **kwargs)
+            if call.error is not None:
+                raise call.error
+            return call.value, True
+        return self._run(key, call, fn, args, kwargs), False
+
+    def start(self, key, submit, fn, *args, **kwargs):
+        """
+        Start fn in the background with `submit` (e.g. an executor's submit)
+        unless a call for this key is already in flight; do() callers for the
+        key join it. Returns True if a call was started.
+        """
+        with self._lock:
+            if key in self._calls:
+                return False
+            call = self._calls[key] = _Call()
+        try:
+            submit(self._run, key, call, fn, args, kwargs)
+        except BaseException:
+            self._finish(key, call, abandoned=True)
+            raise
+        return True
+
+    def _run(self, key, call, fn, args, kwargs):
+        try:
+            call.value = fn(*args, **kwargs)
+        except Exception as e:
+            call.error = e
+            raise
+        except BaseException:
+            call.abandoned = True
+            raise
+        finally:
+            self._finish(key, call)
+        return call.value
+
+    def _finish(self, key, call, abandoned=False):
+        call.abandoned = call.abandoned or abandoned
+        with self._lock:
+            del self._calls[key]
+        call.done.set()
+
+    def in_flight(self):
+        """How many distinct calls are running right now"""
+        with self._lock:
+            return len(self._calls)
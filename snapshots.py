@@ -0,0 +1,87 @@
+"""
+On-disk match history snapshots, one Arrow file per user.
+
+A restart empties every in-memory cache, and right after a deploy every active
+player would fetch their whole history from Supabase at once. With snapshots,
+the first read after a restart memory-maps the user's last fetched history
+from disk instead and checks it against the server in the background.
+
+Each snapshot records the data watermark it was fetched at (the user's
+`user_summaries.updated_at`, which triggers bump on every match write), so
+checking it is a one-row query rather than a full fetch.
+"""
+import hashlib
+import logging
+import os
+import threading
+
+FORMAT_VERSION = "1"
+
+log = logging.getLogger(__name__)
+
+
+class Snapshot:
+    def __init__(self, frame, watermark):
+        self.frame = frame
+        self.watermark = watermark
+
+
+class SnapshotStore:
+    def __init__(self, directory):
+        self.directory = directory
+        self._served = set()            # users whose snapshot this process already used
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, user_id):
+        return os.path.join(self.directory, hashlib.sha1(str(user_id).encode()).hexdigest() + ".arrow")
+
+    def save(self, user_id, frame, watermark):
+        """Write atomically; a failed write just means no snapshot next time"""
+        import pyarrow as pa
+
+        path = self._path(user_id)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            metadata = dict(table.schema.metadata or {})
+            metadata.update({b"watermark": str(watermark or "").encode(), b"format": FORMAT_VERSION.encode()})
+            table = table.replace_schema_metadata(metadata)
+            with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+            os.replace(tmp, path)
+        except (OSError, pa.ArrowException) as e:
+            log.warning("snapshots: not saving %s: %s", user_id, e)
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def load(self, user_id):
+        """
+        The user's snapshot, or None. Only the first read per user in this
+        process uses it: later cache misses are TTL expiries, where the
+        in-memory history was newer than the file.
+        """
+        import pyarrow as pa
+
+        with self._lock:
+            if user_id in self._served:
+                return None
+            self._served.add(user_id)
+        path = self._path(user_id)
+        if not os.path.exists(path):
+            return None
+        try:
+            with pa.memory_map(path) as source:
+                table = pa.ipc.open_file(source).read_all()
+        except (OSError, pa.ArrowInvalid):
+            return None
+        metadata = table.schema.metadata or {}
+        if metadata.get(b"format") != FORMAT_VERSION.encode():
+            return None
+        return Snapshot(table.to_pandas(), metadata.get(b"watermark", b"").decode() or None)
+
+    def discard(self, user_id):
+        try:
+            os.remove(self._path(user_id))
+        except OSError:
+            pass
@@ -0,0 +1,56 @@
+import os
+import tomllib
+from typing import TYPE_CHECKING
+
+import streamlit as st
+
+from metrics import InstrumentedClient
+from resilience import TIMEOUT, ResilientClient
+
+if TYPE_CHECKING:
+    from supabase import Client
+
+# Set by headless entry points (tools/, api.py) that build their own client
+# instead of reading st.secrets
+_client = None
+
+
+def connect(url, key) -> "Client":
+    """A new client for `url`; `local://<dir>` gives the file-backed stand-in"""
+    if url.startswith("local://"):
+        from local_supabase import connect as connect_local
+        return connect_local(url)
+    from supabase import ClientOptions, create_client
+    # Don't hold a connection open much past the point where we stop waiting
+    return create_client(url, key, options=ClientOptions(postgrest_client_timeout=TIMEOUT * 2))
+
+
+def headless_settings(url=None, key=None):
+    """
+    (url, key) for entry points that run outside Streamlit: explicit values,
+    then SUPABASE_URL/SUPABASE_KEY, then .streamlit/secrets.toml
+    """
+    url = url or os.environ.get("SUPABASE_URL")
+    key = key or os.environ.get("SUPABASE_KEY")
+    secrets = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".streamlit", "secrets.toml")
+    if not url and os.path.exists(secrets):
+        with open(secrets, "rb") as f:
+            conf = tomllib.load(f).get("supabase", {})
+        url, key = conf.get("url"), key or conf.get("key")
+    return url, key
+
+
+def use_client(client):
+    """Make get_supabase() return `client` in this process"""
+    global _client
+    _client = client
+
+
+# Supabase Connection - the client library is imported on first use, so the
+# login screen doesn't pay for it until someone actually signs in. Every
+# request is timed, then run under the timeout/retry/circuit breaker policy.
+@st.cache_resource
+def get_supabase() -> "Client":
+    if _client is not None:
+        return ResilientClient(InstrumentedClient(_client))
+    return ResilientClient(InstrumentedClient(connect(st.secrets["supabase"]["url"], st.secrets["supabase"]["key"])))
@@ -0,0 +1,49 @@
+import os
+import random
+import sys
+import tempfile
+
+import pandas as pd
+import pytest
+
+# The app's modules live at the repo root, the tools next to them
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "tools")]
+
+# History snapshots written by tests go to a scratch directory, not the app's
+os.environ.setdefault("SNAPSHOT_DIR", tempfile.mkdtemp(prefix="smashtrack-snapshots-"))
+
+
+# ─── Random match histories ────────────────────────────────────────────────────
+
+NAMES = ["Amy Jones", "Bob Smith", "Cy Young", "Dee Dee", "Eve Ann", "Fay Lee", "Gus Hart", "Hal Moss"]
+
+
+def random_matches(seed, n=5_000, start="2020-01-01", days=1800, partner_levels=True):
+    """n matches spread over `days` days from `start`, about half doubles and half won"""
+    rng = random.Random(seed)
+    start = pd.Timestamp(start)
+    rows = []
+    for i in range(n):
+        doubles = rng.random() < 0.5
+        opp_1, opp_2, partner = rng.sample(NAMES, 3)
+        loser = rng.randint(0, 9)
+        won = rng.random() < 0.5
+        row = {
+            "id": i + 1, "match_date": start + pd.Timedelta(days=rng.randint(0, days)),
+            "match_type": "doubles" if doubles else "singles",
+            "opponent_1": opp_1, "opponent_2": opp_2 if doubles else None,
+            "player_partner": partner if doubles else None,
+            "opponent_1_level": rng.choice([2.5, 3.0, 3.5, 4.0]),
+            "opponent_2_level": rng.choice([2.5, 3.0, 3.5, 4.0]) if doubles else None,
+            "user_team_score": 11 if won else loser, "opponent_team_score": loser if won else 11,
+        }
+        if partner_levels:
+            row["player_partner_level"] = rng.choice([2.5, 3.0, 3.5]) if doubles else None
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+@pytest.fixture(scope="session")
+def make_matches():
+    return random_matches
@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import analytics
+from archive import MatchArchive, rollup, weighted
+from win_model import WinModel, level_history, levels_on
+
+BEFORE = pd.Timestamp("2023-06-15")
+# Level changes mid-month, so a month's archived matches were played at two levels
+HISTORY = level_history(pd.DataFrame({
+    "effective_date": pd.to_datetime(["2018-01-01", "2020-03-15", "2022-09-20"]),
+    "level": [2.5, 3.0, 3.5],
+}))
+
+
+@pytest.fixture(scope="module")
+def everything(make_matches):
+    return make_matches(seed=11, start="2018-01-01", days=2900)
+
+
+@pytest.fixture(scope="module")
+def archive(everything):
+    old = everything[everything["match_date"] < BEFORE]
+    return MatchArchive(BEFORE.date(), rollup(old.assign(user_level=levels_on(old["match_date"], HISTORY))))
+
+
+@pytest.fixture(scope="module")
+def combined(everything, archive):
+    """What the Dashboard sees for All Time: recent matches plus the rollups' stand-in rows"""
+    return pd.concat([weighted(everything[everything["match_date"] >= BEFORE]), archive.rows()], ignore_index=True)
+
+
+@pytest.fixture(scope="module")
+def model(everything):
+    return WinModel().updated(everything, 3.5, HISTORY)
+
+
+def test_rollups_compact_the_archive(everything, archive):
+    archived = (everything["match_date"] < BEFORE).sum()
+    assert archive.matches == archived
+    assert len(archive.rollups) < archived
+    assert archive.first_month == pd.Timestamp("2018-01-01").date()
+
+
+@pytest.mark.parametrize("match_type", analytics.MATCH_TYPES)
+def test_all_time_dashboard_is_exact(everything, combined, model, match_type):
+    build = lambda df: analytics.dashboard(analytics.add_results(analytics.filter_matches(df, match_type=match_type)),
+                                           model, 0.4)
+    want, got = build(everything), build(combined)
+
+    assert got["summary"] == want["summary"]
+    for name in ("monthly_res", "monthly_totals", "avg_long", "singles_level", "doubles_level"):
+        assert np.allclose(got[name].select_dtypes("number"), want[name].select_dtypes("number")), name
+    exp_got, exp_want = got["expectancy"], want["expectancy"]
+    assert np.isclose(exp_got["expected_wins"], exp_want["expected_wins"])
+    assert exp_got["actual_wins"] == exp_want["actual_wins"]
+    assert len(exp_got["upsets"]) + exp_got["archived_upsets"] == len(exp_want["upsets"])
+    assert np.allclose(exp_got["monthly_exp"][["expected", "actual"]], exp_want["monthly_exp"][["expected", "actual"]])
+
+
+def test_win_model_from_rollups_is_exact(combined, model):
+    refit = WinModel().updated(combined, 3.5, HISTORY)
+    assert np.allclose(refit.weights, model.weights)
+    assert refit.matches == model.matches
+
+
+def test_covers():
+    assert not MatchArchive().covers(None)
+    archive = MatchArchive(BEFORE.date(), rollup(pd.DataFrame({
+        "match_date": [pd.Timestamp("2023-01-10")], "match_type": ["singles"], "opponent_1_level": [3.0],
+        "user_team_score": [11], "opponent_team_score": [4],
+    })))
+    assert archive.covers(None)
+    assert archive.covers(pd.Timestamp("2023-01-01").date())
+    assert not archive.covers(BEFORE.date())
+
+
+def test_weighted_empty_frame_unchanged():
+    empty = pd.DataFrame()
+    assert weighted(empty) is empty
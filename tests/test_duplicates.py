@@ -0,0 +1,84 @@
+import random
+
+import pandas as pd
+import pytest
+
+from duplicates import DuplicateIndex
+from players import normalize_name
+
+N = 5_000
+
+
+@pytest.fixture(scope="module")
+def matches(make_matches):
+    rows = make_matches(seed=5, n=N).to_dict("records")
+    rng = random.Random(6)
+    # Re-entered copies: as typed (case and spacing vary), opponents swapped, levels changed
+    for i in range(500):
+        copy = dict(rng.choice(rows[:N]), id=N + i + 1)
+        how = rng.choice(["exact", "swapped", "near"])
+        copy["opponent_1"] = "  " + copy["opponent_1"].upper().replace(" ", "   ")
+        if how == "swapped" and copy["match_type"] == "doubles":
+            copy["opponent_1"], copy["opponent_2"] = copy["opponent_2"], copy["opponent_1"]
+            copy["opponent_1_level"], copy["opponent_2_level"] = copy["opponent_2_level"], copy["opponent_1_level"]
+        elif how == "near":
+            copy["opponent_1_level"] += 0.5
+        rows.append(copy)
+    return pd.DataFrame(rows)
+
+
+@pytest.fixture(scope="module")
+def index(matches):
+    return DuplicateIndex(matches)
+
+
+def test_groups_match_brute_force(matches, index):
+    def content(row):
+        opponents = sorted([normalize_name(row.opponent_1), normalize_name(row.opponent_2)])
+        return (row.match_date, row.match_type, normalize_name(row.player_partner),
+                *opponents, row.user_team_score, row.opponent_team_score)
+
+    seen, expected = {}, {}
+    for row in matches.sort_values("id").itertuples():
+        key = content(row)
+        if key in seen:
+            expected[row.id] = seen[key]
+        else:
+            seen[key] = row.id
+    assert index.duplicates().set_index("id")["keep_id"].to_dict() == expected
+
+
+def test_kinds(index):
+    counts = index.counts()
+    assert set(counts) <= {"exact", "swapped", "near"}
+    assert counts.get("exact") and counts.get("swapped") and counts.get("near")
+    assert len(index.duplicates(["exact"])) == counts["exact"]
+
+
+def test_find_new_match(matches, index):
+    original = matches.iloc[123].to_dict()
+    new = dict(original, id=None, opponent_1=original["opponent_1"].lower())
+    assert index.find(new) == ("exact", 124)
+    assert index.find(dict(new, user_team_score=99)) is None
+
+
+def test_find_swapped_and_near(matches, index):
+    doubles = matches[(matches["match_type"] == "doubles") & (matches["id"] <= N)].iloc[0].to_dict()
+    swapped = dict(doubles, opponent_1=doubles["opponent_2"], opponent_2=doubles["opponent_1"],
+                   opponent_1_level=doubles["opponent_2_level"], opponent_2_level=doubles["opponent_1_level"])
+    kind, match_id = index.find(swapped)
+    assert kind in ("exact", "swapped")
+    assert index.find(dict(doubles, opponent_1_level=9.0))[0] == "near"
+
+
+def test_unsaved_matches_are_never_offered_for_cleanup(matches):
+    pending = pd.concat([matches.head(1), matches.head(1).assign(id=-1)], ignore_index=True)
+    index = DuplicateIndex(pending)
+    assert index.duplicates().empty
+    assert index.find(matches.iloc[0].to_dict())[0] == "exact"
+
+
+def test_empty_history():
+    index = DuplicateIndex(pd.DataFrame())
+    assert index.find({"match_date": "2024-01-01"}) is None
+    assert index.duplicates().empty
@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from match_search import MatchSearchIndex, page
+
+
+@pytest.fixture(scope="module")
+def matches(make_matches):
+    return make_matches(seed=3, partner_levels=False)
+
+
+@pytest.fixture(scope="module")
+def index(matches):
+    levels = pd.DataFrame({
+        "effective_date": pd.to_datetime(["2020-01-01", "2021-06-01", "2023-03-15"]),
+        "level": [3.0, 3.5, 4.0],
+        "notes": ["Started playing", "Won club tournament", None],
+    })
+    return MatchSearchIndex(matches, levels)
+
+
+def has(df, col, word):
+    """Brute force: some word of `col` starts with `word`"""
+    return df[col].fillna("").str.lower().str.split().apply(lambda ws: any(w.startswith(word) for w in ws))
+
+
+def expected(df, name):
+    opp_level = df[["opponent_1_level", "opponent_2_level"]].mean(axis=1)
+    margin = (df["user_team_score"] - df["opponent_team_score"]).abs()
+    won = df["user_team_score"] > df["opponent_team_score"]
+    return {
+        "opponent prefix": has(df, "opponent_1", "jo") | has(df, "opponent_2", "jo"),
+        "partner and wins": has(df, "player_partner", "fay") & won,
+        "level notes and type": (df["match_date"] >= "2021-06-01") & (df["match_date"] < "2023-03-15")
+                                & (df["match_type"] == "doubles"),
+        "ranges": ~won & (margin <= 2) & (opp_level >= 3.5)
+                  & (df["match_date"] >= "2022-01-01") & (df["match_date"] <= "2022-12-31"),
+        "score range": df["user_team_score"].between(5, 9),
+    }[name]
+
+
+QUERIES = {
+    "opponent prefix": dict(text="jo", fields=["opponent"]),
+    "partner and wins": dict(text="fay", fields=["partner"], result="Win"),
+    "level notes and type": dict(text="tourn", fields=["notes"], match_type="doubles"),
+    "ranges": dict(result="Loss", margin=(0, 2), opponent_level=(3.5, None), date=("2022-01-01", "2022-12-31")),
+    "score range": dict(your_score=(5, 9)),
+}
+
+
+@pytest.mark.parametrize("name", list(QUERIES))
+def test_search_matches_brute_force(matches, index, name):
+    positions = index.search(**QUERIES[name])
+    assert set(index.match_ids(positions)) == set(matches.loc[expected(matches, name), "id"])
+
+
+def test_results_newest_first(matches, index):
+    dates = pd.Series(index.match_ids(index.search())).map(matches.set_index("id")["match_date"])
+    assert dates.is_monotonic_decreasing
+
+
+def test_names_are_normalized(index):
+    assert np.array_equal(index.search("  JO  ", fields=["opponent"]), index.search("jo", fields=["opponent"]))
+
+
+def test_unknown_filter_raises(index):
+    with pytest.raises(TypeError):
+        index.search(winners=(1, 2))
+
+
+def test_facet_counts_cover_the_results(index):
+    positions = index.search(match_type="singles")
+    counts = index.facet_counts(positions)
+    assert counts["match_type"] == {"singles": len(positions)}
+    assert sum(counts["result"].values()) == len(positions)
+
+
+def test_empty_history():
+    empty = MatchSearchIndex(pd.DataFrame())
+    assert len(empty.search("amy")) == 0
+    assert empty.bounds("date") is None
+
+
+def test_page_clamps_the_page_number():
+    positions = np.arange(60)
+    last, pages = page(positions, 3, 25)
+    assert list(last) == list(range(50, 60)) and pages == 3
+    beyond, _ = page(positions, 9, 25)
+    assert list(beyond) == list(last)
+    assert page(np.array([], dtype=int), 1, 25)[1] == 1
@@ -0,0 +1,68 @@
+import bisect
+import random
+
+import pytest
+
+from quantile_sketch import KLLSketch
+
+K = 200
+BOUND = 1.7 / K * 2     # twice the expected rank error, to allow for randomness
+
+
+def max_rank_error(sketch, data):
+    data = sorted(data)
+    worst = 0.0
+    for q in [i / 100 for i in range(1, 100)]:
+        value = data[int(q * (len(data) - 1))]
+        exact = bisect.bisect_right(data, value) / len(data)
+        worst = max(worst, abs(sketch.rank(value) - exact))
+    return worst
+
+
+def sample(name, n=100_000, seed=7):
+    rng = random.Random(seed)
+    return {
+        "uniform": lambda: [rng.random() for _ in range(n)],
+        "normal": lambda: [rng.gauss(0, 1) for _ in range(n)],
+        "skewed": lambda: [rng.expovariate(1.5) for _ in range(n)],
+        "sorted": lambda: sorted(rng.random() for _ in range(n)),
+    }[name]()
+
+
+@pytest.mark.parametrize("name", ["uniform", "normal", "skewed", "sorted"])
+def test_rank_error_within_bound(name):
+    data = sample(name)
+    sketch = KLLSketch(k=K, seed=1)
+    sketch.update(data)
+    assert sketch.n == len(data)
+    assert sketch._size() < 3 * K
+    assert max_rank_error(sketch, data) <= BOUND
+
+
+def test_merged_sketch_as_accurate_as_one_sketch():
+    data = sample("normal")
+    parts = [KLLSketch(k=K, seed=i) for i in range(8)]
+    for i, value in enumerate(data):
+        parts[i % 8].add(value)
+    merged = parts[0]
+    for part in parts[1:]:
+        merged.merge(part)
+    assert merged.n == len(data)
+    assert max_rank_error(merged, data) <= BOUND
+
+
+def test_round_trips_through_dict():
+    data = sample("uniform", n=10_000)
+    sketch = KLLSketch(k=K, seed=3)
+    sketch.update(data)
+    copy = KLLSketch.from_dict(sketch.to_dict())
+    assert copy.n == sketch.n
+    assert [copy.quantile(q) for q in (0.1, 0.5, 0.9)] == [sketch.quantile(q) for q in (0.1, 0.5, 0.9)]
+
+
+def test_small_inputs_are_exact():
+    sketch = KLLSketch(k=K, seed=0)
+    sketch.update([5, 1, 3])
+    assert sketch.rank(3) == pytest.approx(2 / 3)
+    assert sketch.quantile(0.0) == 1
+    assert sketch.quantile(1.0) == 5
@@ -0,0 +1,51 @@
+"""Resilience policy: reads are cut off at the deadline, writes never are."""
+import threading
+import time
+import types
+
+import pytest
+
+from resilience import Policy, ResilientClient, SupabaseUnavailable
+
+
+class SlowAuth:
+    """Auth calls that take `delay` seconds and record whether they finished"""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.finished = []
+
+    def _slow(self, name):
+        time.sleep(self.delay)
+        self.finished.append((name, threading.current_thread().name))
+        return types.SimpleNamespace(user=types.SimpleNamespace(id="u1"))
+
+    def sign_up(self, credentials):
+        return self._slow("sign_up")
+
+    def get_user(self, jwt=None):
+        return self._slow("get_user")
+
+
+def client(auth):
+    return ResilientClient(types.SimpleNamespace(auth=auth), Policy(timeout=0.05, attempts=1))
+
+
+def test_slow_sign_up_is_not_cut_off():
+    auth = SlowAuth(delay=0.2)
+    response = client(auth).auth.sign_up({"email": "a@b.c", "password": "secret"})
+    assert response.user.id == "u1"
+    # Ran to completion on the caller's thread, not abandoned on the side pool
+    assert auth.finished == [("sign_up", threading.current_thread().name)]
+
+
+def test_slow_get_user_times_out():
+    auth = SlowAuth(delay=0.2)
+    with pytest.raises(SupabaseUnavailable):
+        client(auth).auth.get_user("token")
+    assert auth.finished == []
+    # The abandoned read still finishes on the side pool
+    deadline = time.monotonic() + 2
+    while not auth.finished and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert [name for name, _ in auth.finished] == ["get_user"]
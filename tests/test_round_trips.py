@@ -0,0 +1,187 @@
+"""
+Round-trip budgets: how many Supabase requests each page rerun may make.
+
+Signs a player in through the real app (AppTest) against an in-memory,
+recording copy of the local Supabase stand-in, then counts what one rerun of
+each page costs: auth calls, table queries, RPCs and rows transferred. Each
+page is measured cold (first visit ever: caches empty, no snapshot on disk),
+warm (the same page rerun straight after) and after a restart (caches empty,
+the history snapshot from the cold visit on disk - background revalidation
+included). Anything over budget fails, and a failure lists every request the
+rerun made.
+
+When a change legitimately needs more requests, raise the budget here in the
+same commit, so the extra cost is a decision rather than an accident.
+"""
+import shutil
+import warnings
+
+import pytest
+
+from load_test import FakeSupabase, Session, _share_runtime, seed
+
+MATCHES = 200               # in the test player's history
+COUNTERS = ("auth", "queries", "rpcs", "rows")
+
+# Per page and scenario: the most of each counter one rerun may use. Row budgets
+# may be a function of the player's match count, for pages that need the whole
+# history (fetched once, then served from the match store).
+NONE = {"auth": 0, "queries": 0, "rpcs": 0, "rows": 0}
+BUDGETS = {
+    "views/00_About.py": {"cold": NONE, "warm": NONE, "restart": NONE},
+    "views/01_Profile.py": {
+        # + user_summaries: the archive cutoff (and match_rollups once something is archived)
+        "cold": {"auth": 0, "queries": 5, "rpcs": 1, "rows": lambda matches: matches + 30},
+        "warm": NONE,
+        "restart": {"auth": 0, "queries": 4, "rpcs": 1, "rows": 30},
+    },
+    "views/02_Match_Log.py": {
+        # + player_levels: level notes are searchable; + user_summaries: the archive cutoff;
+        # + win_model_buckets: the global win model (its rows are one per level differential)
+        "cold": {"auth": 0, "queries": 5, "rpcs": 2, "rows": lambda matches: matches + 80},
+        "warm": NONE,
+        "restart": {"auth": 0, "queries": 4, "rpcs": 2, "rows": 80},
+    },
+    "views/03_Dashboard.py": {
+        # + user_summaries: the archive cutoff
+        "cold": {"auth": 0, "queries": 4, "rpcs": 1, "rows": lambda matches: matches + 10},
+        "warm": NONE,
+        "restart": {"auth": 0, "queries": 3, "rpcs": 1, "rows": 10},
+    },
+    "views/04_Leaderboard.py": {
+        "cold": {"auth": 0, "queries": 1, "rpcs": 0, "rows": 10},
+        "warm": NONE,
+        "restart": {"auth": 0, "queries": 1, "rpcs": 0, "rows": 10},
+    },
+    "views/05_Matchmaking.py": {
+        # + user_summaries: the archive cutoff (the win model is fit over archived matches too);
+        # + player_levels and win_model_buckets: the win model's level history and global prior
+        "cold": {"auth": 0, "queries": 5, "rpcs": 2, "rows": lambda matches: matches + 80},
+        "warm": NONE,
+        "restart": {"auth": 0, "queries": 4, "rpcs": 2, "rows": 80},
+    },
+}
+# Data-layer operations, measured outside a page: label -> budget
+OPERATIONS = {
+    "delete 5 matches": {"auth": 0, "queries": 1, "rpcs": 0, "rows": 5},
+}
+
+
+class RecordingSupabase(FakeSupabase):
+    """FakeSupabase without latency that logs every request as (kind, name, rows)"""
+
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    def request(self, kind, name, call):
+        response = super().request(kind, name, call)
+        data = getattr(response, "data", None)
+        rows = len(data) if isinstance(data, list) else int(data is not None)
+        self.calls.append((kind, name, rows))
+        return response
+
+    def take(self):
+        """Counters for the requests since the last call, plus the raw log"""
+        calls, self.calls = self.calls, []
+        counts = {
+            "auth": sum(kind == "auth" for kind, _, _ in calls),
+            "queries": sum(kind == "query" for kind, _, _ in calls),
+            "rpcs": sum(kind == "rpc" for kind, _, _ in calls),
+            "rows": sum(rows for _, _, rows in calls),
+        }
+        return counts, calls
+
+
+def clear_caches():
+    import streamlit as st
+    st.cache_data.clear()
+    st.cache_resource.clear()
+
+
+def settle():
+    """Wait for background snapshot checks to finish"""
+    import utils
+    utils.get_revalidation_pool().shutdown(wait=True)
+
+
+def measure_pages(db, email):
+    """{(page, scenario): (counts, calls)}"""
+    import utils
+
+    results = {}
+    for page in BUDGETS:
+        session = Session(email, [], 60)
+        session.login()
+        settle()
+        clear_caches()
+        shutil.rmtree(utils.SNAPSHOT_DIR, ignore_errors=True)
+        db.take()
+        session.at.switch_page(page)
+        for scenario in ("cold", "warm"):
+            session._rerun(scenario)
+            results[page, scenario] = db.take()
+
+        settle()
+        clear_caches()
+        db.take()
+        session._rerun("restart")
+        settle()
+        results[page, "restart"] = db.take()
+    return results
+
+
+def measure_operations(db, user_id):
+    import utils
+
+    ids = [m["id"] for m in db.rows("matches") if m["user_id"] == user_id][:5]
+    db.take()
+    utils.deleteMatches(user_id, ids)
+    return {"delete 5 matches": db.take()}
+
+
+def over_budget(counts, budget, matches):
+    limits = {name: limit(matches) if callable(limit) else limit for name, limit in budget.items()}
+    return [f"{name} {counts[name]} > {limits[name]}" for name in COUNTERS if counts[name] > limits[name]]
+
+
+def describe(problems, calls):
+    return "; ".join(problems) + "".join(f"\n    {kind:<6} {name:<20} {rows:>6} rows" for kind, name, rows in calls)
+
+
+@pytest.fixture(scope="module")
+def measured():
+    from batch_reports import _quiet_streamlit
+    _quiet_streamlit()
+    warnings.simplefilter("ignore", FutureWarning)
+    import supabase_client
+
+    db = RecordingSupabase()
+    email = seed(db, 1, MATCHES)[0]
+    user_id = db.rows("users")[0]["id"]
+    supabase_client.use_client(db)
+    _share_runtime()
+
+    results = measure_pages(db, email)
+    results.update(measure_operations(db, user_id))
+    return results
+
+
+@pytest.mark.parametrize("page,scenario", [(page, s) for page, scenarios in BUDGETS.items() for s in scenarios])
+def test_page_within_budget(measured, page, scenario):
+    counts, calls = measured[page, scenario]
+    problems = over_budget(counts, BUDGETS[page][scenario], MATCHES)
+    assert not problems, describe(problems, calls)
+
+
+@pytest.mark.parametrize("page", list(BUDGETS))
+def test_warm_rerun_makes_no_requests(measured, page):
+    counts, calls = measured[page, "warm"]
+    assert not calls, describe([f"{counts}"], calls)
+
+
+@pytest.mark.parametrize("operation", list(OPERATIONS))
+def test_operation_within_budget(measured, operation):
+    counts, calls = measured[operation]
+    problems = over_budget(counts, OPERATIONS[operation], MATCHES)
+    assert not problems, describe(problems, calls)
@@ -0,0 +1,27 @@
+"""History snapshots: a frame that can't be written is skipped, never fatal."""
+import pandas as pd
+
+import utils
+from snapshots import SnapshotStore
+
+# An object column Arrow can't type: a string and an int
+UNWRITABLE = pd.DataFrame({"id": [1, 2], "match_date": pd.to_datetime(["2025-01-02", "2025-01-01"]),
+                           "notes": ["close game", 11]})
+
+
+def test_save_skips_frames_arrow_cannot_convert(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    store.save("u1", UNWRITABLE, "2025-01-02T00:00:00+00:00")
+    assert list(tmp_path.iterdir()) == []
+    assert store.load("u1") is None
+
+
+def test_get_matches_survives_a_failed_snapshot(tmp_path, monkeypatch):
+    monkeypatch.setattr(utils, "get_snapshots", lambda: SnapshotStore(str(tmp_path)))
+    monkeypatch.setattr(utils, "get_supabase", lambda: None)
+    monkeypatch.setattr(utils, "fetch_watermark", lambda user_id, client=None: "2025-01-02T00:00:00+00:00")
+    monkeypatch.setattr(utils, "fetch_matches", lambda user_id, client=None: UNWRITABLE.copy())
+
+    df = utils.getMatches("snapshot-test-user")
+    assert df["id"].tolist() == [1, 2]
+    assert list(tmp_path.iterdir()) == []
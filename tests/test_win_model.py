@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from win_model import (
+    BUCKET_COLUMNS, FALLBACK_WEIGHTS, MIN_MATCHES, WinModel, fit_global, level_history, levels_on, user_levels,
+)
+
+HISTORY = level_history(pd.DataFrame({
+    "effective_date": pd.to_datetime(["2024-06-01", "2023-01-01"]),     # newest first, as fetched
+    "level": [4.0, 3.0],
+    "notes": [None, "Started"],
+}))
+
+
+def singles(dates, opponent_levels, won):
+    return pd.DataFrame({
+        "id": range(1, len(dates) + 1),
+        "match_date": pd.to_datetime(dates),
+        "match_type": "singles",
+        "opponent_1_level": opponent_levels,
+        "user_team_score": [11 if w else 5 for w in won],
+        "opponent_team_score": [5 if w else 11 for w in won],
+    })
+
+
+def test_level_history_is_oldest_first():
+    assert [level for _, level in HISTORY] == [3.0, 4.0]
+
+
+def test_levels_on_each_match_date():
+    dates = pd.to_datetime(["2022-05-01", "2023-01-01", "2024-05-31", "2024-06-01", "2025-01-01"])
+    assert list(levels_on(dates, HISTORY)) == [3.0, 3.0, 3.0, 4.0, 4.0]
+    assert np.isnan(levels_on(dates, ())).all()
+
+
+def test_user_levels_prefer_rollup_level_then_history_then_current():
+    df = pd.DataFrame({"match_date": pd.to_datetime(["2023-06-01", "2024-07-01"]), "user_level": [3.5, np.nan]})
+    assert list(user_levels(df, HISTORY, 4.5)) == [3.5, 4.0]
+    assert list(user_levels(df.drop(columns="user_level"), (), 4.5)) == [4.5, 4.5]
+
+
+def test_score_uses_level_at_match_time():
+    # Both matches are against a 3.0: level with the user then, a step below them now
+    df = singles(["2023-06-01", "2024-07-01"], [3.0, 3.0], [True, True])
+    model = WinModel([0.0, 2.0, 0.0], user_level=4.0, history=HISTORY)
+    then, now = model.score(df)
+    assert then == pytest.approx(0.5)
+    assert now > 0.8
+
+
+def test_global_fit_recovers_weights_from_buckets():
+    rng = np.random.default_rng(0)
+    true = np.array([0.2, 1.5, -0.3])
+    diffs = np.round(np.arange(-1.5, 1.51, 0.25), 2)
+    rows = []
+    for diff in diffs:
+        for doubles in (False, True):
+            n = 4000
+            p = 1 / (1 + np.exp(-(true @ [1.0, diff, float(doubles)])))
+            wins = rng.binomial(n, p)
+            rows += [(diff, doubles, True, wins), (diff, doubles, False, n - wins)]
+    weights = fit_global(pd.DataFrame(rows, columns=BUCKET_COLUMNS))
+    assert np.allclose(weights, true, atol=0.05)
+
+
+def test_global_fit_falls_back_without_enough_matches():
+    few = pd.DataFrame([(0.5, False, True, MIN_MATCHES - 1)], columns=BUCKET_COLUMNS)
+    assert np.array_equal(fit_global(few), FALLBACK_WEIGHTS)
+    assert np.array_equal(fit_global(pd.DataFrame(columns=BUCKET_COLUMNS)), FALLBACK_WEIGHTS)
+
+
+def test_global_prior_is_the_fallback_and_the_shrinkage_target():
+    prior = np.array([0.1, 1.0, 0.2])
+    df = singles(["2024-07-01"] * 3, [3.0] * 3, [True] * 3)
+    small = WinModel().updated(df, 4.0, HISTORY, prior)
+    assert small.is_global and np.array_equal(small.weights, prior)
+
+    # Heavy regularization: the fit stays at the prior whatever the matches say
+    many = singles(["2024-07-01"] * 40, [3.0] * 40, [False] * 40)
+    fit = WinModel().updated(many, 4.0, HISTORY, prior, l2=1e9)
+    assert np.allclose(fit.weights, prior, atol=1e-4)
+
+
+def test_refits_when_level_history_changes():
+    df = singles(["2023-06-01"] * 20, [3.0] * 20, [True, False] * 10)
+    model = WinModel().updated(df, 4.0, HISTORY)
+    assert model.updated(df, 4.0, HISTORY) is model
+    assert model.updated(df, 4.0, level_history(pd.DataFrame({
+        "effective_date": pd.to_datetime(["2023-01-01"]), "level": [4.0],
+    }))) is not model
+
+
+@pytest.mark.filterwarnings("error")
+def test_separable_buckets_fit_without_overflow():
+    # Every match above a level differential of zero won, every one below lost
+    diffs = [d for d in np.arange(-3.5, 3.51, 0.25) if d != 0]
+    buckets = pd.DataFrame([
+        {"level_diff": diff, "doubles": doubles, "won": diff > 0, "matches": 100_000}
+        for diff in diffs for doubles in (False, True)
+    ])
+    weights = fit_global(buckets)
+    assert np.isfinite(weights).all()
+    assert weights[1] > 0
+
+    extreme = WinModel(weights * 100, user_level=5.5)
+    p = extreme.predict_proba([[1.0, -3.5, 0.0], [1.0, 3.5, 1.0]])
+    assert p[0] == pytest.approx(0.0) and p[1] == pytest.approx(1.0)
@@ -0,0 +1,215 @@
+"""
+Headless performance reports for many players at once.
+
+Builds each user's Dashboard numbers (summary, monthly results, scoring,
+opponent levels, expected vs. actual wins) with the same data layer and
+aggregations as the app, without starting a Streamlit server. Users are fanned
+out over a process pool; each worker opens one Supabase connection and reuses
+it for every user it handles, and each report is written to disk as soon as
+it's built.
+
+    python tools/batch_reports.py --out reports --days 7
+    python tools/batch_reports.py --url local://.local_db --users <uuid> <uuid> --format json
+
+The connection comes from --url/--key, then SUPABASE_URL/SUPABASE_KEY, then
+.streamlit/secrets.toml. Reading other users' matches needs a service-role key
+(or a local:// database).
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+PAGE_SIZE = 1000   # PostgREST's default row limit
+
+
+# ─── Worker ────────────────────────────────────────────────────────────────────
+
+def _quiet_streamlit():
+    # The data layer's caches work without a Streamlit runtime but warn about it
+    from streamlit import config
+    from streamlit.logger import set_log_level
+    config.set_option("logger.level", "error")   # for loggers created later
+    set_log_level("error")
+
+
+def _init_worker(url, key):
+    """Runs once per worker process: one connection, shared by every report it builds"""
+    _quiet_streamlit()
+    import supabase_client
+    supabase_client.use_client(supabase_client.connect(url, key))
+
+
+def _records(df):
+    return json.loads(df.to_json(orient="records", date_format="iso"))
+
+
+def build_report(user_id, period, date_range, today):
+    """The Dashboard's numbers for one user, as plain JSON-able data plus the frames"""
+    import analytics
+    import utils
+    from win_model import UPSET_THRESHOLD, as_level
+
+    df = utils.get_dashboard_matches(user_id, period, "All", date_range, today)
+    data = analytics.dashboard(df, utils.get_win_model(user_id), UPSET_THRESHOLD)
+    report = {
+        "user_id": user_id,
+        "period": period if date_range is None else [d.isoformat() for d in date_range],
+        "generated_at": today.isoformat(),
+        "level": as_level(utils.getCurrentLevel_safe(user_id)),
+        "summary": data.pop("summary"),
+    }
+    exp = data.pop("expectancy", None)
+    if exp is not None:
+        if exp["has_level"] and not exp["empty"]:
+            data["monthly_exp"] = exp.pop("monthly_exp")
+            data["upsets"] = exp.pop("upsets")
+        report["expectancy"] = exp
+    report.update({name: _records(frame) for name, frame in data.items()})
+
+    # Reports are one-shot, so don't keep every user's history in the worker
+    utils.get_match_store().invalidate(user_id)
+    return report, data
+
+
+def render_html(report, frames):
+    import charts
+
+    parts = [
+        f"<h1>Performance Report</h1><p>Player {report['user_id']} &middot; "
+        f"{report['period']} &middot; generated {report['generated_at']}</p>"
+    ]
+    if report["level"] is not None:
+        parts.append(f"<p>Current level: <b>{report['level']:.1f}</b></p>")
+    stats = report["summary"]
+    if stats is None:
+        parts.append("<p>No matches in this period.</p>")
+    else:
+        parts.append(
+            "<table><tr><th>Matches</th><th>Wins</th><th>Losses</th><th>Win Rate</th></tr>"
+            f"<tr><td>{stats['total']}</td><td>{stats['wins']}</td><td>{stats['losses']}</td>"
+            f"<td>{stats['win_rate']:.1f}%</td></tr></table>"
+        )
+        figures = [
+            charts.monthly_results_chart(frames["monthly_res"]),
+            charts.monthly_totals_chart(frames["monthly_totals"]),
+            charts.average_points_chart(frames["avg_long"]),
+        ]
+        if not frames["singles_level"].empty:
+            figures.append(charts.singles_level_chart(frames["singles_level"]))
+        if not frames["doubles_level"].empty:
+            figures.append(charts.doubles_level_chart(frames["doubles_level"]))
+        if "monthly_exp" in frames:
+            figures.append(charts.expected_wins_chart(frames["monthly_exp"]))
+        # plotly.js is loaded once, by the first chart
+        for i, fig in enumerate(figures):
+            parts.append(fig.to_html(full_html=False, include_plotlyjs="cdn" if i == 0 else False))
+        if "upsets" in frames and not frames["upsets"].empty:
+            parts.append("<h2>Upset Wins</h2>" + frames["upsets"].to_html(index=False))
+    return (
+        "<!DOCTYPE html><html><head><meta charset='utf-8'>"
+        f"<title>SmashTrack report</title></head><body>{''.join(parts)}</body></html>"
+    )
+
+
+def report_user(user_id, out_dir, formats, period, date_range, today):
+    """Build and write one user's report; returns a manifest entry"""
+    started = time.perf_counter()
+    try:
+        report, frames = build_report(user_id, period, date_range, today)
+        files = []
+        if "json" in formats:
+            files.append(os.path.join(out_dir, f"{user_id}.json"))
+            with open(files[-1], "w") as f:
+                json.dump(report, f, default=str)
+        if "html" in formats:
+            files.append(os.path.join(out_dir, f"{user_id}.html"))
+            with open(files[-1], "w") as f:
+                f.write(render_html(report, frames))
+        matches = report["summary"]["total"] if report["summary"] else 0
+        return {"user_id": user_id, "ok": True, "matches": matches, "files": files,
+                "seconds": round(time.perf_counter() - started, 4)}
+    except Exception as e:
+        return {"user_id": user_id, "ok": False, "error": repr(e),
+                "seconds": round(time.perf_counter() - started, 4)}
+
+
+# ─── Driver ────────────────────────────────────────────────────────────────────
+
+def all_user_ids(url, key):
+    """
+    Every user with at least one match, read a page at a time from
+    user_summaries (its counts include archived matches, so players whose
+    matches are all archived still get a report)
+    """
+    import supabase_client
+    client = supabase_client.connect(url, key)
+    users, start = [], 0
+    while True:
+        page = client.table("user_summaries").select("user_id").gt("matches", 0) \
+                     .order("user_id").range(start, start + PAGE_SIZE - 1).execute().data or []
+        users.extend(r["user_id"] for r in page)
+        if len(page) < PAGE_SIZE:
+            return users
+        start += PAGE_SIZE
+
+
+def main(argv=None):
+    import analytics
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", help="Supabase URL, or local://<dir> for the local stand-in")
+    parser.add_argument("--key", help="Supabase key (service role to read every user)")
+    parser.add_argument("--users", nargs="+", help="user ids (default: everyone with matches)")
+    parser.add_argument("--out", default="reports", help="output directory")
+    parser.add_argument("--format", nargs="+", choices=["html", "json"], default=["html", "json"])
+    parser.add_argument("--period", choices=[p for p in analytics.PERIODS if p != "Custom"],
+                        default="All Time")
+    parser.add_argument("--days", type=int, help="only the last N days (overrides --period)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args(argv)
+
+    _quiet_streamlit()
+    import supabase_client
+    url, key = supabase_client.headless_settings(args.url, args.key)
+    if not url:
+        sys.exit("No Supabase URL: pass --url, set SUPABASE_URL, or add .streamlit/secrets.toml")
+    today = date.today()
+    period, date_range = args.period, None
+    if args.days:
+        period, date_range = "Custom", (today - timedelta(days=args.days), today)
+    users = args.users or all_user_ids(url, key)
+    os.makedirs(args.out, exist_ok=True)
+
+    started = time.perf_counter()
+    done = failed = 0
+    with open(os.path.join(args.out, "manifest.jsonl"), "w") as manifest, \
+         ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker,
+                             initargs=(url, key)) as pool:
+        futures = [
+            pool.submit(report_user, user_id, args.out, args.format, period, date_range, today)
+            for user_id in users
+        ]
+        for future in as_completed(futures):
+            entry = future.result()
+            manifest.write(json.dumps(entry) + "\n")
+            manifest.flush()
+            done += 1
+            failed += not entry["ok"]
+            if not entry["ok"]:
+                print(f"  {entry['user_id']}: {entry['error']}", file=sys.stderr)
+
+    elapsed = time.perf_counter() - started
+    print(f"{done} reports ({failed} failed) in {elapsed:.2f}s "
+          f"- {done / elapsed if elapsed else 0:.1f} users/s with {args.workers} workers")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+"""
+Fault test: what players see while Supabase is slow, flaky or down.
+
+Drives the real app through AppTest (like the load test) against an
+in-memory copy of the local Supabase stand-in, injecting faults between
+steps and checking that:
+
+- during an outage, pages with expired cached data still render (from the
+  stale copy, with a "data as of" note) and the circuit breaker opens, so
+  later requests fail at once instead of each waiting out a timeout;
+- a page with nothing cached shows an error rather than crashing or hanging;
+- requests that hang are cut off at the timeout;
+- with a fraction of requests failing, retries keep pages working;
+- once Supabase is back, the breaker closes and fresh data replaces the stale.
+
+    python tools/fault_test.py              # exits 1 if a check fails
+    python tools/fault_test.py --fail 0.3 --verbose
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from load_test import FakeSupabase, Session, _share_runtime, seed
+
+TIMEOUT = 0.5           # per Supabase call, shortened so the test runs quickly
+BREAKER_RESET = 1.0
+PAGES = ("views/01_Profile.py", "views/02_Match_Log.py", "views/03_Dashboard.py", "views/05_Matchmaking.py")
+
+
+def settle():
+    import utils
+    utils.get_revalidation_pool().submit(lambda: None).result()
+    deadline = time.monotonic() + 10
+    while utils.get_flights().in_flight() and time.monotonic() < deadline:
+        time.sleep(0.02)
+
+
+def expire(user_id):
+    """Age the user's cached data past its TTL, as if they'd been idle a while"""
+    import utils
+    for store in (utils.get_match_store(), utils.get_level_store()):
+        with store._lock:
+            value, fetched_at = store._entries[user_id]
+            store._entries[user_id] = (value, fetched_at - store.ttl - 1)
+
+
+def visit(session, page):
+    """Rerun `page`; returns (seconds, captions, errors)"""
+    session.at.switch_page(page)
+    start = time.perf_counter()
+    session.at.run()
+    seconds = time.perf_counter() - start
+    if session.at.exception:
+        raise RuntimeError(f"{page}: {session.at.exception[0].value}")
+    return seconds, [c.value for c in session.at.caption], [e.value for e in session.at.error]
+
+
+def stale_note(captions):
+    return any(c.startswith(":material/history: Data as of") for c in captions)
+
+
+def scenarios(db, emails, fail_rate, verbose):
+    """Yield (check, passed, detail)"""
+    import utils
+    policy = utils.get_supabase().policy
+    policy.timeout = TIMEOUT
+    policy.breaker.reset_after = BREAKER_RESET
+    breaker = policy.breaker
+
+    # Player 0 has been using the app; player 1 signs in during the outage
+    player = Session(emails[0], [], 60)
+    player.login()
+    for page in PAGES:
+        visit(player, page)
+    settle()
+    user_id = db.rows("users")[0]["id"]
+
+    # ─── Outage ───
+    expire(user_id)
+    db.faults.down = True
+    for page in PAGES:
+        seconds, captions, errors = visit(player, page)
+        if verbose:
+            print(f"    outage {os.path.basename(page)}: {seconds * 1000:.0f} ms, breaker {breaker.state}")
+        yield f"outage: {os.path.basename(page)} serves stale data", stale_note(captions) and not errors, \
+            f"{seconds * 1000:.0f} ms, errors {errors}"
+    settle()
+    yield "outage: circuit breaker opens", breaker.state == "open", breaker.state
+    seconds, _, _ = visit(player, PAGES[1])
+    yield "outage: rerun with the circuit open is fast", seconds < TIMEOUT, f"{seconds * 1000:.0f} ms"
+
+    newcomer = Session(emails[1], [], 60)
+    newcomer.at.session_state["user"] = _user(db, 1)
+    newcomer.at.session_state["user_email"] = emails[1]
+    seconds, _, errors = visit(newcomer, PAGES[2])
+    yield "outage: nothing cached -> error message", any("Can't reach the database" in e for e in errors), \
+        f"{seconds * 1000:.0f} ms, errors {errors}"
+
+    # ─── Hanging requests ───
+    db.faults.down = False
+    time.sleep(BREAKER_RESET)
+    db.faults.slow, db.faults.delay = 1.0, TIMEOUT * 4
+    utils.get_match_store().invalidate(db.rows("users")[1]["id"])
+    seconds, _, errors = visit(newcomer, PAGES[1])
+    limit = TIMEOUT * policy.attempts + policy.max_backoff * (policy.attempts - 1) + 1
+    yield "slow: hung requests are cut off at the timeout", seconds < limit and bool(errors), \
+        f"{seconds:.1f} s (limit {limit:.1f} s)"
+    db.faults.slow = 0.0
+    time.sleep(BREAKER_RESET)
+
+    # ─── Flaky ───
+    db.faults.fail = fail_rate
+    failures = 0
+    for _ in range(3):
+        utils.clear_user_cache()
+        for page in PAGES:
+            _, _, errors = visit(player, page)
+            failures += bool(errors)
+            if breaker.state != "closed":
+                time.sleep(BREAKER_RESET)
+    db.faults.fail = 0.0
+    yield f"flaky ({fail_rate:.0%} of requests fail): retries keep pages up", failures == 0, \
+        f"{failures} of {3 * len(PAGES)} page views failed, {db.faults.injected} faults injected"
+
+    # ─── Recovery ───
+    time.sleep(BREAKER_RESET)
+    expire(user_id)
+    visit(player, PAGES[1])         # serves stale, starts the refresh
+    settle()
+    _, captions, errors = visit(player, PAGES[1])
+    yield "recovery: breaker closes", breaker.state == "closed", breaker.state
+    yield "recovery: fresh data replaces stale", not stale_note(captions) and not errors, str(captions)
+
+
+def _user(db, index):
+    return db.auth._as_user(db.rows("users")[index])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--fail", type=float, default=0.2, help="fraction of requests failing in the flaky phase")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    os.environ["SNAPSHOT_DIR"] = tempfile.mkdtemp(prefix="smashtrack-snapshots-")
+    from batch_reports import _quiet_streamlit
+    _quiet_streamlit()
+    warnings.simplefilter("ignore", FutureWarning)
+    import supabase_client
+    from local_supabase import Faults
+
+    db = FakeSupabase()
+    emails = seed(db, 2, 100)
+    db.faults = Faults(seed=0)
+    supabase_client.use_client(db)
+    _share_runtime()
+
+    failures = 0
+    for check, passed, detail in scenarios(db, emails, args.fail, args.verbose):
+        failures += not passed
+        print(f"{'ok  ' if passed else 'FAIL'} {check:<58} {detail}")
+    print("FAIL" if failures else "ok")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
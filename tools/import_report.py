@@ -0,0 +1,72 @@
+"""
+Import-time report for the app's entry points.
+
+Runs each import in a fresh interpreter with `python -X importtime` and prints
+the total time plus the slowest top-level packages, e.g.
+
+    python tools/import_report.py            # auth path vs. page path
+    python tools/import_report.py utils app  # any modules
+"""
+import os
+import re
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# What a logged-out visitor loads vs. what a page loads
+DEFAULT_TARGETS = {
+    "auth screen": "auth_utils",
+    "pages (data layer)": "utils",
+    "dashboard": "utils, analytics, charts, figure_cache",
+}
+
+LINE = re.compile(r"import time:\s+\d+ \|\s+(\d+) \|( +)(\S+)")
+RUNS = 3
+
+
+def _import_once(modules):
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {modules}"],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+    targets = {m.strip() for m in modules.split(",")}
+    total, children = 0.0, []
+    for line in proc.stderr.splitlines():
+        m = LINE.match(line)
+        if not m:
+            continue
+        ms, depth, name = int(m.group(1)) / 1000, len(m.group(2)), m.group(3)
+        if depth == 1 and name in targets:
+            total += ms
+        elif depth == 3:
+            # imported directly by a target (or by interpreter startup, filtered below)
+            children.append((ms, name))
+    return total, children
+
+
+def measure(modules):
+    """Best-of-RUNS cold import: (total_ms, [(cumulative_ms, direct import)])"""
+    runs = [_import_once(modules) for _ in range(RUNS)]
+    total, children = min(runs, key=lambda run: run[0])
+    startup = {"os", "codecs", "encodings.aliases", "posix", "importlib.readers", "certifi"}
+    return total, sorted((c for c in children if c[1] not in startup and c[0] >= 1), reverse=True)
+
+
+def main(argv):
+    targets = {m: m for m in argv} if argv else DEFAULT_TARGETS
+    for label, modules in targets.items():
+        try:
+            total, top = measure(modules)
+        except RuntimeError as e:
+            print(f"{label:<22} failed: {e}")
+            continue
+        print(f"{label:<22} {total:8.1f} ms   (import {modules})")
+        for ms, name in top[:6]:
+            print(f"    {ms:8.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,391 @@
+"""
+Load test: many players using one Streamlit process at the same time.
+
+Each simulated session drives the real app through Streamlit's AppTest: it
+signs in on the auth screen, opens Match History, flips through the Dashboard
+filters and adds a match, then keeps cycling through those pages. Sessions
+run concurrently in threads, like sessions on one Streamlit worker, against an
+in-memory copy of the local Supabase stand-in that sleeps for a configurable
+time on every request to simulate the network.
+
+    python tools/load_test.py --sessions 20 --rounds 3 --latency 0.03
+    python tools/load_test.py --sessions 50 --matches 400 --latency 0.08 --jitter 0.04
+    python tools/load_test.py --sessions 10 --tabs 3    # ten players, each in three tabs
+
+Reports rerun latency percentiles per step and overall, reruns per second,
+process memory growth per session, and how many reads were coalesced into
+another session's identical in-flight fetch. Compare step timings to see whether
+the time goes on loading matches (login, first Match History), table styling
+(Match History) or charts (Dashboard filters).
+"""
+import argparse
+import datetime
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import traceback
+import types
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from unittest.mock import MagicMock
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from local_supabase import LocalAuth, LocalQuery, LocalSupabase
+
+PASSWORD = "load-test"
+NAMES = ["John Doe", "Amy Jones", "Bob Smith", "Cy Young", "Dee Dee", "Eve Ann",
+         "Fay Lee", "Gus Hart", "Hal Moss", "Ivy Cole", "Jay Park", "Kim Lee"]
+LEVELS = [2.5, 3.0, 3.5, 4.0, 4.5]
+
+
+# ─── In-process Supabase ───────────────────────────────────────────────────────
+
+class SlowQuery(LocalQuery):
+    def execute(self):
+        return self._db.request("query", self._table, super().execute)
+
+
+class SessionAuth(LocalAuth):
+    """
+    LocalAuth keeps one signed-in user per client. Every session shares the
+    client here, so the signed-in user lives in the calling session's state
+    instead - otherwise each session would see whoever signed in last.
+    """
+
+    @property
+    def _user(self):
+        import streamlit as st
+        return st.session_state.get("_load_test_user")
+
+    @_user.setter
+    def _user(self, user):
+        import streamlit as st
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        if get_script_run_ctx() is not None:     # not when LocalAuth.__init__ clears it
+            st.session_state["_load_test_user"] = user
+
+    def sign_in_with_password(self, credentials):
+        return self._db.request("auth", "sign_in", partial(super().sign_in_with_password, credentials))
+
+    def get_user(self, jwt=None):
+        return self._db.request("auth", "get_user", partial(super().get_user, jwt))
+
+
+class FakeSupabase(LocalSupabase):
+    """LocalSupabase kept in memory, with a simulated round trip on every request"""
+
+    def __init__(self, latency=0.0, jitter=0.0, seed=0):
+        super().__init__(tempfile.mkdtemp(prefix="smashtrack-load-"))
+        self.auth = SessionAuth(self)
+        self.latency = latency
+        self.jitter = jitter
+        self.requests = 0
+        self._rng = random.Random(seed)
+
+    def request(self, kind, name, call):
+        """Every table query, RPC and auth call goes through here: wait, then run it"""
+        with self.lock:
+            self.requests += 1
+            delay = self.latency + self._rng.uniform(-self.jitter, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+        return call()
+
+    def save(self, table):
+        pass
+
+    def table(self, name):
+        return SlowQuery(self, name)
+
+    from_ = table
+
+    def rpc(self, fn, params):
+        call = super().rpc(fn, params)
+        return types.SimpleNamespace(execute=partial(self.request, "rpc", fn, call.execute))
+
+
+def seed(db, users, matches, seed=0):
+    """`users` players with `matches` matches each; returns their emails"""
+    rng = random.Random(seed)
+    today = datetime.date.today()
+    emails = []
+    for u in range(users):
+        user_id = f"00000000-0000-4000-8000-{u:012d}"
+        email = f"player{u}@load.test"
+        emails.append(email)
+        db.rows("users").append({
+            "id": user_id, "email": email, "password": LocalAuth._hash(PASSWORD),
+            "user_metadata": {"display_name": f"Load Player {chr(65 + u % 26)}"},
+            "created_at": "2025-01-01T00:00:00+00:00",
+        })
+        db.rows("player_levels").append({
+            "id": db.next_id("player_levels"), "user_id": user_id,
+            "level": rng.choice(LEVELS), "effective_date": "2025-01-01", "notes": "load test",
+        })
+        player_ids = {}
+        for name in NAMES:
+            player_ids[name] = db.next_id("players")
+            db.rows("players").append({
+                "id": player_ids[name], "user_id": user_id, "name": name,
+                "normalized_name": name.lower(), "aliases": [],
+            })
+        next_match = db.next_id("matches")
+        for i in range(matches):
+            doubles = rng.random() < 0.5
+            opp_1, opp_2, partner = rng.sample(NAMES, 3)
+            won = rng.random() < 0.5
+            loser = rng.randint(0, 9)
+            match_date = today - datetime.timedelta(days=rng.randint(0, 730))
+            db.rows("matches").append({
+                "id": next_match + i, "user_id": user_id,
+                "match_date": match_date.isoformat(),
+                "match_type": "doubles" if doubles else "singles",
+                "opponent_1": opp_1, "opponent_1_id": player_ids[opp_1],
+                "opponent_1_level": rng.choice(LEVELS),
+                "opponent_2": opp_2 if doubles else None,
+                "opponent_2_id": player_ids[opp_2] if doubles else None,
+                "opponent_2_level": rng.choice(LEVELS) if doubles else None,
+                "player_partner": partner if doubles else None,
+                "player_partner_id": player_ids[partner] if doubles else None,
+                "player_partner_level": rng.choice(LEVELS) if doubles else None,
+                "user_team_score": 11 if won else loser,
+                "opponent_team_score": loser if won else 11,
+                "created_at": f"{match_date.isoformat()}T12:00:00+00:00",
+            })
+    db.refresh_summaries({u["id"] for u in db.rows("users")})
+    return emails
+
+
+# ─── Sessions ──────────────────────────────────────────────────────────────────
+
+class MemoryCookies(dict):
+    """The cookie component never answers under AppTest; keep the cookies in memory"""
+
+    def ready(self):
+        return True
+
+    def save(self):
+        pass
+
+
+def _share_runtime():
+    """
+    AppTest installs a mock Runtime for each run and removes it afterwards.
+    With sessions running side by side, one session finishing would pull the
+    runtime out from under the others, so install one for the whole test.
+    Share one script cache too: a real server compiles each page once, and
+    AppTest's per-run cache would recompile them on every rerun.
+
+    AppTest also turns on the global.appTest option for each run by patching
+    config.get_option process-wide. A session finishing its run would restore
+    the original while another is mid-run, whose widgets then don't register
+    their format_func (a KeyError on their next lookup), so it's on for the
+    whole test instead.
+    """
+    import contextlib
+
+    from streamlit import config
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+    from streamlit.testing.v1 import app_test
+    from streamlit.testing.v1.util import build_mock_config_get_option
+
+    runtime = MagicMock(spec=Runtime)
+    runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+    Runtime._instance = runtime
+    # AppTest's own set/reset now lands on a subclass and leaves ours alone
+    app_test.Runtime = type("PinnedRuntime", (Runtime,), {})
+    script_cache = ScriptCache()
+    app_test.ScriptCache = lambda: script_cache
+    config.get_option = build_mock_config_get_option({"global.appTest": True})
+    app_test.patch_config_options = lambda overrides: contextlib.nullcontext()
+
+
+class Session:
+    """One scripted player. Every rerun is timed and recorded as (step, seconds)."""
+
+    def __init__(self, email, timings, timeout, tab=0, tabs=1):
+        from streamlit.testing.v1 import AppTest
+
+        self.email = email
+        self.tab = tab
+        self.step = None                # the rerun in progress, for error reports
+        self.timings = timings
+        self.rng = random.Random(f"{email}/{tab}")
+        self.added = tab                # tabs of one player take turns through the opponents
+        self.stride = tabs
+        self.at = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=timeout)
+        self.at.session_state["cookie_manager"] = MemoryCookies()
+
+    def _rerun(self, step, action=None):
+        self.step = step
+        start = time.perf_counter()
+        (action or self.at.run)()
+        self.timings.append((step, time.perf_counter() - start))
+        if self.at.exception:
+            raise RuntimeError(f"{self.email} {step}: {self.at.exception[0].value}")
+
+    def login(self):
+        self._rerun("auth screen")
+        self.at.text_input(key="auth_email").input(self.email)
+        self.at.text_input(key="auth_pwd").input(PASSWORD)
+        self._rerun("login", self.at.button[0].click().run)
+
+    def match_history(self):
+        self.at.switch_page("views/02_Match_Log.py")
+        self._rerun("match history")
+        self._rerun("match history view", self.at.radio(key="match_log_type").set_value("Doubles").run)
+
+    def dashboard(self):
+        self.at.switch_page("views/03_Dashboard.py")
+        self._rerun("dashboard")
+        for period in self.rng.sample(self.at.selectbox[0].options, 2):
+            if period != "Custom Range":
+                self._rerun("dashboard filter", self.at.selectbox[0].select(period).run)
+        match_type = self.at.radio(key="dashboard_match_type").set_value(self.rng.choice(["Singles", "Doubles"]))
+        self._rerun("dashboard filter", match_type.run)
+
+    def add_match(self):
+        self.at.switch_page("views/02_Match_Log.py")
+        self._rerun("match history")
+        # A different opponent and score every time: an identical match resubmitted
+        # within a couple of minutes is treated as a double click and saved once
+        self.added += self.stride
+        self.at.text_input(key="s_opp_query").input(NAMES[self.added % len(NAMES)])
+        self._rerun("player search")
+        won = self.rng.random() < 0.5
+        loser = self.added % 10
+        self.at.number_input(key="s_usr_score").set_value(11 if won else loser)
+        self.at.number_input(key="s_opp_score").set_value(loser if won else 11)
+        button = next(b for b in self.at.button if b.label == "Add Singles Match")
+        self._rerun("add match", button.click().run)
+
+    def play(self, rounds):
+        self.login()
+        for _ in range(rounds):
+            self.match_history()
+            self.dashboard()
+            self.add_match()
+
+
+# ─── Report ────────────────────────────────────────────────────────────────────
+
+def _rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024   # peak, on macOS in bytes
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, round(q * (len(values) - 1)))]
+
+
+def coalesced_calls():
+    """{query: reads that joined another session's fetch} so far"""
+    from metrics import COALESCED_CALLS
+    return {key[0]: value for _, key, _, value in COALESCED_CALLS.samples()}
+
+
+def print_report(timings, wall, sessions, rss_growth, requests, coalesced):
+    steps = {}
+    for step, seconds in timings:
+        steps.setdefault(step, []).append(seconds)
+    steps["all reruns"] = [seconds for _, seconds in timings]
+    print(f"\n{'step':<20}{'reruns':>8}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for step, values in steps.items():
+        print(f"{step:<20}{len(values):>8}"
+              + "".join(f"{percentile(values, q) * 1000:>10.0f}" for q in (0.5, 0.9, 0.99))
+              + f"{max(values) * 1000:>10.0f}")
+    print(f"\n{len(timings)} reruns in {wall:.1f}s: {len(timings) / wall:.1f} reruns/s "
+          f"across {sessions} sessions ({statistics.mean(steps['all reruns']) * 1000:.0f} ms mean)")
+    print(f"{requests} Supabase requests ({requests / len(timings):.1f} per rerun)")
+    if coalesced:
+        print(f"{sum(coalesced.values())} reads coalesced into an in-flight fetch ("
+              + ", ".join(f"{query} {count}" for query, count in sorted(coalesced.items())) + ")")
+    print(f"memory: {rss_growth:.1f} MB RSS growth, {rss_growth / sessions:.2f} MB per session")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sessions", type=int, default=10, help="concurrent players")
+    parser.add_argument("--tabs", type=int, default=1, help="sessions per player, like open browser tabs")
+    parser.add_argument("--rounds", type=int, default=2,
+                        help="times each session cycles Match History, Dashboard and Add Match")
+    parser.add_argument("--matches", type=int, default=200, help="matches per player")
+    parser.add_argument("--latency", type=float, default=0.03, help="seconds per Supabase request")
+    parser.add_argument("--jitter", type=float, default=0.01, help="+/- seconds added to each request")
+    parser.add_argument("--timeout", type=float, default=120, help="seconds before a rerun counts as hung")
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    os.environ["SNAPSHOT_DIR"] = tempfile.mkdtemp(prefix="smashtrack-snapshots-")
+    from batch_reports import _quiet_streamlit
+    _quiet_streamlit()
+    warnings.simplefilter("ignore", FutureWarning)   # pandas deprecations, once per session otherwise
+    import supabase_client
+    import utils
+
+    db = FakeSupabase(args.latency, args.jitter)
+    emails = seed(db, args.sessions + 1, args.matches)
+    supabase_client.use_client(db)
+    _share_runtime()
+
+    # One session first so imports and process-wide caches don't count as per-session cost
+    print(f"warming up with {emails[0]}...")
+    Session(emails[0], [], args.timeout).play(1)
+    queue = utils.get_write_queue()
+    queue.wait(timeout=args.timeout)
+    before = len(db.rows("matches"))
+    db.requests = 0
+    coalesced_before = coalesced_calls()
+
+    timings = []
+    sessions = [Session(email, timings, args.timeout, tab, args.tabs)
+                for email in emails[1:] for tab in range(args.tabs)]
+    print(f"running {len(sessions)} sessions x {args.rounds} rounds "
+          f"({args.latency * 1000:.0f}±{args.jitter * 1000:.0f} ms per request)...")
+    rss_before = _rss_mb()
+    start = time.perf_counter()
+    errors = []
+    with ThreadPoolExecutor(max_workers=len(sessions)) as pool:
+        for session, future in [(s, pool.submit(s.play, args.rounds)) for s in sessions]:
+            try:
+                future.result()
+            except Exception:
+                errors.append(f"{session.email} (tab {session.tab}) at {session.step}:\n"
+                              f"{traceback.format_exc()}")
+    wall = time.perf_counter() - start
+    rss_growth = _rss_mb() - rss_before
+    coalesced = {query: count - coalesced_before.get(query, 0) for query, count in coalesced_calls().items()}
+    coalesced = {query: count for query, count in coalesced.items() if count}
+
+    # Every added match should reach the database once the write queue drains
+    queue.wait(timeout=args.timeout)
+    added = len(db.rows("matches")) - before
+    expected = sum(step == "add match" for step, _ in timings)
+    if added != expected:
+        errors.append(f"{expected} matches added but {added} saved")
+
+    for error in errors:
+        print(f"error: {error}", file=sys.stderr)
+    if timings:
+        print_report(timings, wall, len(sessions), rss_growth, db.requests, coalesced)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
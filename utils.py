@@ -1,78 +1,251 @@
 import streamlit as st
 import pandas as pd
-from supabase import create_client, Client
-import plotly.express as px 
 import datetime
+import functools
+import hashlib
+import itertools
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date
 from postgrest.exceptions import APIError  # <-- catch this
+from supabase_client import get_supabase
+from metrics import (
+    CACHE_LOOKUPS, CACHE_MISSES, CACHE_INVALIDATIONS, COALESCED_CALLS, MATCHES_QUEUED, MATCH_WRITE_FAILURES,
+    STALE_READS
+)
+from players import PlayerRegistry, PLAYER_ID_COLUMNS, clean_name, normalize_name
+from player_search import PlayerIndex
+from match_search import MatchSearchIndex
+from duplicates import DuplicateIndex
+from archive import MatchArchive, ROLLUP_COLUMNS, weighted
+from win_model import BUCKET_COLUMNS, WinModel, as_level, fit_global, level_history
+from match_store import MatchStore, TTLStore
+from resilience import RETRYABLE_SQLSTATES, SupabaseUnavailable
+from single_flight import SingleFlight
+from snapshots import SnapshotStore
+from write_queue import WriteQueue
+from leaderboard import Leaderboard
+from matchmaking import Matchmaker
+from peer_percentiles import PeerPercentiles
+import analytics
 
+# Copy-on-write: frames derived from a cached frame share its memory until one
+# side writes, and then only the written columns are copied. This is what lets
+# getMatches hand out the cached history without copying it.
+pd.set_option("mode.copy_on_write", True)
 
-# Supabase Connection
+
+# Per-user match frames - one mutable frame per user so writes can patch it in place
 @st.cache_resource
-def get_supabase() -> Client:
-    url = st.secrets["supabase"]["url"]
-    key = st.secrets["supabase"]["key"]
-    return create_client(url, key)
+def get_match_store() -> MatchStore:
+    return MatchStore(ttl=300)
 
-# Getting Match Data - USER-SPECIFIC CACHING with explicit cache key
-@st.cache_data(ttl=300)
+# Match history snapshots on disk - the first read after a restart uses them
+SNAPSHOT_DIR = os.environ.get("SNAPSHOT_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".snapshots"))
+
+@st.cache_resource
+def get_snapshots():
+    """The snapshot store, or None when turned off (SNAPSHOT_DIR=off) or pyarrow is missing"""
+    if SNAPSHOT_DIR.lower() == "off":
+        return None
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return None
+    return SnapshotStore(SNAPSHOT_DIR)
+
+@st.cache_resource
+def get_revalidation_pool() -> ThreadPoolExecutor:
+    # A few threads, so the checks after a restart trickle in rather than land at once
+    return ThreadPoolExecutor(max_workers=4, thread_name_prefix="snapshot-revalidate")
+
+# Coalescing - concurrent reads of the same user's data share one fetch
+@st.cache_resource
+def get_flights() -> SingleFlight:
+    return SingleFlight()
+
+def _coalesced(query, user_id, fn, *args, **kwargs):
+    """
+    Run fn once for all concurrent callers asking for the same query and user.
+    The key includes the data version, so a read that starts after a write
+    never joins a fetch that started before it.
+    """
+    value, shared = get_flights().do((query, user_id, get_data_version(user_id)), fn, *args, **kwargs)
+    if shared:
+        COALESCED_CALLS.inc(query=query)
+    return value
+
+def _refresh_in_background(query, user_id, fn, *args):
+    """Serve-stale path: refresh an expired value off the script thread, once per user at a time"""
+    STALE_READS.inc(cache=query)
+    key = (f"{query}_refresh", user_id, get_data_version(user_id))
+    get_flights().start(key, get_revalidation_pool().submit, fn, *args)
+
+# Getting Match Data - USER-SPECIFIC CACHING keyed on user_id
 def getMatches(user_id, _cache_key=None) -> pd.DataFrame:
-    """Cache matches data per user_id to prevent cross-user data leakage"""
-    supabase = get_supabase()
+    """
+    Cache matches data per user_id to prevent cross-user data leakage. An
+    expired history is returned at once and refreshed in the background.
+    """
+    store = get_match_store()
+    df, fresh = store.get_stale(user_id)
+    CACHE_LOOKUPS.inc(cache="matches")
+    if df is None:
+        df = _coalesced("matches", user_id, _load_matches, user_id)
+    elif not fresh:
+        _refresh_in_background(
+            "matches", user_id, _refresh_matches, user_id, get_data_version(user_id),
+            get_supabase(), store, _data_versions(), get_write_queue(), get_snapshots()
+        )
+    # A new frame object over the same data: columns the caller adds or writes
+    # stay on its side, and later store patches don't show through mid-render
+    return df.copy(deep=False)
+
+def _load_matches(user_id):
+    """Fill the match store from the snapshot on disk, or else from Supabase"""
+    store = get_match_store()
+    df = store.get(user_id)
+    if df is not None:
+        return df                       # loaded while we were waiting to start
+    snapshots = get_snapshots()
+    snapshot = snapshots.load(user_id) if snapshots else None
+    if snapshot is not None:
+        store.put(user_id, snapshot.frame)
+        get_revalidation_pool().submit(
+            _revalidate, user_id, snapshot.watermark, get_data_version(user_id),
+            get_supabase(), store, _data_versions(), get_write_queue(), snapshots
+        )
+    else:
+        CACHE_MISSES.inc(cache="matches")
+        store.put(user_id, _fetch_and_snapshot(user_id, get_supabase(), snapshots))
+    # Matches still waiting in the write queue aren't on the server yet
+    store.append(user_id, [item["row"] for item in get_write_queue().pending(user_id)])
+    return store.get(user_id)
+
+def fetch_watermark(user_id, client=None):
+    """The user's data watermark: user_summaries.updated_at, which every match write bumps"""
+    supabase = client or get_supabase()
+    rows = supabase.table("user_summaries").select("updated_at").eq("user_id", user_id).execute().data
+    return rows[0]["updated_at"] if rows else None
+
+def _fetch_and_snapshot(user_id, client, snapshots):
+    # Watermark first: a write landing in between makes the snapshot look stale, never fresh
+    watermark = fetch_watermark(user_id, client) if snapshots else None
+    df = fetch_matches(user_id, client)
+    if snapshots:
+        snapshots.save(user_id, df, watermark)
+    return df
+
+def _revalidate(user_id, watermark, version, client, store, versions, queue, snapshots):
+    """
+    Background check of a snapshot served after a restart: if the server has
+    moved on, swap the fresh history into the store. Runs outside the script
+    thread, so everything it needs is passed in.
+    """
+    try:
+        if fetch_watermark(user_id, client) == watermark:
+            return
+    except Exception:
+        return      # keep serving the snapshot; it's refreshed again once it expires
+    _refresh_matches(user_id, version, client, store, versions, queue, snapshots)
+
+def _refresh_matches(user_id, version, client, store, versions, queue, snapshots):
+    """
+    Refetch a user's history in the background. If Supabase can't be reached
+    the store keeps what it has, which stays expired, so a later read tries again.
+    """
+    try:
+        df = _fetch_and_snapshot(user_id, client, snapshots)
+    except Exception:
+        return
+    if (versions.get(None, 0), versions.get(user_id, 0)) != version:
+        # The user changed something meanwhile; let the next read fetch afresh
+        store.invalidate(user_id)
+        return
+    store.put(user_id, df)
+    store.append(user_id, [item["row"] for item in queue.pending(user_id)])
+    versions[user_id] = versions.get(user_id, 0) + 1
+
+def fetch_matches(user_id, client=None) -> pd.DataFrame:
+    """Fetch the user's match history (everything not archived) from Supabase"""
+    supabase = client or get_supabase()
     response = supabase.table("matches") \
                       .select("*") \
                       .eq('user_id', user_id) \
                       .order('match_date', desc=True) \
                       .execute()
-    
-    data = response.data or []
+    return _matches_frame(response.data or [])
+
+def _matches_frame(data):
+    """Rows of `matches` (or `matches_archive`) -> frame with parsed dates and nullable ids"""
     df = pd.DataFrame(data)
     
     # Convert date columns if data exists
     if not df.empty and 'match_date' in df.columns:
         df['match_date'] = pd.to_datetime(df['match_date'])
+
+    # Player references are nullable integer ids (singles rows have no partner/opponent 2)
+    for col in PLAYER_ID_COLUMNS.values():
+        if col in df.columns:
+            df[col] = df[col].astype("Int64")
         
     return df
 
-# Getting unique players - USER-SPECIFIC CACHING with explicit cache key
+# Getting the player registry - USER-SPECIFIC CACHING with explicit cache key
 @st.cache_data(ttl=300)
-def get_distinct_players(user_id, _cache_key=None):
-    """
-    Fetch every past opponent_1, opponent_2, and player_partner for this user,
-    dedupe them, and return a sorted list of names.
-    Cache per user_id to prevent cross-user data leakage.
-    """
+def getPlayerRegistry(user_id, _cache_key=None) -> PlayerRegistry:
+    """Cache the user's players (id, canonical name, aliases) per user_id"""
+    CACHE_MISSES.inc(cache="player_registry")
     supabase = get_supabase()
     resp = (
         supabase
-        .table("matches")
-        .select("opponent_1,opponent_2,player_partner")
+        .table("players")
+        .select("id,name,aliases")
         .eq("user_id", user_id)
         .execute()
     )
-    rows = resp.data or []
-    names = set()
-    for r in rows:
-        if r.get("opponent_1"):
-            names.add(r["opponent_1"].strip())
-        if r.get("opponent_2"):
-            names.add(r["opponent_2"].strip())
-        if r.get("player_partner"):
-            names.add(r["player_partner"].strip())
-    return sorted(names)
-
-# Getting Current Level - USER-SPECIFIC CACHING with explicit cache key
-@st.cache_data(ttl=300)
+    return PlayerRegistry(resp.data or [])
+
+# Getting unique players
+def get_distinct_players(user_id, _cache_key=None):
+    """
+    Return the sorted canonical names of every player this user has logged.
+    Names are deduped by the player registry, so no per-call string cleanup is needed.
+    """
+    return getPlayerRegistry_safe(user_id).sorted_names()
+
+# Getting Current Level - USER-SPECIFIC CACHING, served stale like match frames
+@st.cache_resource
+def get_level_store() -> TTLStore:
+    return TTLStore(ttl=300)
+
 def getCurrentLevel(current_user_id, _cache_key=None):
     """Cache current level per user_id to prevent cross-user data leakage"""
-    supabase = get_supabase()
-    response = supabase.rpc(
+    store = get_level_store()
+    level, fresh = store.get_stale(current_user_id)
+    args = (current_user_id, get_data_version(current_user_id), get_supabase(), store, _data_versions())
+    if level is None:
+        return _coalesced("current_level", current_user_id, _load_level, *args)
+    if not fresh:
+        _refresh_in_background("current_level", current_user_id, _load_level, *args)
+    return level
+
+def _load_level(user_id, version, client, store, versions):
+    CACHE_MISSES.inc(cache="current_level")
+    response = client.rpc(
         'get_current_level', 
-        {'p_user_id': current_user_id}
+        {'p_user_id': user_id}
     ).execute()
     
     # Check if we have a result
-    return response.data or "No current level found"
+    level = response.data or "No current level found"
+    if (versions.get(None, 0), versions.get(user_id, 0)) == version:
+        store.put(user_id, level)
+    return level
 
 # Wrapper functions that automatically include user_id in cache key
 def getMatches_safe(user_id):
@@ -85,36 +258,511 @@ def get_distinct_players_safe(user_id):
 
 def getCurrentLevel_safe(user_id):
     """Safe wrapper that includes user_id in cache key"""
+    CACHE_LOOKUPS.inc(cache="current_level")
     return getCurrentLevel(user_id, _cache_key=f"level_{user_id}")
 
-# Updating Match Data
-def updateMatches(match_id, column, data):
+def getPlayerRegistry_safe(user_id):
+    """Safe wrapper that includes user_id in cache key"""
+    CACHE_LOOKUPS.inc(cache="player_registry")
+    return _coalesced("player_registry", user_id, getPlayerRegistry, user_id, _cache_key=f"registry_{user_id}")
+
+# Data versions - bumped on every write so derived structures know when to rebuild
+@st.cache_resource
+def _data_versions() -> dict:
+    return {}
+
+def get_data_version(user_id):
+    """(global epoch, per-user counter); changes whenever the user's data may have changed"""
+    versions = _data_versions()
+    return versions.get(None, 0), versions.get(user_id, 0)
+
+def bump_data_version(user_id=None):
+    """Bump one user's version, or the global epoch when user_id is None"""
+    versions = _data_versions()
+    versions[user_id] = versions.get(user_id, 0) + 1
+
+# Player search index - rebuilt only when the roster/data version changes
+@st.cache_resource(max_entries=256)
+def _player_index(user_id, data_version) -> PlayerIndex:
+    return PlayerIndex(getPlayerRegistry_safe(user_id), getMatches_safe(user_id))
+
+def get_player_index(user_id) -> PlayerIndex:
+    return _player_index(user_id, get_data_version(user_id))
+
+# Match history search - rebuilt only when the user's data version changes
+@st.cache_resource(max_entries=256)
+def _match_search(user_id, data_version) -> MatchSearchIndex:
+    return MatchSearchIndex(getMatches_safe(user_id), get_level_history(user_id))
+
+def get_match_search(user_id) -> MatchSearchIndex:
+    return _match_search(user_id, get_data_version(user_id))
+
+# Duplicate matches - content-hash index rebuilt only when the user's data version changes
+@st.cache_resource(max_entries=256)
+def _duplicate_index(user_id, data_version) -> DuplicateIndex:
+    return DuplicateIndex(getMatches_safe(user_id))
+
+def get_duplicate_index(user_id) -> DuplicateIndex:
+    return _duplicate_index(user_id, get_data_version(user_id))
+
+def find_duplicate_match(user_id, match):
+    """
+    (kind, existing match id) if a new match repeats one already logged, else
+    None. Names are looked up in the registry first, so an alias matches too.
+    """
+    registry = getPlayerRegistry_safe(user_id)
+    names = {col: registry.name(registry.resolve(match[col]), match[col])
+             for col in PLAYER_ID_COLUMNS if match.get(col)}
+    return get_duplicate_index(user_id).find({**match, **names})
+
+# Matchmaking - skill index rebuilt only when the user's data version changes
+@st.cache_resource(max_entries=256)
+def _matchmaker(user_id, data_version, today) -> Matchmaker:
+    return Matchmaker(getPlayerRegistry_safe(user_id), getMatches_safe(user_id), today)
+
+def get_matchmaker(user_id) -> Matchmaker:
+    return _matchmaker(user_id, get_data_version(user_id), date.today())
+
+# Win-probability model - refit incrementally when the user's data version changes
+@st.cache_resource
+def _win_models() -> dict:
+    return {}
+
+@st.cache_data(ttl=3600)
+def get_global_win_weights():
+    """The global model's weights, fit from every player's matches (counted server-side)"""
+    data = get_supabase().rpc("win_model_buckets", {}).execute().data or []
+    return fit_global(pd.DataFrame(data, columns=BUCKET_COLUMNS))
+
+def get_win_model(user_id) -> WinModel:
+    """Per-user win model (the global model until the user has enough matches)"""
+    cached = _win_models().get(user_id)
+    if cached and cached[0] == get_data_version(user_id):
+        return cached[1]
+    return _coalesced("win_model", user_id, _refit_win_model, user_id)
+
+def _refit_win_model(user_id):
+    version = get_data_version(user_id)
+    models = _win_models()
+    cached = models.get(user_id)
+    if cached and cached[0] == version:
+        return cached[1]
+    previous = cached[1] if cached else WinModel()
+    # All Time: archived matches are learned from through their rollups
+    model = previous.updated(
+        get_dashboard_matches(user_id), as_level(getCurrentLevel_safe(user_id)),
+        level_history(get_level_history(user_id)), get_global_win_weights()
+    )
+    models[user_id] = (version, model)
+    return model
+
+# Plotly figure cache - keys include the user's data version, so entries never go stale
+@st.cache_resource
+def get_figure_cache():
+    from figure_cache import FigureCache  # plotly is only needed by the Dashboard
+    return FigureCache()
+
+# Club leaderboard and peer percentiles - loaded once per process, then only
+# changed summaries are fetched
+LEADERBOARD_SYNC = 30       # seconds between checks for changed summaries
+# updated_at is set when the writing transaction starts, so a row can commit
+# after a check has already read past it. Each check re-reads this far back
+# (longer than any write transaction runs); re-applying a row is harmless.
+LEADERBOARD_LOOKBACK = 300
+# Seconds between full reloads, which also drop summaries deleted meanwhile
+LEADERBOARD_RELOAD = 3600
+LEADERBOARD_PAGE = 1000
+
+@st.cache_resource
+def _leaderboard_state() -> dict:
+    return {"board": None, "peers": None, "checked": 0.0, "loaded": 0.0, "lock": threading.Lock()}
+
+def _fetch_summaries(since=None):
     supabase = get_supabase()
-    result = supabase.table("matches").update({column: data}).eq('id', match_id).execute()
-    # Clear user-specific cache after update
+    rows, start = [], 0
+    while True:
+        query = supabase.table("user_summaries").select("*")
+        if since is not None:
+            query = query.gte("updated_at", since)
+        page = query.order("updated_at").range(start, start + LEADERBOARD_PAGE - 1).execute().data or []
+        rows.extend(page)
+        if len(page) < LEADERBOARD_PAGE:
+            return rows
+        start += LEADERBOARD_PAGE
+
+def get_leaderboard(force=False) -> Leaderboard:
+    """
+    Club-wide rankings from the user_summaries table (kept current by database
+    triggers). Never reads anyone's matches.
+    """
+    state = _leaderboard_state()
+    with state["lock"]:
+        now = time.monotonic()
+        if state["board"] is None or now - state["loaded"] > LEADERBOARD_RELOAD:
+            rows = _fetch_summaries()
+            state["board"], state["peers"] = Leaderboard(rows), PeerPercentiles(rows)
+            state["checked"] = state["loaded"] = now
+        elif force or now - state["checked"] > LEADERBOARD_SYNC:
+            since = state["board"].synced_at
+            if since is not None:
+                since = (pd.Timestamp(since) - pd.Timedelta(seconds=LEADERBOARD_LOOKBACK)).isoformat()
+            rows = _fetch_summaries(since=since)
+            state["board"].update(rows)
+            state["peers"].update(rows)
+            state["checked"] = now
+        return state["board"]
+
+def get_peer_percentiles() -> PeerPercentiles:
+    """Per-level quantile sketches, synced together with the leaderboard"""
+    get_leaderboard()
+    return _leaderboard_state()["peers"]
+
+# Resolving player names to registry ids
+def resolve_player_ids(user_id, names):
+    """
+    Map free-text names to (player_id, canonical_name) pairs, creating players that
+    don't exist yet in a single upsert. Blank names map to (None, None).
+    """
+    registry = getPlayerRegistry_safe(user_id)
+    missing = {}
+    for name in names:
+        if clean_name(name) and registry.resolve(name) is None:
+            missing.setdefault(normalize_name(name), clean_name(name))
+
+    created = {}
+    if missing:
+        supabase = get_supabase()
+        resp = supabase.table("players").upsert(
+            [{"user_id": user_id, "name": name, "normalized_name": key}
+             for key, name in missing.items()],
+            on_conflict="user_id,normalized_name",
+        ).execute()
+        for r in resp.data or []:
+            created[r["normalized_name"]] = (int(r["id"]), r["name"])
+        getPlayerRegistry.clear()
+        bump_data_version(user_id)
+
+    resolved = []
+    for name in names:
+        pid = registry.resolve(name)
+        if pid is not None:
+            resolved.append((pid, registry.name(pid)))
+        else:
+            resolved.append(created.get(normalize_name(name), (None, None)))
+    return resolved
+
+# Merging players that are the same person (typos, nicknames)
+def merge_players(user_id, keep_id, merge_ids):
+    """
+    Repoint every match (archived ones too) referencing `merge_ids` at
+    `keep_id`, record the merged names as aliases of the kept player, and
+    delete the merged players.
+    """
+    merge_ids = [int(pid) for pid in merge_ids if int(pid) != int(keep_id)]
+    if not merge_ids:
+        return None
+    registry = getPlayerRegistry_safe(user_id)
+    keep_name = registry.name(keep_id)
+    aliases = set(registry.aliases.get(int(keep_id), []))
+    for pid in merge_ids:
+        aliases.add(registry.name(pid))
+        aliases.update(registry.aliases.get(pid, []))
+    aliases.discard(keep_name)
+
+    supabase = get_supabase()
+    for table in ("matches", "matches_archive"):
+        for name_col, id_col in PLAYER_ID_COLUMNS.items():
+            supabase.table(table) \
+                    .update({id_col: int(keep_id), name_col: keep_name}) \
+                    .eq("user_id", user_id) \
+                    .in_(id_col, merge_ids) \
+                    .execute()
+    supabase.table("players").update({"aliases": sorted(aliases)}) \
+            .eq("id", int(keep_id)).eq("user_id", user_id).execute()
+    result = supabase.table("players").delete() \
+                     .in_("id", merge_ids).eq("user_id", user_id).execute()
     clear_user_cache()
     return result
 
+# Updating Match Data
+# Batch-updating edited matches
+def _json_value(value):
+    """Cached frame values -> JSON-safe payload values (NaN/NA -> None, Timestamps -> ISO dates)"""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    if isinstance(value, (pd.Timestamp, datetime.datetime)):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    if hasattr(value, "item"):
+        return value.item()
+    return value
+
+def updateMatchesBatch(user_id, changes):
+    """
+    Apply {match_id: {column: value}} edits, then patch the cached frame in
+    place instead of refetching it. Each match gets one update carrying only
+    its edited cells, so columns changed elsewhere meanwhile are left alone and
+    a match deleted meanwhile stays deleted. Edited names are resolved through
+    the player registry so their ids stay in sync. Returns the updated rows.
+    """
+    if not changes:
+        return []
+    # Resolve every edited name in one registry round trip
+    edited_names = [
+        value for edits in changes.values()
+        for col, value in edits.items() if col in PLAYER_ID_COLUMNS
+    ]
+    resolved = dict(zip(
+        [normalize_name(n) for n in edited_names],
+        resolve_player_ids(user_id, edited_names)
+    ))
+
+    supabase = get_supabase()
+    updated, gone = [], []
+    for match_id, edits in changes.items():
+        row = {}
+        for col, value in edits.items():
+            if col in PLAYER_ID_COLUMNS:
+                pid, name = resolved[normalize_name(value)]
+                row[col], row[PLAYER_ID_COLUMNS[col]] = name, pid
+            else:
+                row[col] = _json_value(value)
+        try:
+            response = supabase.table("matches") \
+                               .update(row) \
+                               .eq("id", match_id) \
+                               .eq("user_id", user_id) \
+                               .execute()
+        except APIError as e:
+            st.error(f"Failed to save changes: {e.message}")
+            break
+        if response.data:
+            updated.append(dict(row, id=match_id))
+        else:
+            gone.append(match_id)
+    if gone:
+        get_match_store().delete(user_id, gone)
+    if updated and not get_match_store().update_rows(user_id, updated):
+        get_match_store().invalidate(user_id)
+    if updated or gone:
+        bump_data_version(user_id)
+    return updated if len(updated) + len(gone) == len(changes) else None
+
 # Deleting Match Data
-def deleteMatch(match_id, user_id):
+def deleteMatches(user_id, match_ids):
+    """Delete several matches in one request"""
     supabase = get_supabase()
-    result = supabase.table("matches").delete().eq('id', match_id).eq('user_id', user_id).execute()
-    # Clear user-specific cache after delete
-    clear_user_cache()
+    result = supabase.table("matches").delete().in_('id', list(match_ids)).eq('user_id', user_id).execute()
+    get_match_store().delete(user_id, match_ids)
+    bump_data_version(user_id)
     return result
 
+DELETE_BATCH = 200      # ids per delete request, to keep the request URL short
+
+def deleteDuplicateMatches(user_id, kinds=None):
+    """Delete every saved match that repeats an older one (see DuplicateIndex); returns how many"""
+    match_ids = get_duplicate_index(user_id).duplicates(kinds)["id"].tolist()
+    for start in range(0, len(match_ids), DELETE_BATCH):
+        deleteMatches(user_id, match_ids[start:start + DELETE_BATCH])
+    return len(match_ids)
+
 # Clear user-specific cached data
 def clear_user_cache():
     """Clear cached data that might be user-specific"""
     # Clear all cached functions
-    getMatches.clear()
-    get_distinct_players.clear() 
-    getCurrentLevel.clear()
+    CACHE_INVALIDATIONS.inc()
+    get_match_store().invalidate()
+    getPlayerRegistry.clear()
+    get_level_store().invalidate()
+    get_level_history.clear()
+    get_match_archive.clear()
+    fetch_archived_matches.clear()
+    bump_data_version()
+
+# ─── Match archive ─────────────────────────────────────────────────────────────
+# Players can move matches older than a horizon into matches_archive
+# (migrations/004), so the history every page fetches only holds the recent
+# window. All Time numbers mix in the archive's rollups instead of its rows;
+# archived rows are fetched only when a shorter period reaches back into them,
+# or when a player asks to see them.
+
+ARCHIVE_HORIZONS = {"1 year": 365, "2 years": 730, "3 years": 1095, "5 years": 1825}
+
+@st.cache_data(ttl=3600, max_entries=256)
+def get_match_archive(user_id) -> MatchArchive:
+    """The player's archive cutoff and rollups (changes only when they archive)"""
+    supabase = get_supabase()
+    rows = supabase.table("user_summaries").select("archived_before").eq("user_id", user_id).execute().data
+    before = rows[0].get("archived_before") if rows else None
+    if not before:
+        return MatchArchive()
+    rollups = supabase.table("match_rollups") \
+                      .select(",".join(ROLLUP_COLUMNS)) \
+                      .eq("user_id", user_id) \
+                      .execute()
+    df = pd.DataFrame(rollups.data or [], columns=ROLLUP_COLUMNS)
+    df["month"] = pd.to_datetime(df["month"])
+    return MatchArchive(date.fromisoformat(str(before)[:10]), df)
+
+@st.cache_data(ttl=3600, max_entries=64)
+def fetch_archived_matches(user_id, start=None, end=None) -> pd.DataFrame:
+    """Archived matches played from `start` to `end` (either open), newest first"""
+    query = get_supabase().table("matches_archive").select("*").eq("user_id", user_id)
+    if start is not None:
+        query = query.gte("match_date", start.isoformat())
+    if end is not None:
+        query = query.lte("match_date", end.isoformat())
+    return _matches_frame(query.order("match_date", desc=True).execute().data or [])
+
+def archive_matches(user_id, before):
+    """Move the player's matches played before `before` into the archive; returns how many"""
+    response = get_supabase().rpc(
+        "archive_matches", {"p_user_id": user_id, "p_before": before.isoformat()}
+    ).execute()
+    # The cached history (and its snapshot) still holds the archived rows
+    get_match_store().invalidate(user_id)
+    snapshots = get_snapshots()
+    if snapshots:
+        snapshots.discard(user_id)
+    get_match_archive.clear()
+    fetch_archived_matches.clear()
+    bump_data_version(user_id)
+    return int(response.data or 0)
+
+def get_dashboard_matches(user_id, period="All Time", match_type="All", date_range=None, today=None):
+    """
+    The matches a Dashboard period covers, with results, ready for the
+    analytics: the recent history, plus the archive when the period reaches
+    back into it - its rollups for All Time, its rows for anything shorter.
+    """
+    df = getMatches_safe(user_id)
+    archive = get_match_archive(user_id)
+    start = analytics.period_start(period, date_range, today)
+    if archive.covers(start):
+        # Every row still in `matches` counts, including ones logged or moved
+        # before the cutoff after an archive run; the rollups hold only what was
+        # moved. (Another process's cached history may hold archived rows until
+        # its TTL runs out; snapshots revalidate on the watermark archiving bumps.)
+        df = weighted(df)
+        if start is None:
+            old = archive.rows()
+        else:
+            old = weighted(fetch_archived_matches(user_id, start, archive.before - datetime.timedelta(days=1)))
+        frames = [f for f in (df, old) if not f.empty]
+        df = pd.concat(frames, ignore_index=True) if frames else df
+    df = analytics.filter_matches(df, period, match_type, date_range, today)
+    return analytics.add_results(df) if not df.empty else df
+
+# ─── Write-behind inserts ──────────────────────────────────────────────────────
+# New matches are added to the cached frame right away and written to Supabase
+# from a background queue. Each match carries a client-generated idempotency key
+# (`client_key`, unique per user), so retries and double submits collapse
+# server-side instead of creating duplicate rows.
+
+DUPLICATE_WINDOW = 120              # seconds a resubmitted identical match reuses its key
+
+_temp_ids = itertools.count(1)      # optimistic rows get negative ids until confirmed
+
+def _is_retryable(error):
+    """Network errors are retried; Postgres errors only when they're transient"""
+    if isinstance(error, APIError):
+        return str(error.code or "").startswith(RETRYABLE_SQLSTATES)
+    return True
+
+def _flush_matches(batch, store, versions):
+    """Insert a batch of queued matches, then swap their temporary ids for real ones"""
+    by_client = {}
+    for item in batch:
+        by_client.setdefault(id(item["client"]), []).append(item)
+
+    for items in by_client.values():
+        client = items[0]["client"]
+        rows = [item["row"] for item in items]
+        response = client.table("matches") \
+                         .upsert(rows, on_conflict="user_id,client_key", ignore_duplicates=True) \
+                         .execute()
+        # Keyed per user: client keys are only unique per user, and the API's
+        # service-role client isn't limited to one user's rows by RLS
+        ids = {}
+        for r in response.data or []:
+            ids.setdefault(r["user_id"], {})[r["client_key"]] = r["id"]
+        for user_id in {item["user_id"] for item in items}:
+            # Rows that already existed are skipped by the upsert and not returned
+            confirmed = ids.setdefault(user_id, {})
+            missing = [item["client_key"] for item in items
+                       if item["user_id"] == user_id and item["client_key"] not in confirmed]
+            if missing:
+                response = client.table("matches") \
+                                 .select("id,client_key") \
+                                 .eq("user_id", user_id) \
+                                 .in_("client_key", missing) \
+                                 .execute()
+                confirmed.update({r["client_key"]: r["id"] for r in response.data or []})
+
+            # Runs on the queue's thread, so versions are bumped on the captured dict
+            store.confirm(user_id, confirmed)
+            versions[user_id] = versions.get(user_id, 0) + 1
+
+def _drop_failed_matches(batch, store, versions):
+    """Roll back optimistic rows whose insert failed for good"""
+    MATCH_WRITE_FAILURES.inc(len(batch))
+    for user_id in {item["user_id"] for item in batch}:
+        store.remove(user_id, [item["client_key"] for item in batch if item["user_id"] == user_id])
+        versions[user_id] = versions.get(user_id, 0) + 1
+
+@st.cache_resource
+def get_write_queue() -> WriteQueue:
+    store, versions = get_match_store(), _data_versions()
+    return WriteQueue(
+        flush=lambda batch: _flush_matches(batch, store, versions),
+        on_failure=lambda batch, error: _drop_failed_matches(batch, store, versions),
+        retryable=_is_retryable,
+    )
+
+def _client_key(payload):
+    """
+    Idempotency key for a new match. Submitting the same match again from this
+    session within DUPLICATE_WINDOW reuses the key, so the copy is dropped.
+    """
+    digest = hashlib.sha1(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+    recent = st.session_state.setdefault("recent_submissions", {})
+    now = time.time()
+    for d in [d for d, (_, t) in recent.items() if now - t > DUPLICATE_WINDOW]:
+        del recent[d]
+    key = recent[digest][0] if digest in recent else str(uuid.uuid4())
+    recent[digest] = (key, now)
+    return key
+
+def queue_match(user_id, payload, client_key=None):
+    """
+    Add a match to the cached history now and queue its insert. Returns the
+    optimistic row. Callers outside a Streamlit session pass their own key.
+    """
+    payload = {**payload, "client_key": client_key or _client_key(payload)}
+    row = {**payload, "id": -next(_temp_ids)}
+    if get_write_queue().submit({
+        "user_id": user_id,
+        "client_key": payload["client_key"],
+        "client": get_supabase(),
+        "row": payload,
+    }):
+        MATCHES_QUEUED.inc()
+    get_match_store().append(user_id, [row])
+    bump_data_version(user_id)
+    return row
+
+def pending_matches(user_id):
+    """Matches this user added that haven't been written to Supabase yet"""
+    return get_write_queue().pending(user_id)
+
+def failed_matches(user_id):
+    """Pop the matches whose insert failed for good, as (row, error) pairs"""
+    return [(item["row"], error) for item, error in get_write_queue().take_failures(user_id)]
 
 # Adding Singles Match
 def addSinglesMatch(current_user_id, match_date, opponent, opponent_level,
-                    user_score, opponent_score):
-    supabase = get_supabase()
+                    user_score, opponent_score, client_key=None):
     if isinstance(match_date, (date, datetime.datetime)):
         match_date = match_date.isoformat()
 
@@ -122,29 +770,27 @@ def addSinglesMatch(current_user_id, match_date, opponent, opponent_level,
         "user_id":             current_user_id,
         "match_date":          match_date,
         "match_type":          "singles",
-        "opponent_1":          opponent,
         "opponent_1_level":    float(opponent_level),
         "user_team_score":     int(user_score),
         "opponent_team_score": int(opponent_score),
     }
 
     try:
-        response = supabase.table("matches").insert(payload).execute()
-        # Clear user-specific cache after insert
-        clear_user_cache()
-        return response.data
+        # Store the registry id alongside the canonical spelling of the name
+        [(payload["opponent_1_id"], payload["opponent_1"])] = \
+            resolve_player_ids(current_user_id, [opponent])
     except APIError as e:
         # Postgres/Supabase errors bubble up here
         st.error(f"Failed to add singles match: {e.message}")
         return None
+    return [queue_match(current_user_id, payload, client_key)]
 
 # Adding Doubles Match
 def addDoublesMatch(current_user_id, match_date,
                     partner, partner_level,
                     opp1, opp1_level,
                     opp2, opp2_level,
-                    user_score, opponent_score):
-    supabase = get_supabase()
+                    user_score, opponent_score, client_key=None):
     if isinstance(match_date, (date, datetime.datetime)):
         match_date = match_date.isoformat()
 
@@ -152,24 +798,24 @@ def addDoublesMatch(current_user_id, match_date,
         "user_id":               current_user_id,
         "match_date":            match_date,
         "match_type":            "doubles",
-        "player_partner":        partner,
         "player_partner_level":  float(partner_level),
-        "opponent_1":            opp1,
         "opponent_1_level":      float(opp1_level),
-        "opponent_2":            opp2,
         "opponent_2_level":      float(opp2_level),
         "user_team_score":       int(user_score),
         "opponent_team_score":   int(opponent_score),
     }
 
     try:
-        response = supabase.table("matches").insert(payload).execute()
-        # Clear user-specific cache after insert
-        clear_user_cache()
-        return response.data
+        # Store the registry id alongside the canonical spelling of each name
+        names = {"player_partner": partner, "opponent_1": opp1, "opponent_2": opp2}
+        resolved = resolve_player_ids(current_user_id, list(names.values()))
+        for name_col, (pid, name) in zip(names, resolved):
+            payload[name_col] = name
+            payload[PLAYER_ID_COLUMNS[name_col]] = pid
     except APIError as e:
         st.error(f"Failed to add doubles match: {e.message}")
         return None
+    return [queue_match(current_user_id, payload, client_key)]
 
 # Updating Current Level
 def set_player_level(user_id, new_level, effective_date, notes):
@@ -193,6 +839,27 @@ def set_player_level(user_id, new_level, effective_date, notes):
     clear_user_cache()
     return response
 
+# Level history, newest first
+@st.cache_data(ttl=300)
+def get_level_history(user_id):
+    """Get player's level history"""
+    supabase = get_supabase()
+    try:
+        response = supabase.table("player_levels") \
+                          .select("level,effective_date,notes") \
+                          .eq('user_id', user_id) \
+                          .order('effective_date', desc=True) \
+                          .execute()
+        
+        data = response.data or []
+        if data:
+            df = pd.DataFrame(data)
+            df['effective_date'] = pd.to_datetime(df['effective_date'])
+            return df
+        return pd.DataFrame()
+    except Exception as e:
+        return pd.DataFrame()
+
 # Navigation Pages
 def register_nav_pages(PAGE_DEFS):
     pages = []
@@ -207,15 +874,56 @@ def register_nav_pages(PAGE_DEFS):
         )
     return pages
 
-# Get profile data - Remove caching to prevent cross-user issues
+# Signed-in user - kept in this session's state, so reruns don't call the auth API
+def get_current_user():
+    """The user stored at sign-in (or cookie restore); asks Supabase only if it's missing"""
+    user = st.session_state.get("user")
+    if user is None:
+        user = get_supabase().auth.get_user().user
+        st.session_state["user"] = user
+    return user
+
+# Supabase outages - what a page shows when there's no cached copy to fall back on
+UNAVAILABLE_MESSAGE = "Can't reach the database right now. Please try again in a moment."
+
+def when_available(fn):
+    """
+    For fragments, which rerun on their own outside app.py's handler: show
+    UNAVAILABLE_MESSAGE instead of a traceback when Supabase can't be reached.
+    """
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        try:
+            return fn(*args, **kwargs)
+        except SupabaseUnavailable:
+            st.error(UNAVAILABLE_MESSAGE)
+    return wrapper
+
+# Data freshness - shown when a page is serving expired data
+def show_data_as_of(user_id):
+    """
+    Caption saying how old the user's match history is, when it's past its TTL
+    and being refreshed in the background (or Supabase can't be reached).
+    """
+    store = get_match_store()
+    df, fresh = store.get_stale(user_id)
+    if df is None or fresh:
+        return
+    age = time.monotonic() - store.fetched_at(user_id)
+    as_of = datetime.datetime.now() - datetime.timedelta(seconds=age)
+    if get_supabase().policy.breaker.state == "closed":
+        note = "refreshing in the background"
+    else:
+        note = "the database can't be reached right now"
+    st.caption(f":material/history: Data as of {as_of:%b %d, %I:%M %p} - {note}")
+
+# Get profile data - from this session's user, so it can't cross over to another user
 def getName(user_id):
-    """Get display name from user metadata - no caching to prevent cross-user issues"""
-    supabase = get_supabase()
+    """Get display name from user metadata"""
     try:
-        user_response = supabase.auth.get_user()
-        if user_response.user and user_response.user.user_metadata:
-            display_name = user_response.user.user_metadata.get("display_name", "Unknown User")
-            return display_name
+        user = get_current_user()
+        if user and user.user_metadata:
+            return user.user_metadata.get("display_name", "Unknown User")
     except Exception as e:
         st.error(f"Error getting user name: {e}")
     return "Unknown User"
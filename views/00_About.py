@@ -1,4 +1,5 @@
 import streamlit as st
+from assets import show_image
 
 
 def about_page():
@@ -9,7 +10,7 @@ def about_page():
     col1, col2 = st.columns([1, 4])
     with col1:
         # Emoji logo
-        st.image("assets/logo.png", width=100)
+        show_image("logo_header", width=100)
     with col2:
         st.title("SmashTrack")
         st.markdown("#### *Your Personal Pickleball Performance Tracker*")
@@ -1,35 +1,23 @@
 import streamlit as st
+from assets import show_image
 import pandas as pd
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+import analytics
 from utils import (
-    get_supabase, getCurrentLevel_safe, set_player_level, 
-    getMatches_safe, get_distinct_players_safe
+    get_current_user, getCurrentLevel_safe, set_player_level, get_level_history,
+    getMatches_safe, getPlayerRegistry_safe, merge_players, show_data_as_of,
+    get_match_archive, get_dashboard_matches, fetch_archived_matches, archive_matches, ARCHIVE_HORIZONS
 )
 
 
-def get_level_history(user_id):
-    """Get player's level history"""
-    supabase = get_supabase()
-    try:
-        response = supabase.table("player_levels") \
-                          .select("level,effective_date,notes") \
-                          .eq('user_id', user_id) \
-                          .order('effective_date', desc=True) \
-                          .execute()
-        
-        data = response.data or []
-        if data:
-            df = pd.DataFrame(data)
-            df['effective_date'] = pd.to_datetime(df['effective_date'])
-            return df
-        return pd.DataFrame()
-    except Exception as e:
-        return pd.DataFrame()
-
-
-def get_activity_summary(df):
-    """Get basic activity summary"""
-    if df.empty:
+def opponent_ids(df):
+    """All opponent ids across both opponent slots, as one integer series"""
+    return pd.concat([df['opponent_1_id'], df['opponent_2_id']]).dropna()
+
+
+def get_activity_summary(df, archive):
+    """Get basic activity summary (archived matches are counted from their rollups)"""
+    if df.empty and not archive.matches:
         return {
             'total_matches': 0,
             'first_match': None,
@@ -38,23 +26,18 @@ def get_activity_summary(df):
         }
     
     return {
-        'total_matches': len(df),
-        'first_match': df['match_date'].min(),
-        'last_match': df['match_date'].max(),
-        'total_opponents': len(set(
-            list(df['opponent_1'].dropna()) + 
-            list(df['opponent_2'].dropna())
-        ))
+        'total_matches': len(df) + archive.matches,
+        'first_match': archive.first_month or df['match_date'].min(),
+        'last_match': df['match_date'].max() if not df.empty else None,
+        'total_opponents': opponent_ids(df).nunique() if not df.empty else 0
     }
 
 
 def profile_page():
-    supabase = get_supabase()
-    
     # Header section
     col1, col2 = st.columns([1, 4])
     with col1:
-        st.image("assets/user.png", width=100)
+        show_image("user", width=100)
     with col2:
         st.title("Profile Page")
 
@@ -65,10 +48,10 @@ def profile_page():
     """)   
 
     # Get user info
-    resp = supabase.auth.get_user()
-    user = resp.user  
+    user = get_current_user()
 
     if user:
+        show_data_as_of(user.id)
         display_name = user.user_metadata.get("display_name", "Unknown User")
     else:
         display_name = "Unknown User"
@@ -89,15 +72,21 @@ def profile_page():
             
             # Activity Summary
             matches_df = getMatches_safe(user.id)
-            activity = get_activity_summary(matches_df)
+            archive = get_match_archive(user.id)
+            activity = get_activity_summary(matches_df, archive)
             
             st.markdown("**Activity Summary:**")
             st.markdown(f"• Total Matches: **{activity['total_matches']}**")
             if activity['first_match']:
-                st.markdown(f"• First Match: **{activity['first_match'].strftime('%B %d, %Y')}**")
+                # Archived matches are only known to the month
+                first_format = '%B %Y' if archive.matches else '%B %d, %Y'
+                st.markdown(f"• First Match: **{activity['first_match'].strftime(first_format)}**")
             if activity['last_match']:
                 st.markdown(f"• Last Match: **{activity['last_match'].strftime('%B %d, %Y')}**")
-            st.markdown(f"• Unique Opponents: **{activity['total_opponents']}**")
+            if archive.matches:
+                st.markdown(f"• Unique Opponents since {archive.before:%B %Y}: **{activity['total_opponents']}**")
+            else:
+                st.markdown(f"• Unique Opponents: **{activity['total_opponents']}**")
 
     with col2:
         # Current Level Section
@@ -124,7 +113,6 @@ def profile_page():
                     if st.form_submit_button("Update Level"):
                         resp = set_player_level(user.id, new_level, effective_date, notes)
                         if resp.data:
-                            getCurrentLevel_safe.clear()
                             st.success("Level updated successfully!")
                             st.session_state.show_level_form = False
                             st.rerun()
@@ -138,10 +126,11 @@ def profile_page():
     if not level_history.empty:
         with st.container(border=True):
             # Display as a table with proper headers
-            display_df = level_history.copy()
-            display_df['Date'] = display_df['effective_date'].dt.strftime('%m/%d/%Y')
-            display_df['Level'] = display_df['level']
-            display_df['Notes'] = display_df['notes'].fillna('No notes')
+            display_df = level_history.assign(
+                Date=level_history['effective_date'].dt.strftime('%m/%d/%Y'),
+                Level=level_history['level'],
+                Notes=level_history['notes'].fillna('No notes'),
+            )
             
             # Select and reorder columns for display
             display_df = display_df[['Level', 'Date', 'Notes']]
@@ -152,26 +141,20 @@ def profile_page():
 
     # Frequent Players Section
     st.subheader("🤝 Your Tennis Network")
-    players = get_distinct_players_safe(user.id)
+    registry = getPlayerRegistry_safe(user.id)
+    players = registry.sorted_names()
     
     if players:
         with st.container(border=True):
             st.markdown(f"**Players you've faced:** {len(players)} unique opponents")
             
-            # Show frequent opponents (top 5)
+            # Show frequent opponents (top 5), counted on player ids
             if not matches_df.empty:
-                opponent_counts = {}
-                for _, match in matches_df.iterrows():
-                    if pd.notna(match['opponent_1']):
-                        opponent_counts[match['opponent_1']] = opponent_counts.get(match['opponent_1'], 0) + 1
-                    if pd.notna(match['opponent_2']):
-                        opponent_counts[match['opponent_2']] = opponent_counts.get(match['opponent_2'], 0) + 1
-                
-                if opponent_counts:
-                    top_opponents = sorted(opponent_counts.items(), key=lambda x: x[1], reverse=True)[:5]
+                top_opponents = opponent_ids(matches_df).value_counts().head(5)
+                if not top_opponents.empty:
                     st.markdown("**Most Frequent Opponents:**")
-                    for opponent, count in top_opponents:
-                        st.markdown(f"• {opponent}: **{count}** match{'es' if count > 1 else ''}")
+                    for player_id, count in top_opponents.items():
+                        st.markdown(f"• {registry.name(player_id)}: **{count}** match{'es' if count > 1 else ''}")
             
             # Show all players in an expander
             with st.expander("View All Players"):
@@ -179,6 +162,27 @@ def profile_page():
                 for i, player in enumerate(players):
                     with cols[i % 3]:
                         st.markdown(f"• {player}")
+
+            # Merge players that were logged under different spellings
+            with st.expander("Merge Duplicate Players"):
+                player_ids = registry.sorted_ids()
+                keep_id = st.selectbox(
+                    "Keep this player",
+                    player_ids,
+                    format_func=registry.name,
+                    key="merge_keep"
+                )
+                merge_ids = st.multiselect(
+                    "Merge these players into it",
+                    [pid for pid in player_ids if pid != keep_id],
+                    format_func=registry.name,
+                    key="merge_from",
+                    help="Their matches are moved to the kept player and their names become aliases."
+                )
+                if st.button("Merge Players", disabled=not merge_ids):
+                    merge_players(user.id, keep_id, merge_ids)
+                    st.success(f"Merged {len(merge_ids)} player{'s' if len(merge_ids) > 1 else ''} into {registry.name(keep_id)}")
+                    st.rerun()
     else:
         st.info("No players found. Add some matches to build your tennis network!")
 
@@ -186,9 +190,12 @@ def profile_page():
     st.subheader("🔧 Account Actions")
     with st.container(border=True):
         if st.button("Export My Data", help="Download all your match data as CSV"):
+            if archive.matches:
+                matches_df = pd.concat([matches_df, fetch_archived_matches(user.id)], ignore_index=True)
             if not matches_df.empty:
                 # Remove sensitive columns and timestamp columns before export
-                export_df = matches_df.drop(columns=['id', 'user_id', 'created_at', 'updated_at'], errors='ignore')
+                export_df = matches_df.drop(columns=['id', 'user_id', 'created_at', 'updated_at', 'archived_at'],
+                                            errors='ignore')
                 csv = export_df.to_csv(index=False)
                 st.download_button(
                     label="Download CSV",
@@ -199,25 +206,43 @@ def profile_page():
             else:
                 st.info("No data to export")
 
+    # Match Archive Section
+    st.subheader("🗄️ Match Archive")
+    with st.container(border=True):
+        if archive.matches:
+            st.markdown(f"**{archive.matches}** match{'es' if archive.matches > 1 else ''} played before "
+                        f"**{archive.before:%B %d, %Y}** {'are' if archive.matches > 1 else 'is'} archived. "
+                        "They still count in your All Time stats, and you can look them up in the Match Log.")
+        st.caption("Archiving old matches keeps your Match Log and Dashboard quick to load.")
+        horizon = st.selectbox("Archive matches older than", list(ARCHIVE_HORIZONS), index=1, key="archive_horizon")
+        before = date.today() - timedelta(days=ARCHIVE_HORIZONS[horizon])
+        # Matches still being saved (negative ids) aren't on the server to move yet
+        old = int(((matches_df['match_date'].dt.date < before) & (matches_df['id'] > 0)).sum()) \
+            if not matches_df.empty else 0
+        if st.button(f"Archive {old} match{'es' if old != 1 else ''}", disabled=not old, key="archive_button"):
+            moved = archive_matches(user.id, before)
+            st.success(f"Archived {moved} match{'es' if moved != 1 else ''}")
+            st.rerun()
+
     # Quick Stats Footer
-    if not matches_df.empty:
+    if not matches_df.empty or archive.matches:
         st.divider()
         st.markdown("### Quick Profile Stats")
         col1, col2, col3, col4 = st.columns(4)
         
-        wins = len(matches_df[matches_df['user_team_score'] > matches_df['opponent_team_score']])
-        win_rate = (wins / len(matches_df)) * 100 if len(matches_df) > 0 else 0
+        # All time, archived matches included
+        all_time = get_dashboard_matches(user.id)
+        stats = analytics.summary(all_time)
+        by_type = analytics.match_counts(all_time, "match_type")
         
         with col1:
-            st.metric("Total Matches", len(matches_df))
+            st.metric("Total Matches", stats['total'])
         with col2:
-            st.metric("Win Rate", f"{win_rate:.1f}%")
+            st.metric("Win Rate", f"{stats['win_rate']:.1f}%")
         with col3:
-            singles_matches = len(matches_df[matches_df['match_type'] == 'singles'])
-            st.metric("Singles Matches", singles_matches)
+            st.metric("Singles Matches", by_type.get('singles', 0))
         with col4:
-            doubles_matches = len(matches_df[matches_df['match_type'] == 'doubles'])
-            st.metric("Doubles Matches", doubles_matches)
+            st.metric("Doubles Matches", by_type.get('doubles', 0))
 
 
 if __name__ == "__main__":
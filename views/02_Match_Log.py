@@ -1,71 +1,409 @@
 import streamlit as st
+from assets import show_image
 import pandas as pd
+import numpy as np
 import re
-from datetime import date
+import uuid
+from datetime import date, timedelta
 from utils import (
-    get_supabase,
+    get_current_user,
     getMatches_safe,
-    deleteMatch,
+    get_data_version,
+    deleteMatches,
+    updateMatchesBatch,
+    pending_matches,
+    failed_matches,
     addSinglesMatch,
     addDoublesMatch,
     highlight_win_loss,
-    get_distinct_players_safe, 
-    getCurrentLevel_safe
+    get_player_index,
+    get_match_search,
+    get_duplicate_index,
+    find_duplicate_match,
+    deleteDuplicateMatches,
+    get_match_archive,
+    fetch_archived_matches,
+    get_win_model,
+    getCurrentLevel_safe,
+    show_data_as_of,
+    when_available
 )
+from players import clean_name, normalize_name
+from match_search import page
+from duplicates import KINDS
+from win_model import as_level
 
-def match_log_page():
-    # Initialize edit mode
-    if 'edit_mode' not in st.session_state:
-        st.session_state.edit_mode = False
+PLAYER_SUGGESTIONS = 8
 
-    # Auth & header
-    supabase = get_supabase()
-    user = supabase.auth.get_user().user
 
-    col1, col2 = st.columns([1, 4])
-    with col1:
-        st.image("assets/tournament.png", width=100)
-    with col2:
-        st.title("Match Log")
-
-    if st.session_state.edit_mode:
-        st.info("Edit Mode: select rows and delete.")
-    st.divider()
-    st.markdown(
-        "**The SmashTrack Match Log** is where you can view/update your match history."
+def player_picker(label, key, index):
+    """
+    Search box + top-k suggestions for one player slot.
+    Only the best matches are sent to the selectbox. A typed name (or alias)
+    of a known player puts that player first; any other typed name is offered
+    first as a new player, so a near miss ("Jon Smith" for "John Smith") is
+    never recorded unless the user picks it.
+    """
+    query = st.text_input(
+        f"Search {label}",
+        key=f"{key}_query",
+        placeholder="Start typing a name..."
+    )
+    options = index.search(query, k=PLAYER_SUGGESTIONS)
+    typed = clean_name(query)
+    known = index.registry.resolve(typed) if typed else None
+    is_new = bool(typed) and known is None
+    # The selectbox defaults to its first option: the exact player typed, else the new name
+    first = typed if is_new else index.registry.name(known)
+    if first:
+        options = [first] + [name for name in options if name != first]
+    return st.selectbox(
+        f"Select {label}",
+        options,
+        key=f"{key}_choice",
+        format_func=lambda name: f"New player: {name}" if is_new and name == typed else name,
     )
 
-    # Fetch past names
-    players = get_distinct_players_safe(user.id)
-    dropdown_options = ["Enter new name..."] + players
+def show_win_probability(model, opponent_levels, partner_level=None):
+    """Pre-match win probability caption for the add-match forms"""
+    if model.user_level is None:
+        st.caption("Set your level on the Profile page to see a win probability.")
+        return
+    doubles = partner_level is not None
+    team_level = (model.user_level + partner_level) / 2 if doubles else model.user_level
+    level_diff = team_level - sum(opponent_levels) / len(opponent_levels)
+    p = model.win_probability(level_diff, doubles=doubles)
+    source = "global model" if model.is_global else "your match history"
+    st.caption(f"Pre-match win probability: **{p:.0%}** (from {source})")
+
+# ─── History tables (cached per data version) ──────────────────────────────────
+
+LEVELS = [2.0, 2.5, 3.0, 3.5, 4.0, 4.5, 5.0, 5.5]
+
+# Display column -> `matches` column, for the columns users can edit inline
+SINGLES_COLUMNS = {
+    "Match Date": "match_date",
+    "Your Score": "user_team_score",
+    "Opponent Score": "opponent_team_score",
+    "Opponent": "opponent_1",
+    "Opponent Level": "opponent_1_level",
+}
+DOUBLES_COLUMNS = {
+    "Match Date": "match_date",
+    "Your Score": "user_team_score",
+    "Opponent Score": "opponent_team_score",
+    "Partner": "player_partner",
+    "Partner Level": "player_partner_level",
+    "Opponent 1": "opponent_1",
+    "Opponent 1 Level": "opponent_1_level",
+    "Opponent 2": "opponent_2",
+    "Opponent 2 Level": "opponent_2_level",
+}
+EDITABLE_COLUMNS = {"Singles": SINGLES_COLUMNS, "Doubles": DOUBLES_COLUMNS}
+
+def _history_frame(user_id, match_type, columns):
+    df = getMatches_safe(user_id)
+    df = df[df["match_type"] == match_type].sort_values("match_date", ascending=False)
+    df = df.assign(match_date=df["match_date"].dt.date)
+    df = df.rename(columns={"id": "Match ID", **{v: k for k, v in columns.items()}})
+    df["Win or Loss"] = np.where(df["Your Score"] > df["Opponent Score"], "Win", "Loss")
+    return df
+
+@st.cache_data(ttl=300, max_entries=64)
+def singles_history(user_id, data_version):
+    """Display-ready singles history with its match id column, newest first"""
+    df_s = _history_frame(user_id, "singles", SINGLES_COLUMNS)
+    return df_s[[
+        "Match ID", "Match Date", "Win or Loss", "Your Score", "Opponent Score",
+        "Opponent", "Opponent Level"
+    ]].reset_index(drop=True)
+
+@st.cache_data(ttl=300, max_entries=64)
+def doubles_history(user_id, data_version):
+    """Display-ready doubles history with its match id column, newest first"""
+    df_d = _history_frame(user_id, "doubles", DOUBLES_COLUMNS)
+    # Calculate average team level
+    user_level = as_level(getCurrentLevel_safe(user_id))
+    user_level = np.nan if user_level is None else user_level
+    df_d["Team Level"] = ((df_d["Partner Level"] + user_level) / 2).round(2)
+    df_d["Opponent Team Level"] = ((df_d["Opponent 1 Level"] + df_d["Opponent 2 Level"]) / 2).round(2)
+    return df_d[[
+        "Match ID", "Match Date", "Win or Loss", "Your Score", "Opponent Score", "Team Level",
+        "Opponent Team Level", "Partner", "Partner Level", "Opponent 1", "Opponent 1 Level",
+        "Opponent 2", "Opponent 2 Level"
+    ]].reset_index(drop=True)
+
+def _format_date(d):
+    return d.strftime('%m/%d/%Y')
+
+HISTORY_FORMATS = {
+    "Singles": {"Match Date": _format_date, "Opponent Level": "{:.1f}"},
+    "Doubles": {
+        "Match Date": _format_date,
+        "Partner Level": "{:.1f}",
+        "Opponent 1 Level": "{:.1f}",
+        "Opponent 2 Level": "{:.1f}",
+        "Team Level": "{:.2f}",
+        "Opponent Team Level": "{:.2f}"
+    },
+}
+
+def history_changes(history, edited, columns):
+    """
+    Diff the edited table against the cached history in one vectorized pass.
+    Returns {match_id: {matches column: new value}} for changed cells only.
+    """
+    before = history[list(columns)].reset_index(drop=True)
+    after = edited[list(columns)].reset_index(drop=True)
+    changed = before.ne(after) & ~(before.isna() & after.isna())
+    changes = {}
+    for i, col in zip(*np.nonzero(changed.to_numpy())):
+        match_id = history["Match ID"].iat[i]
+        display_col = before.columns[col]
+        changes.setdefault(match_id, {})[columns[display_col]] = after.iat[i, col]
+    return changes
+
+def validate_changes(history, changes):
+    """Same rules as the add-match forms, applied to each edited row"""
+    errors = []
+    rows = history.set_index("Match ID")
+    for match_id, edits in changes.items():
+        date_label = _format_date(rows.at[match_id, "Match Date"])
+        for col, value in edits.items():
+            if col == "match_date" and (value is None or pd.isna(value) or value > date.today()):
+                errors.append(f"{date_label}: date must be set and not in the future.")
+            elif col in ("opponent_1", "opponent_2", "player_partner"):
+                if not isinstance(value, str) or not re.fullmatch(r"[A-Za-z ]+", value.strip()):
+                    errors.append(f"{date_label}: names must contain only letters and spaces.")
+            elif col.endswith("_level") and value not in LEVELS:
+                errors.append(f"{date_label}: levels must be one of {', '.join(map(str, LEVELS))}.")
+            elif col.endswith("_score") and (pd.isna(value) or value < 0):
+                errors.append(f"{date_label}: scores must be 0 or more.")
+
+        score = {"user_team_score": rows.at[match_id, "Your Score"],
+                 "opponent_team_score": rows.at[match_id, "Opponent Score"]}
+        score.update({k: v for k, v in edits.items() if k in score})
+        if score["user_team_score"] == score["opponent_team_score"]:
+            errors.append(f"{date_label}: scores cannot be tied.")
+    return errors
+
+# ─── Search & pages ───────────────────────────────────────────────────────────
+
+PAGE_SIZE = 25
+SEARCH_FIELDS = {
+    "Everything": None,
+    "Opponents": ["opponent"],
+    "Partners": ["partner"],
+    "Level notes": ["notes"],
+}
+RESULTS = {"All": None, "Wins": "Win", "Losses": "Loss"}
+
+def _range_slider(label, key, index, name, step, fmt):
+    """A range slider over a column's full span; None when left at the full span"""
+    bounds = index.bounds(name)
+    if bounds is None or bounds[0] == bounds[1]:
+        return None
+    low, high = (float(b) for b in bounds)
+    value = st.slider(label, low, high, (low, high), step=step, format=fmt, key=key)
+    return None if value == (low, high) else value
+
+def history_query(index, view):
+    """Search box + filters for one history table -> MatchSearchIndex.search() keywords"""
+    label = view.lower()
+    col_text, col_fields = st.columns([3, 1])
+    with col_text:
+        text = st.text_input("Search", key=f"mh_{label}_text",
+                             placeholder="Opponent or partner name, or words from your level notes")
+    with col_fields:
+        fields = [f for f in SEARCH_FIELDS if view == "Doubles" or f != "Partners"]
+        field = st.selectbox("Search in", fields, key=f"mh_{label}_fields")
+    query = {"text": text, "fields": SEARCH_FIELDS[field], "match_type": label}
+
+    with st.expander("Filters"):
+        # Result counts for everything else that's selected, so each option shows what it would give
+        counts = index.facet_counts(index.search(**query)).get("result", {})
+        totals = {"All": sum(counts.values()), "Wins": counts.get("Win", 0), "Losses": counts.get("Loss", 0)}
+        result = st.radio("Result", list(RESULTS), horizontal=True, key=f"mh_{label}_result",
+                          format_func=lambda option: f"{option} ({totals[option]})")
+        query["result"] = RESULTS[result]
+
+        first, last = index.bounds("date") or (date.today(), date.today())
+        dates = st.date_input("Dates", value=(first, last), min_value=first, max_value=last,
+                              format="MM/DD/YYYY", key=f"mh_{label}_dates")
+        if len(dates) == 2 and tuple(dates) != (first, last):
+            query["date"] = tuple(dates)
+
+        col1, col2 = st.columns(2)
+        with col1:
+            query["your_score"] = _range_slider("Your score", f"mh_{label}_your", index, "your_score", 1.0, "%d")
+            query["margin"] = _range_slider("Point margin", f"mh_{label}_margin", index, "margin", 1.0, "%d")
+        with col2:
+            query["opponent_score"] = _range_slider("Opponent score", f"mh_{label}_opp", index, "opponent_score", 1.0, "%d")
+            query["opponent_level"] = _range_slider("Opponent level", f"mh_{label}_level", index, "opponent_level", 0.25, "%.2f")
+    return query
+
+def history_page(user_id, history, view):
+    """
+    Filter a history table through the search index and cut out the current
+    page. Returns (page of rows, editor key); the key changes with the rows
+    shown, so pending edits never land on a different page's rows.
+    """
+    label = view.lower()
+    index = get_match_search(user_id)
+    query = history_query(index, view)
+    positions = index.search(**query)
+
+    # A new search starts from the first page
+    signature = repr(sorted(query.items()))
+    if st.session_state.get(f"mh_{label}_signature") != signature:
+        st.session_state[f"mh_{label}_signature"] = signature
+        st.session_state[f"mh_{label}_page"] = 1
+
+    if not len(positions):
+        st.info("No matches fit this search.")
+        return history.iloc[:0], None
+    shown, pages = page(positions, st.session_state.get(f"mh_{label}_page", 1), PAGE_SIZE)
+    number = min(st.session_state.get(f"mh_{label}_page", 1), pages)
+    st.session_state[f"mh_{label}_page"] = number     # e.g. the last page emptied by a delete
+
+    rows = history.set_index("Match ID")
+    ids = [i for i in index.match_ids(shown).tolist() if i in rows.index]
+    start = (number - 1) * PAGE_SIZE
+    col_info, col_page = st.columns([4, 1])
+    with col_info:
+        st.caption(f"Showing {start + 1}-{start + len(ids)} of {len(positions)} matches")
+    with col_page:
+        if pages > 1:
+            st.number_input("Page", min_value=1, max_value=pages, step=1, key=f"mh_{label}_page")
+    return rows.loc[ids].reset_index(), f"{label}_editor_{hash(signature)}_{number}"
+
+# ─── Duplicates ───────────────────────────────────────────────────────────────
+
+DUPLICATE_NOTES = {
+    "exact": "with the same players, levels and score",
+    "swapped": "with the same players and score (opponents in the other order)",
+    "near": "with the same players and score (different levels)",
+}
+
+def duplicate_check(user_id, match):
+    """
+    "new", or "duplicate" after warning that the match was already logged, or
+    "confirmed" when the same match is submitted again after that warning.
+    """
+    duplicate = find_duplicate_match(user_id, match)
+    if duplicate is None:
+        return "new"
+    signature = repr(sorted(match.items()))
+    if st.session_state.get("confirm_duplicate") == signature:
+        del st.session_state["confirm_duplicate"]
+        return "confirmed"
+    st.session_state["confirm_duplicate"] = signature
+    st.warning(f"You already logged a match on {_format_date(match['match_date'])} "
+               f"{DUPLICATE_NOTES[duplicate[0]]}. Click Add again to log it anyway.")
+    return "duplicate"
+
+def _players(rows):
+    partner = rows["player_partner"] if "player_partner" in rows else pd.Series(None, index=rows.index)
+    opponents = rows[[c for c in ("opponent_1", "opponent_2") if c in rows]]
+    return [
+        " & ".join(n for n in opps if isinstance(n, str)) + (f" (with {p})" if isinstance(p, str) else "")
+        for opps, p in zip(opponents.itertuples(index=False), partner)
+    ]
+
+def duplicates_panel(user_id):
+    """Saved matches logged more than once, with one-click cleanup"""
+    index = get_duplicate_index(user_id)
+    counts = index.counts()
+    if not counts:
+        return
+    total = sum(counts.values())
+    with st.expander(f":material/content_copy: {total} possible duplicate match{'es' if total > 1 else ''}"):
+        st.caption("Matches logged more than once: same date, players and score. "
+                   "The first one logged is kept.")
+        kinds = [
+            kind for kind, label in KINDS.items()
+            if counts.get(kind) and st.checkbox(f"{label} ({counts[kind]})", value=kind != "near",
+                                                key=f"duplicates_{kind}")
+        ]
+        duplicates = index.duplicates(kinds)
+        rows = getMatches_safe(user_id).set_index("id").loc[duplicates["id"]]
+        st.dataframe(pd.DataFrame({
+            "Match Date": rows["match_date"].dt.strftime("%m/%d/%Y").to_numpy(),
+            "Type": rows["match_type"].str.title().to_numpy(),
+            "Players": _players(rows),
+            "Score": [f"{u}-{o}" for u, o in zip(rows["user_team_score"], rows["opponent_team_score"])],
+            "Duplicate": duplicates["kind"].map(KINDS).to_numpy(),
+        }), use_container_width=True, hide_index=True)
+        n = len(duplicates)
+        if st.button(f"🗑️ Remove {n} duplicate{'s' if n != 1 else ''}", key="remove_duplicates",
+                     type="primary", disabled=not n):
+            removed = deleteDuplicateMatches(user_id, kinds)
+            st.success(f"Removed {removed} duplicate match{'es' if removed != 1 else ''}")
+            st.rerun()
+
+# ─── Archive ──────────────────────────────────────────────────────────────────
+
+def archive_panel(user_id):
+    """Archived matches, fetched a year at a time when the player asks for them"""
+    archive = get_match_archive(user_id)
+    if not archive.matches:
+        return
+    n = archive.matches
+    with st.expander(f":material/inventory_2: {n} archived match{'es' if n > 1 else ''} "
+                     f"(before {_format_date(archive.before)})"):
+        last = archive.before - timedelta(days=1)
+        years = list(range(last.year, archive.first_month.year - 1, -1))
+        year = st.selectbox("Year", years, index=None, placeholder="Choose a year to look up",
+                            key="archive_year")
+        if year is None:
+            return
+        rows = fetch_archived_matches(user_id, date(year, 1, 1), date(year, 12, 31))
+        if rows.empty:
+            st.info(f"No archived matches from {year}.")
+            return
+        table = pd.DataFrame({
+            "Match Date": rows["match_date"].dt.date.to_numpy(),
+            "Type": rows["match_type"].str.title().to_numpy(),
+            "Win or Loss": np.where(rows["user_team_score"] > rows["opponent_team_score"], "Win", "Loss"),
+            "Score": [f"{u}-{o}" for u, o in zip(rows["user_team_score"], rows["opponent_team_score"])],
+            "Players": _players(rows),
+        })
+        st.dataframe(
+            table.style.applymap(highlight_win_loss, subset=["Win or Loss"])
+                 .format({"Match Date": _format_date}),
+            use_container_width=True, hide_index=True
+        )
+
+# ─── Fragments ────────────────────────────────────────────────────────────────
+# Each section reruns on its own: typing in the add-match form doesn't rebuild
+# the history table, and ticking rows in the editor doesn't touch the form.
+# A section that can't load its data shows a message instead of a traceback.
+
+@st.fragment
+@when_available
+def add_match_section(user_id):
+    # Player search index (rebuilt only when the roster changes)
+    index = get_player_index(user_id)
+    model = get_win_model(user_id)
 
     # Add New Match
     with st.expander(":heavy_plus_sign: Add New Match", expanded=False):
         match_type = st.radio("Match Type", ["Singles", "Doubles"], horizontal=True)
 
         if match_type == "Singles":
-            with st.form("singles_form"):
+            with st.container(border=True):
                 st.subheader("Singles Match")
                 m_date = st.date_input("Date", date.today(), key="s_date")
 
-                # Opponent selection
                 # Singles Opponent selection
-                opp_choice = st.selectbox("Select Opponent", dropdown_options, key="s_opp_choice")
-                if opp_choice == "Enter new name...":
-                    opponent = st.text_input(
-                        "Enter Opponent Name",
-                        key="s_opp_text",
-                        placeholder="Enter opponent's name",
-                        value=""
-                    )
-                else:
-                    opponent = opp_choice
+                opponent = player_picker("Opponent", "s_opp", index)
 
                 opp_level = st.selectbox(
                     "Opponent Level",
-                    [2.0, 2.5, 3.0, 3.5, 4.0, 4.5, 5.0, 5.5],
+                    LEVELS,
                     key="s_opp_level"
                 )
+                show_win_probability(model, [opp_level])
                 
                 col1, col2 = st.columns(2)
                 with col1:
@@ -73,7 +411,7 @@ def match_log_page():
                 with col2:
                     opp_score = st.number_input("Opponent Score", min_value=0, step=1, key="s_opp_score")
 
-                submitted = st.form_submit_button("Add Singles Match")
+                submitted = st.button("Add Singles Match", type="primary")
                 if submitted:
                     errors = []
                     
@@ -81,12 +419,9 @@ def match_log_page():
                     if m_date > date.today():
                         errors.append("Date cannot be in the future.")
                     
-                    # Get the actual opponent name
-                    final_opponent = opponent if opp_choice == "Enter new name..." else opp_choice
-                    
-                    if not final_opponent or not final_opponent.strip():
+                    if not opponent or not opponent.strip():
                         errors.append("Opponent name is required.")
-                    elif not re.fullmatch(r"[A-Za-z ]+", final_opponent.strip()):
+                    elif not re.fullmatch(r"[A-Za-z ]+", opponent.strip()):
                         errors.append("Opponent name must contain only letters and spaces.")
                     
                     if user_score == opp_score:
@@ -96,41 +431,40 @@ def match_log_page():
                         for error in errors:
                             st.error(error)
                     else:
-                        if addSinglesMatch(
-                            current_user_id=user.id,
+                        check = duplicate_check(user_id, {
+                            "match_date": m_date, "match_type": "singles",
+                            "opponent_1": opponent.strip(), "opponent_1_level": opp_level,
+                            "user_team_score": user_score, "opponent_team_score": opp_score,
+                        })
+                        if check != "duplicate" and addSinglesMatch(
+                            current_user_id=user_id,
                             match_date=m_date,
-                            opponent=final_opponent.strip(),
+                            opponent=opponent.strip(),
                             opponent_level=opp_level,
                             user_score=user_score,
-                            opponent_score=opp_score
+                            opponent_score=opp_score,
+                            # a repeat the user confirmed mustn't be collapsed as a double submit
+                            client_key=str(uuid.uuid4()) if check == "confirmed" else None
                         ):
                             st.success("Singles match added successfully!")
-                            st.cache_data.clear()
                             # Clear form fields
-                            for key in ['s_date', 's_opp_choice', 's_opp_text', 's_opp_level', 's_usr_score', 's_opp_score']:
+                            for key in ['s_date', 's_opp_query', 's_opp_choice', 's_opp_level', 's_usr_score', 's_opp_score']:
                                 if key in st.session_state:
                                     del st.session_state[key]
                             st.rerun()
 
         else:  # Doubles
-            with st.form("doubles_form"):
+            with st.container(border=True):
                 st.subheader("Doubles Match")
                 d_date = st.date_input("Date", date.today(), key="d_date")
 
-                # Partner selection
                 # Partner selection
                 st.write("**Your Partner**")
-                partner_choice = st.selectbox("Select Partner", dropdown_options, key="d_partner_choice")
-                if partner_choice == "Enter new name...":
-                    partner = st.text_input("Enter Partner Name", key="d_partner_text", placeholder="Enter partner's name")
-                else:
-                    partner = partner_choice
-                    # Only show this if not entering a new name
-                    st.text_input("Selected Partner", value=partner, disabled=True, key="d_partner_display")
+                partner = player_picker("Partner", "d_partner", index)
                 
                 part_level = st.selectbox(
                     "Partner Level",
-                    [2.0, 2.5, 3.0, 3.5, 4.0, 4.5, 5.0, 5.5],
+                    LEVELS,
                     key="d_part_level"
                 )
 
@@ -138,32 +472,23 @@ def match_log_page():
                 st.write("**Opponents**")
                 
                 # Opponent 1 selection
-                opp1_choice = st.selectbox("Select Opponent 1", dropdown_options, key="d_opp1_choice")
-                if opp1_choice == "Enter new name...":
-                    opp1 = st.text_input("Enter Opponent 1 Name", key="d_opp1_text", placeholder="Enter first opponent's name")
-                else:
-                    opp1 = opp1_choice
-                    st.text_input("Selected Opponent 1", value=opp1, disabled=True, key="d_opp1_display")
+                opp1 = player_picker("Opponent 1", "d_opp1", index)
                 
                 opp1_level = st.selectbox(
                     "Opponent 1 Level",
-                    [2.0, 2.5, 3.0, 3.5, 4.0, 4.5, 5.0, 5.5],
+                    LEVELS,
                     key="d_opp1_level"
                 )
 
                 # Opponent 2 selection
-                opp2_choice = st.selectbox("Select Opponent 2", dropdown_options, key="d_opp2_choice")
-                if opp2_choice == "Enter new name...":
-                    opp2 = st.text_input("Enter Opponent 2 Name", key="d_opp2_text", placeholder="Enter second opponent's name")
-                else:
-                    opp2 = opp2_choice
-                    st.text_input("Selected Opponent 2", value=opp2, disabled=True, key="d_opp2_display")
+                opp2 = player_picker("Opponent 2", "d_opp2", index)
                 
                 opp2_level = st.selectbox(
                     "Opponent 2 Level",
-                    [2.0, 2.5, 3.0, 3.5, 4.0, 4.5, 5.0, 5.5],
+                    LEVELS,
                     key="d_opp2_level"
                 )
+                show_win_probability(model, [opp1_level, opp2_level], partner_level=part_level)
 
                 st.divider()
                 st.write("**Match Score**")
@@ -173,7 +498,7 @@ def match_log_page():
                 with col2:
                     opp_score = st.number_input("Opponent Team Score", min_value=0, step=1, key="d_opp_score")
 
-                submitted = st.form_submit_button("Add Doubles Match")
+                submitted = st.button("Add Doubles Match", type="primary")
                 if submitted:
                     errors = []
                     
@@ -181,21 +506,16 @@ def match_log_page():
                     if d_date > date.today():
                         errors.append("Date cannot be in the future.")
                     
-                    # Get the actual names
-                    final_partner = partner if partner_choice == "Enter new name..." else partner_choice
-                    final_opp1 = opp1 if opp1_choice == "Enter new name..." else opp1_choice
-                    final_opp2 = opp2 if opp2_choice == "Enter new name..." else opp2_choice
-                    
                     # Validate names
-                    for name, label in [(final_partner, "Partner"), (final_opp1, "Opponent 1"), (final_opp2, "Opponent 2")]:
+                    for name, label in [(partner, "Partner"), (opp1, "Opponent 1"), (opp2, "Opponent 2")]:
                         if not name or not name.strip():
                             errors.append(f"{label} name is required.")
                         elif not re.fullmatch(r"[A-Za-z ]+", name.strip()):
                             errors.append(f"{label} name must contain only letters and spaces.")
                     
                     # Check for duplicate names
-                    names = [final_partner.strip(), final_opp1.strip(), final_opp2.strip()]
-                    if len(set(names)) != len(names):
+                    names = [normalize_name(n) for n in (partner, opp1, opp2)]
+                    if all(names) and len(set(names)) != len(names):
                         errors.append("All players must have different names.")
                     
                     if user_score == opp_score:
@@ -205,41 +525,132 @@ def match_log_page():
                         for error in errors:
                             st.error(error)
                     else:
-                        if addDoublesMatch(
-                            current_user_id=user.id,
+                        check = duplicate_check(user_id, {
+                            "match_date": d_date, "match_type": "doubles",
+                            "player_partner": partner.strip(), "player_partner_level": part_level,
+                            "opponent_1": opp1.strip(), "opponent_1_level": opp1_level,
+                            "opponent_2": opp2.strip(), "opponent_2_level": opp2_level,
+                            "user_team_score": user_score, "opponent_team_score": opp_score,
+                        })
+                        if check != "duplicate" and addDoublesMatch(
+                            current_user_id=user_id,
                             match_date=d_date,
-                            partner=final_partner.strip(),
+                            partner=partner.strip(),
                             partner_level=part_level,
-                            opp1=final_opp1.strip(),
+                            opp1=opp1.strip(),
                             opp1_level=opp1_level,
-                            opp2=final_opp2.strip(),
+                            opp2=opp2.strip(),
                             opp2_level=opp2_level,
                             user_score=user_score,
-                            opponent_score=opp_score
+                            opponent_score=opp_score,
+                            client_key=str(uuid.uuid4()) if check == "confirmed" else None
                         ):
                             st.success("Doubles match added successfully!")
-                            st.cache_data.clear()
                             # Clear form fields
-                            for key in ['d_date', 'd_partner_choice', 'd_partner_text', 'd_part_level', 
-                                       'd_opp1_choice', 'd_opp1_text', 'd_opp1_level',
-                                       'd_opp2_choice', 'd_opp2_text', 'd_opp2_level', 
+                            for key in ['d_date', 'd_partner_query', 'd_partner_choice', 'd_part_level', 
+                                       'd_opp1_query', 'd_opp1_choice', 'd_opp1_level',
+                                       'd_opp2_query', 'd_opp2_choice', 'd_opp2_level', 
                                        'd_usr_score', 'd_opp_score']:
                                 if key in st.session_state:
                                     del st.session_state[key]
                             st.rerun()
 
-    st.divider()
 
-    # Match History & Edit Toggle
-    st.markdown("## Match History")
-    if st.button("✏️ " + ("Exit Edit Mode" if st.session_state.edit_mode else "Edit Match Log")):
-        st.session_state.edit_mode = not st.session_state.edit_mode
+@st.fragment
+@when_available
+def edit_panel(user_id, history, view, editor_key):
+    """Inline editing + bulk delete for one page of a history table"""
+    label = view.lower()
+    # Matches still being saved have temporary ids; they become editable once confirmed
+    unsaved = history["Match ID"] < 0
+    if unsaved.any():
+        st.caption(f"{int(unsaved.sum())} match{'es' if unsaved.sum() > 1 else ''} still saving - "
+                   "they can be edited once saved.")
+        history = history[~unsaved].reset_index(drop=True)
+    columns = EDITABLE_COLUMNS[view]
+    selection_df = pd.DataFrame({"Select": [False] * len(history)})
+    display_df = pd.concat([selection_df, history.drop(columns="Match ID")], axis=1)
+    level_column = st.column_config.SelectboxColumn(options=LEVELS, required=True)
+    edited_df = st.data_editor(
+        display_df,
+        disabled=[c for c in display_df.columns if c != "Select" and c not in columns],
+        column_config={
+            "Match Date": st.column_config.DateColumn(format="MM/DD/YYYY", max_value=date.today(), required=True),
+            "Your Score": st.column_config.NumberColumn(min_value=0, step=1, required=True),
+            "Opponent Score": st.column_config.NumberColumn(min_value=0, step=1, required=True),
+            **{col: level_column for col in columns if col.endswith("Level")},
+        },
+        hide_index=True,
+        use_container_width=True,
+        key=editor_key
+    )
+    selected_ids = history.loc[edited_df["Select"].to_numpy(), "Match ID"].tolist()
+    changes = history_changes(history, edited_df, columns)
+
+    col_save, col_del, col_warn = st.columns([2, 2, 6])
+    with col_save:
+        save_button = st.button(
+            "💾 Save Changes",
+            key=f"save_{label}",
+            disabled=not changes
+        )
+    with col_del:
+        delete_button = st.button(
+            "🗑️ Delete Selected",
+            key=f"delete_{label}",
+            disabled=not selected_ids
+        )
+    with col_warn:
+        if changes:
+            st.info(f"{len(changes)} edited match{'es' if len(changes) > 1 else ''} not saved yet")
+        if selected_ids:
+            st.warning(f"{len(selected_ids)} match{'es' if len(selected_ids) > 1 else ''} selected")
+
+    if save_button and changes:
+        errors = validate_changes(history, changes)
+        if errors:
+            for error in errors:
+                st.error(error)
+        elif (saved := updateMatchesBatch(user_id, changes)) is not None:
+            if len(saved) < len(changes):
+                gone = len(changes) - len(saved)
+                st.toast(f"{gone} edited match{'es were' if gone > 1 else ' was'} deleted elsewhere and not saved")
+            # The cached frame was patched in place; only reset the editor's pending edits
+            st.session_state.pop(editor_key, None)
+            st.rerun()
+
+    if delete_button and selected_ids:
+        deleteMatches(user_id, selected_ids)
+        st.success(f"Deleted {len(selected_ids)} match{'es' if len(selected_ids) > 1 else ''}")
         st.rerun()
 
-    df = getMatches_safe(user.id)
-    if df.empty:
+def toggle_edit_mode():
+    st.session_state.edit_mode = not st.session_state.edit_mode
+
+@st.fragment
+@when_available
+def history_section(user_id):
+    if st.session_state.edit_mode:
+        st.info("Edit Mode: edit cells and save, or select rows and delete.")
+    st.button(
+        "✏️ " + ("Exit Edit Mode" if st.session_state.edit_mode else "Edit Match Log"),
+        on_click=toggle_edit_mode
+    )
+
+    for row, error in failed_matches(user_id):
+        opponent = row.get("opponent_1") or "opponent"
+        st.error(f"Couldn't save your {row['match_type']} match vs {opponent} "
+                 f"on {row['match_date']}: {getattr(error, 'message', error)}")
+    pending = len(pending_matches(user_id))
+    if pending:
+        st.caption(f"Saving {pending} match{'es' if pending > 1 else ''}...")
+
+    version = get_data_version(user_id)
+    archive_panel(user_id)
+    if getMatches_safe(user_id).empty:
         st.info("No matches to show yet.")
         return
+    duplicates_panel(user_id)
 
     # Use only the radio key for match history view selection
     if "match_log_type" not in st.session_state:
@@ -252,167 +663,58 @@ def match_log_page():
         key="match_log_type"
     )
 
-    if 'selected_matches' not in st.session_state:
-        st.session_state.selected_matches = set()
+    st.subheader(f"Your {match_type_view} Matches")
+    if match_type_view == "Singles":
+        history = singles_history(user_id, version)
+    else:
+        history = doubles_history(user_id, version)
 
-    if st.session_state["match_log_type"] == "Singles":
-        st.subheader("Your Singles Matches")
-        df_s = df[df["match_type"] == "singles"].copy()
-        
-        if df_s.empty:
-            st.info("No singles matches found.")
-            return
-            
-        match_ids = df_s["id"].tolist()
-
-        df_s["match_date"] = pd.to_datetime(df_s["match_date"]).dt.date
-        df_s["match_date"] = pd.to_datetime(df_s["match_date"]).dt.strftime('%m/%d/%Y')
-        df_s.rename(columns={
-            "match_date": "Match Date",
-            "user_team_score": "Your Score",
-            "opponent_team_score": "Opponent Score",
-            "opponent_1": "Opponent",
-            "opponent_1_level": "Opponent Level",
-        }, inplace=True)
-        df_s["Win or Loss"] = df_s.apply(
-            lambda r: "Win" if r["Your Score"] > r["Opponent Score"] else "Loss", axis=1
-        )
-        df_s = df_s[[
-            "Match Date", "Win or Loss", "Your Score", "Opponent Score",
-            "Opponent", "Opponent Level"
-        ]].sort_values("Match Date", ascending=False)
-
-        if st.session_state.edit_mode:
-            selection_df = pd.DataFrame({
-                "Select": [False] * len(df_s),
-                "Match ID": match_ids
-            })
-            display_df = pd.concat( 
-                [selection_df["Select"].reset_index(drop=True),
-                 df_s.reset_index(drop=True)], axis=1
-            )
-            edited_df = st.data_editor(
-                display_df,
-                disabled=df_s.columns.tolist(),
-                hide_index=True,
-                use_container_width=True,
-                key="singles_editor"
-            )
-            selected_indices = edited_df.index[edited_df["Select"]].tolist()
-            selected_ids = [match_ids[i] for i in selected_indices]
-            
-            col_del, col_warn = st.columns([2, 8])
-            with col_del:
-                delete_button = st.button(
-                    "🗑️ Delete Selected",
-                    key="delete_singles",
-                    disabled=not selected_ids
-                )
-            with col_warn:
-                if selected_ids:
-                    st.warning(f"{len(selected_ids)} match{'es' if len(selected_ids) > 1 else ''} selected")
-                    
-            if delete_button and selected_ids:
-                for mid in selected_ids:
-                    deleteMatch(mid, user.id)
-                st.success(f"Deleted {len(selected_ids)} match{'es' if len(selected_ids) > 1 else ''}")
-                st.cache_data.clear()
-                st.rerun()
-        else:
-            styled = (
-                df_s.style
-                  .applymap(highlight_win_loss, subset=["Win or Loss"])
-                  .set_properties(**{"font-weight": "bold"}, subset=["Win or Loss"])
-                  .format({"Opponent Level": "{:.1f}"})
-            )
-            st.dataframe(styled, use_container_width=True, hide_index=True)
+    if history.empty:
+        st.info(f"No {match_type_view.lower()} matches found.")
+        return
 
+    history, editor_key = history_page(user_id, history, match_type_view)
+    if history.empty:
+        return
+
+    if st.session_state.edit_mode:
+        edit_panel(user_id, history, match_type_view, editor_key)
     else:
-        st.subheader("Your Doubles Matches")
-        df_d = df[df["match_type"] == "doubles"].copy()
-        
-        if df_d.empty:
-            st.info("No doubles matches found.")
-            return
-            
-        match_ids = df_d["id"].tolist()
-
-        df_d["match_date"] = pd.to_datetime(df_d["match_date"]).dt.date
-        df_d["match_date"] = pd.to_datetime(df_d["match_date"]).dt.strftime('%m/%d/%Y')
-        df_d.rename(columns={
-            "match_date": "Match Date",
-            "user_team_score": "Your Score",
-            "opponent_team_score": "Opponent Score",
-            "player_partner": "Partner",
-            "player_partner_level": "Partner Level",
-            "opponent_1": "Opponent 1",
-            "opponent_1_level": "Opponent 1 Level",
-            "opponent_2": "Opponent 2",
-            "opponent_2_level": "Opponent 2 Level",
-        }, inplace=True)
-        df_d["Win or Loss"] = df_d.apply(
-            lambda r: "Win" if r["Your Score"] > r["Opponent Score"] else "Loss", axis=1
+        styled = (
+            history.drop(columns="Match ID").style
+              .applymap(highlight_win_loss, subset=["Win or Loss"])
+              .set_properties(**{"font-weight": "bold"}, subset=["Win or Loss"])
+              .format(HISTORY_FORMATS[match_type_view])
         )
-        # Calculate average team level
-        user_level = getCurrentLevel_safe(user.id)
-        df_d["Team Level"] = ((df_d["Partner Level"]+ user_level)/2).round(2)
-        df_d["Opponent Team Level"] = ((df_d["Opponent 1 Level"] + df_d["Opponent 2 Level"]) / 2).round(2)
-        df_d = df_d[[
-            "Match Date", "Win or Loss", "Your Score", "Opponent Score","Team Level","Opponent Team Level",
-            "Partner", "Partner Level", "Opponent 1", "Opponent 1 Level",
-            "Opponent 2", "Opponent 2 Level"
-        ]].sort_values("Match Date", ascending=False)
-
-        if st.session_state.edit_mode:
-            selection_df = pd.DataFrame({
-                "Select": [False] * len(df_d),
-                "Match ID": match_ids
-            })
-            display_df = pd.concat(
-                [selection_df["Select"].reset_index(drop=True),
-                 df_d.reset_index(drop=True)], axis=1
-            )
-            edited_df = st.data_editor(
-                display_df,
-                disabled=df_d.columns.tolist(),
-                hide_index=True,
-                use_container_width=True,
-                key="doubles_editor"
-            )
-            selected_indices = edited_df.index[edited_df["Select"]].tolist()
-            selected_ids = [match_ids[i] for i in selected_indices]
-            
-            col_del, col_warn = st.columns([2, 8])
-            with col_del:
-                delete_button = st.button(
-                    "🗑️ Delete Selected",
-                    key="delete_doubles",
-                    disabled=not selected_ids
-                )
-            with col_warn:
-                if selected_ids:
-                    st.warning(f"{len(selected_ids)} match{'es' if len(selected_ids) > 1 else ''} selected")
-                    
-            if delete_button and selected_ids:
-                for mid in selected_ids:
-                    deleteMatch(mid, user.id)
-                st.success(f"Deleted {len(selected_ids)} match{'es' if len(selected_ids) > 1 else ''}")
-                st.cache_data.clear()
-                st.rerun()
-        else:
-            styled = (
-                df_d.style
-                  .applymap(highlight_win_loss, subset=["Win or Loss"])
-                  .set_properties(**{"font-weight": "bold"}, subset=["Win or Loss"])
-                  .format({
-                      "Partner Level": "{:.1f}",
-                      "Opponent 1 Level": "{:.1f}",
-                      "Opponent 2 Level": "{:.1f}",
-                      "Team Level": "{:.2f}",
-                      "Opponent Team Level": "{:.2f}"
-                  })
-            )
-            st.dataframe(styled, use_container_width=True, hide_index=True)
+        st.dataframe(styled, use_container_width=True, hide_index=True)
+
+def match_log_page():
+    # Initialize edit mode
+    if 'edit_mode' not in st.session_state:
+        st.session_state.edit_mode = False
+
+    # Auth & header
+    user = get_current_user()
+
+    col1, col2 = st.columns([1, 4])
+    with col1:
+        show_image("tournament", width=100)
+    with col2:
+        st.title("Match Log")
+        show_data_as_of(user.id)
+
+    st.divider()
+    st.markdown(
+        "**The SmashTrack Match Log** is where you can view/update your match history."
+    )
+
+    add_match_section(user.id)
+
+    st.divider()
+
+    # Match History & Edit Toggle
+    st.markdown("## Match History")
+    history_section(user.id)
 
 if __name__ == "__main__":
-    match_log_page()
\ No newline at end of file
+    match_log_page()
@@ -1,267 +1,230 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from datetime import datetime, timedelta, date
-import numpy as np
-from utils import get_supabase, getMatches_safe, getCurrentLevel_safe
+from assets import show_image
+from datetime import date
+import analytics
+import charts
+from utils import (
+    get_current_user, getMatches_safe, getCurrentLevel_safe, get_win_model, get_dashboard_matches,
+    get_match_archive, get_data_version, get_figure_cache, get_leaderboard, get_peer_percentiles,
+    show_data_as_of
+)
+from peer_percentiles import PEER_METRICS, level_bucket, ordinal, peer_values
+from win_model import UPSET_THRESHOLD, as_level
+
+SECTIONS = [
+    "Performance Over Time",
+    "Scoring Analysis",
+    "Opponent Analysis",
+    "Level Progression",
+    "Win Expectancy",
+]
+
+
+# ─── Section builders ───────────────────────────────────────────────────────────
+# Each builder returns the aggregated frames for one section. Only the visible
+# section is built, and results are cached per (data version, filters).
+# Figures are not part of the result: they go through the figure cache below.
+
+def build_performance(user_id, df):
+    return {
+        "monthly_res": analytics.monthly_results(df),
+        "monthly_totals": analytics.monthly_totals(df),
+    }
+
+def build_scoring(user_id, df):
+    return {"avg_long": analytics.average_points(df)}
+
+def build_opponents(user_id, df):
+    return {
+        "singles_level": analytics.singles_by_level(df),
+        "doubles_level": analytics.doubles_by_level(df),
+    }
+
+def build_level(user_id, df):
+    return {"current_level": as_level(getCurrentLevel_safe(user_id))}
+
+def build_expectancy(user_id, df):
+    return analytics.expectancy(df, get_win_model(user_id), UPSET_THRESHOLD)
+
+SECTION_BUILDERS = {
+    "Performance Over Time": build_performance,
+    "Scoring Analysis": build_scoring,
+    "Opponent Analysis": build_opponents,
+    "Level Progression": build_level,
+    "Win Expectancy": build_expectancy,
+}
+
+@st.cache_data(ttl=300, max_entries=128)
+def build_section(user_id, data_version, period, match_type, date_range, today, section):
+    """Filter the user's matches and build one Dashboard section"""
+    df = get_dashboard_matches(user_id, period, match_type, date_range, today)
+    return SECTION_BUILDERS[section](user_id, df)
+
+
+# ─── Section renderers ──────────────────────────────────────────────────────────
+# `cache_key` is (user, data version, filters); adding a chart id gives a
+# figure-cache key, so repeat views skip Plotly figure construction entirely.
+
+def show_chart(cache_key, chart_id, build):
+    fig = get_figure_cache().get_or_build(cache_key + (chart_id,), build)
+    st.plotly_chart(fig, use_container_width=True)
+
+def render_performance(data, cache_key):
+    st.subheader("Wins vs Losses per Month")
+    show_chart(cache_key, "fig1", lambda: charts.monthly_results_chart(data["monthly_res"]))
+    st.subheader("Matches per Month")
+    show_chart(cache_key, "fig2", lambda: charts.monthly_totals_chart(data["monthly_totals"]))
+
+def render_scoring(data, cache_key):
+    st.subheader("Average Points For vs. Against")
+    show_chart(cache_key, "avg_points", lambda: charts.average_points_chart(data["avg_long"]))
+
+def render_opponents(data, cache_key):
+    st.subheader("Opponent Level Analysis")
+
+    # Singles: Win rate vs. opponent level
+    if data["singles_level"].empty:
+        st.info("No singles matches to analyze.")
+    else:
+        st.markdown("**Singles**")
+        st.dataframe(
+            data["singles_level"].rename(columns={"opponent_1_level": "Opponent Level"}),
+            use_container_width=True,
+            hide_index=True
+        )
+        show_chart(cache_key, "fig_s", lambda: charts.singles_level_chart(data["singles_level"]))
+
+    # Doubles: Win rate vs. average opponent team level
+    if data["doubles_level"].empty:
+        st.info("No doubles matches to analyze.")
+    else:
+        st.markdown("**Doubles**")
+        st.dataframe(data["doubles_level"], use_container_width=True, hide_index=True)
+        show_chart(cache_key, "fig_d", lambda: charts.doubles_level_chart(data["doubles_level"]))
+
+def render_level(data, cache_key):
+    st.subheader("Your Current Level")
+    if data["current_level"] is None:
+        st.info("No level data found.")
+    else:
+        st.metric("Level", f"{data['current_level']:.1f}")
+        show_chart(cache_key, "level_gauge", lambda: charts.level_gauge(data["current_level"]))
+
+def render_expectancy(data, cache_key):
+    st.subheader("Expected vs. Actual Results")
+    if not data["has_level"]:
+        st.info("Set your level on the Profile page to see expected results.")
+        return
+    if data["empty"]:
+        st.info("No matches with complete level information to score.")
+        return
+
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Expected Wins", f"{data['expected_wins']:.1f}")
+    c2.metric("Actual Wins", data["actual_wins"],
+              delta=f"{data['actual_wins'] - data['expected_wins']:+.1f} vs expected")
+    c3.metric("Upset Wins", len(data["upsets"]) + data["archived_upsets"])
+    if data["is_global"]:
+        st.caption("Using the global model until you have logged more matches.")
+
+    show_chart(cache_key, "expected_wins", lambda: charts.expected_wins_chart(data["monthly_exp"]))
+
+    if not data["upsets"].empty:
+        st.markdown(f"**Upset Wins** (under {UPSET_THRESHOLD:.0%} win probability)")
+        st.dataframe(data["upsets"], use_container_width=True, hide_index=True)
+    if data["archived_upsets"]:
+        st.caption(f"Plus {data['archived_upsets']} upset win{'s' if data['archived_upsets'] > 1 else ''} "
+                   "among your archived matches.")
+
+SECTION_RENDERERS = {
+    "Performance Over Time": render_performance,
+    "Scoring Analysis": render_scoring,
+    "Opponent Analysis": render_opponents,
+    "Level Progression": render_level,
+    "Win Expectancy": render_expectancy,
+}
+
+
+def show_peer_comparison(user_id):
+    """Percentiles among players at the same level, from the per-level sketches"""
+    level = as_level(getCurrentLevel_safe(user_id))
+    row = get_leaderboard().rows.get(user_id)
+    if level is None or row is None:
+        return
+    peers = get_peer_percentiles()
+    parts = []
+    for metric, value in peer_values(row).items():
+        result = peers.percentile(level, metric, value)
+        if result is not None:
+            parts.append(f"**{ordinal(result[0])}** percentile for {PEER_METRICS[metric]}")
+    if parts:
+        st.caption(f"All-time, compared with other {level_bucket(level):.1f} players: you're in the "
+                   + ", ".join(parts) + ".")
 
 def dashboard_page():
     # Get user
-    supabase = get_supabase()
-    user = supabase.auth.get_user().user
+    user = get_current_user()
 
     # Header
     col1, col2 = st.columns([1, 4])
     with col1:
-        st.image("assets/dashboard.png", width=100)
+        show_image("dashboard", width=100)
     with col2:
         st.title("Performance Dashboard")
+        show_data_as_of(user.id)
     st.divider()
 
     # Load & preprocess
     df = getMatches_safe(user.id)
-    if df.empty:
+    archive = get_match_archive(user.id)
+    if df.empty and not archive.matches:
         st.info("No match data available. Add some matches in the Match Log to see your performance analytics.")
         return
-    df["match_date"] = pd.to_datetime(df["match_date"])
 
-    # Date & type filters (unchanged)
+    # Date & type filters
     current_date = date.today()
-    min_date, max_date = df["match_date"].dt.date.min(), df["match_date"].dt.date.max()
+    min_date = archive.first_month or df["match_date"].dt.date.min()
+    date_range = None
     col1, col2 = st.columns([1,3])
     with col1:
-        period = st.selectbox("Time Period", ["All Time","Last 30 Days","Last 3 Months","Last 6 Months","Last Year","Custom"], index=0)
+        period = st.selectbox("Time Period", analytics.PERIODS, index=0)
     if period == "Custom":
         with col2:
-            start_date, end_date = st.date_input("Select Date Range", value=(min_date, current_date), min_value=min_date, max_value=current_date)
-        df = df[(df["match_date"].dt.date>=start_date)&(df["match_date"].dt.date<=end_date)]
-    else:
-        days = {"Last 30 Days":30, "Last 3 Months":90, "Last 6 Months":180, "Last Year":365}.get(period, None)
-        if days: df = df[df["match_date"].dt.date >= current_date - timedelta(days=days)]
-    match_type = st.radio("Match Type", ["All","Singles","Doubles"], horizontal=True)
-    if match_type!="All":
-        df = df[df["match_type"]==match_type.lower()]
+            date_range = st.date_input("Select Date Range", value=(min_date, current_date), min_value=min_date, max_value=current_date)
+        if len(date_range) != 2:
+            st.info("Select an end date to apply the custom range.")
+            return
+        date_range = tuple(date_range)
+    match_type = st.radio("Match Type", analytics.MATCH_TYPES, horizontal=True, key="dashboard_match_type")
+    df = get_dashboard_matches(user.id, period, match_type, date_range, current_date)
     if df.empty:
         st.warning(f"No {match_type.lower()} matches in the selected period.")
         return
 
-    # Win/loss
-    df["result"] = np.where(df["user_team_score"]>df["opponent_team_score"], "Win", "Loss")
-
     # Summary metrics
     st.header("Performance Summary")
-    total, wins = len(df), (df["result"]=="Win").sum()
-    losses = total-wins
-    win_rate = wins/total*100
+    stats = analytics.summary(df)
     c1,c2,c3,c4 = st.columns(4)
-    c1.metric("Total Matches", total)
-    c2.metric("Wins", wins)
-    c3.metric("Losses", losses)
-    c4.metric("Win Rate", f"{win_rate:.1f}%")
-
-    # Tabs
-    tab1, tab2, tab3, tab4 = st.tabs([
-        "Performance Over Time",
-        "Scoring Analysis",
-        "Opponent Analysis",
-        "Level Progression"
-    ])
-
-    # ─── Tab 1: Performance Over Time ─────────────────────────────────────────
-    with tab1:
-        st.subheader("Wins vs Losses per Month")
-
-        # 1) Prepare month buckets
-        df_time = df.copy()
-        df_time["month"] = df_time["match_date"].dt.to_period("M").dt.to_timestamp()
-
-        # 2) Pivot into wide form
-        monthly_res = (
-            df_time
-            .groupby(["month", "result"])
-            .size()
-            .unstack(fill_value=0)
-            .reset_index()
-        )
-
-        # 3) Create a categorical label
-        monthly_res["month_label"] = monthly_res["month"].dt.strftime("%B %Y")
-
-        # 4) Plot stacked bar with custom colors
-        fig1 = px.bar(
-            monthly_res,
-            x="month_label",
-            y=["Win", "Loss"],
-            barmode="stack",
-            labels={"month_label": "Month", "value": "Count"},
-            title="Wins vs Losses per Month",
-            color_discrete_sequence=["#309bd4", "lightsalmon"]  # Win = light green, Loss = light orange
-        )
-        st.plotly_chart(fig1, use_container_width=True)
-        # optional: keep your monthly total chart if desired
-        st.subheader("Matches per Month")
-
-        # 1) Aggregate by period
-        df_time = df.copy()
-        df_time["month"] = df_time["match_date"].dt.to_period("M").dt.to_timestamp()
-
-        monthly_totals = (
-            df_time
-            .groupby("month")
-            .size()
-            .reset_index(name="matches")
-        )
-
-        # 2) Create a categorical month label
-        monthly_totals["month_label"] = monthly_totals["month"].dt.strftime("%B %Y")
-
-        # 3) Plot using that label
-        fig2 = px.bar(
-            monthly_totals,
-            x="month_label",
-            y="matches",
-            labels={"month_label": "Month", "matches": "Matches"},
-            title="Matches per Month",
-            color_discrete_sequence=["#309bd4"]
-        )
-        st.plotly_chart(fig2, use_container_width=True)
-
-    # ─── Tab 2: Match Analysis ─────────────────────────────────────────────────
-    with tab2:
-        
-        st.subheader("Average Points For vs. Against")
-
-        # 1) Compute the means
-        avg_scores = (
-            df
-            .groupby("match_type")
-            .agg(
-                Your_Score      = ("user_team_score",     "mean"),
-                Opponent_Score  = ("opponent_team_score", "mean"),
-            )
-            .reset_index()
-        )
-
-        # 2) Melt into long form for Plotly
-        avg_long = avg_scores.melt(
-            id_vars="match_type",
-            value_vars=["Your_Score", "Opponent_Score"],
-            var_name="Team",
-            value_name="Average Points"
-        )
-
-        # 3) Bar chart grouped by match type
-        fig = px.bar(
-            avg_long,
-            x="match_type",
-            y="Average Points",
-            color="Team",
-            barmode="group",
-            labels={
-                "match_type":    "Match Type",
-                "Average Points":"Avg Points",
-                "Team":          "Team"
-            },
-            title="Average Points Scored by Match Type"
-        )
-        st.plotly_chart(fig, use_container_width=True)
-
-
-
-    # ─── Tab 3: Opponent Analysis ──────────────────────────────────────────────
-    with tab3:
-        st.subheader("Opponent Level Analysis")
-
-        # Singles: Win rate vs. opponent level
-        df_s = df[df["match_type"] == "singles"].copy()
-        if df_s.empty:
-            st.info("No singles matches to analyze.")
-        else:
-            st.markdown("**Singles**")
-            singles_level = (
-                df_s
-                .groupby("opponent_1_level")
-                .agg(
-                    Wins   = ("result", lambda x: (x == "Win").sum()),
-                    Losses = ("result", lambda x: (x == "Loss").sum()),
-                    Total  = ("result", "count")
-                )
-                .reset_index()
-            )
-            singles_level["Win Rate"] = (singles_level["Wins"] / singles_level["Total"] * 100).round(1)
-            singles_level = singles_level.sort_values("opponent_1_level")
-
-            st.dataframe(
-                singles_level.rename(columns={"opponent_1_level": "Opponent Level"}),
-                use_container_width=True,
-                hide_index=True
-            )
-
-            fig_s = px.bar(
-                singles_level,
-                x="opponent_1_level",
-                y="Win Rate",
-                labels={"opponent_1_level": "Opponent Level", "Win Rate": "Win Rate (%)"},
-                title="Singles Win Rate by Opponent Level",
-                text_auto=True
-            )
-            st.plotly_chart(fig_s, use_container_width=True)
-
-        # Doubles: Win rate vs. average opponent team level
-        df_d = df[df["match_type"] == "doubles"].copy()
-        if df_d.empty:
-            st.info("No doubles matches to analyze.")
-        else:
-            st.markdown("**Doubles**")
-            # Calculate average opponent team level
-            df_d["Opponent Team Level"] = ((df_d["opponent_1_level"] + df_d["opponent_2_level"]) / 2).round(2)
-            doubles_level = (
-                df_d
-                .groupby("Opponent Team Level")
-                .agg(
-                    Wins   = ("result", lambda x: (x == "Win").sum()),
-                    Losses = ("result", lambda x: (x == "Loss").sum()),
-                    Total  = ("result", "count")
-                )
-                .reset_index()
-            )
-            doubles_level["Win Rate"] = (doubles_level["Wins"] / doubles_level["Total"] * 100).round(1)
-            doubles_level = doubles_level.sort_values("Opponent Team Level")
-
-            st.dataframe(
-                doubles_level,
-                use_container_width=True,
-                hide_index=True
-            )
-
-            fig_d = px.bar(
-                doubles_level,
-                x="Opponent Team Level",
-                y="Win Rate",
-                labels={"Opponent Team Level": "Opponent Team Level", "Win Rate": "Win Rate (%)"},
-                title="Doubles Win Rate by Opponent Team Level",
-                text_auto=True
-            )
-            st.plotly_chart(fig_d, use_container_width=True)
-
-
-    # ─── Tab 4: Level Progression ───────────────────────────────────────────────
-    with tab4:
-        st.subheader("Your Current Level")
-        current_level = getCurrentLevel_safe(user.id)
-        if current_level is None:
-            st.info("No level data found.")
-        else:
-            st.metric("Level", f"{current_level:.1f}")
-            # gauge
-            fig = go.Figure(go.Indicator(
-                mode="gauge+number",
-                value=current_level,
-                gauge={"axis":{"range":[1,5.5]}},
-                title={"text":"Player Level"}
-            ))
-            st.plotly_chart(fig, use_container_width=True)
+    c1.metric("Total Matches", stats["total"])
+    c2.metric("Wins", stats["wins"])
+    c3.metric("Losses", stats["losses"])
+    c4.metric("Win Rate", f"{stats['win_rate']:.1f}%")
+    if archive.covers(analytics.period_start(period, date_range, current_date)):
+        st.caption(f":material/inventory_2: Includes your archived matches "
+                   f"(played before {archive.before:%m/%d/%Y}).")
+    show_peer_comparison(user.id)
+
+    # Sections - only the selected one is computed and rendered
+    section = st.radio(
+        "Section",
+        SECTIONS,
+        horizontal=True,
+        key="dashboard_section",
+        label_visibility="collapsed"
+    )
+    cache_key = (user.id, get_data_version(user.id), period, match_type, date_range, current_date)
+    data = build_section(*cache_key, section)
+    SECTION_RENDERERS[section](data, cache_key)
 
 if __name__ == "__main__":
     dashboard_page()
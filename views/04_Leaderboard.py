@@ -0,0 +1,86 @@
+import streamlit as st
+import pandas as pd
+from assets import show_image
+from leaderboard import METRICS, MIN_MATCHES
+from utils import get_current_user, get_leaderboard
+
+TOP_N = 25
+
+
+def format_value(metric, value):
+    if value is None:
+        return "-"
+    if metric in ("rating", "win_rate"):
+        return f"{value * 100:.1f}%"
+    if metric == "level":
+        return f"{value:.1f}"
+    return f"{int(value)}"
+
+
+def leaderboard_page():
+    # Get user
+    user = get_current_user()
+
+    # Header
+    col1, col2 = st.columns([1, 4])
+    with col1:
+        show_image("dashboard", width=100)
+    with col2:
+        st.title("Club Leaderboard")
+    st.divider()
+
+    board = get_leaderboard()
+    if not len(board):
+        st.info("No players on the leaderboard yet.")
+        return
+
+    metric = st.radio(
+        "Rank by",
+        list(METRICS),
+        format_func=METRICS.get,
+        horizontal=True,
+        key="leaderboard_metric"
+    )
+
+    # Your position
+    mine = board.rank(metric, user.id)
+    if mine is None:
+        if metric == "level":
+            st.info("Set your level on the Profile page to be ranked by level.")
+        else:
+            st.info(f"Play at least {MIN_MATCHES} matches to be ranked by {METRICS[metric].lower()}.")
+    else:
+        rank, ranked = mine
+        c1, c2, c3 = st.columns(3)
+        c1.metric("Your Rank", f"#{rank}")
+        c2.metric("Players Ranked", ranked)
+        c3.metric("Top", f"{rank / ranked * 100:.0f}%")
+
+    # Top N
+    top = board.top(metric, TOP_N)
+    if not top:
+        st.info(f"Nobody qualifies for the {METRICS[metric].lower()} ranking yet.")
+        return
+    table = pd.DataFrame([
+        {
+            "Rank": rank,
+            "Player": row["display_name"] + (" (you)" if row["user_id"] == user.id else ""),
+            METRICS[metric]: format_value(metric, value),
+            "Matches": row["matches"],
+            "Record": f"{row['wins']}-{row['matches'] - row['wins']}",
+        }
+        for rank, row, value in top
+    ])
+    st.subheader(f"Top {len(table)} by {METRICS[metric]}")
+    st.dataframe(table, use_container_width=True, hide_index=True)
+
+    if metric == "rating":
+        st.caption(
+            "Rating is the low end of a 95% confidence range for your win rate, so a few "
+            f"lucky wins don't outrank a long record. Ranked after {MIN_MATCHES} matches."
+        )
+    elif metric == "win_rate":
+        st.caption(f"Ranked after {MIN_MATCHES} matches.")
+
+if __name__ == "__main__":
+    leaderboard_page()
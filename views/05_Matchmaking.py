@@ -0,0 +1,130 @@
+import streamlit as st
+import pandas as pd
+import re
+from assets import show_image
+from utils import (
+    get_current_user,
+    getCurrentLevel_safe,
+    get_matchmaker,
+    get_win_model,
+    show_data_as_of
+)
+from matchmaking import split_session
+from win_model import as_level
+
+LEVELS = [2.0, 2.5, 3.0, 3.5, 4.0, 4.5, 5.0, 5.5]
+
+
+def team_label(team):
+    return " & ".join(f"{name} ({level:.1f})" for name, level in team)
+
+
+def suggestions_tab(user_id, matchmaker, user_level):
+    if user_level is None:
+        st.info("Set your level on the Profile page to get matchup suggestions.")
+        return
+    if len(matchmaker.index) < 3:
+        st.info("Log a few more matches with player levels to get suggestions.")
+        return
+    model = get_win_model(user_id)
+
+    st.subheader("Singles")
+    singles = pd.DataFrame([
+        {
+            "Opponent": matchmaker.name(pid),
+            "Level": level,
+            "Last Played": matchmaker.players.at[pid, "last_played"].strftime("%m/%d/%Y"),
+            "Your Win Chance": f"{model.win_probability(user_level - level):.0%}",
+        }
+        for pid, level, _ in matchmaker.singles(user_level)
+    ])
+    st.dataframe(singles, use_container_width=True, hide_index=True,
+                 column_config={"Level": st.column_config.NumberColumn(format="%.1f")})
+
+    st.subheader("Doubles")
+    partner_names = ["Any partner"] + sorted(matchmaker.name(pid) for pid in matchmaker.players.index)
+    partner = st.selectbox("Partner", partner_names, key="mm_partner")
+    partner_id = None if partner == "Any partner" else matchmaker.registry.resolve(partner)
+    rows = []
+    for pid, (opp_1, opp_2), diff in matchmaker.doubles(user_level, partner_id=partner_id):
+        partner_level = matchmaker.level(pid)
+        team_diff = (user_level + partner_level) / 2 - (matchmaker.level(opp_1) + matchmaker.level(opp_2)) / 2
+        rows.append({
+            "Your Team": f"You & {matchmaker.name(pid)} ({partner_level:.1f})",
+            "Opponents": team_label([(matchmaker.name(p), matchmaker.level(p)) for p in (opp_1, opp_2)]),
+            "Level Gap": round(diff, 2),
+            "Your Win Chance": f"{model.win_probability(team_diff, doubles=True):.0%}",
+        })
+    if rows:
+        st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+    else:
+        st.info("Not enough players with known levels for a doubles suggestion.")
+
+
+def parse_guests(text):
+    """'Name, level' per line -> ([(name, level)], [errors])"""
+    guests, errors = [], []
+    for line in filter(None, (l.strip() for l in text.splitlines())):
+        m = re.fullmatch(r"([A-Za-z ]+?)\s*,\s*(\d(?:\.\d+)?)", line)
+        if not m or float(m.group(2)) not in LEVELS:
+            errors.append(f"Couldn't read '{line}' - use 'Name, level' with a level from {LEVELS[0]} to {LEVELS[-1]}.")
+            continue
+        guests.append((m.group(1).strip(), float(m.group(2))))
+    return guests, errors
+
+
+def session_tab(matchmaker, user_level):
+    st.write("Pick who's here (in arrival order) and SmashTrack will split them into evenly matched courts.")
+    known = {matchmaker.name(pid): matchmaker.level(pid) for pid in matchmaker.players.index}
+    picked = st.multiselect("Players", sorted(known), key="mm_session_players")
+    guests_text = st.text_area("Other players (one per line: Name, level)", key="mm_guests",
+                               placeholder="Jordan Smith, 3.5")
+    include_me = user_level is not None and st.checkbox(f"Include me ({user_level:.1f})", value=True, key="mm_include_me")
+    mode = st.radio("Format", ["Doubles", "Singles"], horizontal=True, key="mm_mode")
+
+    if not st.button("Make Courts", type="primary"):
+        return
+    guests, errors = parse_guests(guests_text)
+    for error in errors:
+        st.error(error)
+    players = ([("You", user_level)] if include_me else []) + [(n, known[n]) for n in picked] + guests
+    size = 4 if mode == "Doubles" else 2
+    if len(players) < size:
+        st.warning(f"Need at least {size} players for {mode.lower()}.")
+        return
+
+    session = split_session(players, mode.lower())
+    for court in session["courts"]:
+        with st.container(border=True):
+            st.markdown(f"**Court {court['court']}** - level gap {court['level_diff']:.2f}")
+            c1, c2 = st.columns(2)
+            c1.write(team_label(court["team_a"]))
+            c2.write(team_label(court["team_b"]))
+    if session["sitting_out"]:
+        st.caption("Sitting out this round: " + ", ".join(name for name, _ in session["sitting_out"]))
+
+
+def matchmaking_page():
+    # Get user
+    user = get_current_user()
+
+    # Header
+    col1, col2 = st.columns([1, 4])
+    with col1:
+        show_image("tournament", width=100)
+    with col2:
+        st.title("Matchmaking")
+        show_data_as_of(user.id)
+    st.divider()
+
+    matchmaker = get_matchmaker(user.id)
+    user_level = as_level(getCurrentLevel_safe(user.id))
+
+    tab1, tab2 = st.tabs(["Suggested Matchups", "Open Play Session"])
+    with tab1:
+        suggestions_tab(user.id, matchmaker, user_level)
+    with tab2:
+        session_tab(matchmaker, user_level)
+
+if __name__ == "__main__":
+    matchmaking_page()
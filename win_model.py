@@ -0,0 +1,206 @@
+import numpy as np
+import pandas as pd
+
+
+# Intercept, team-vs-opponent level differential, doubles flag. The global
+# model (fit_global) is fit from every player's matches; it's used as-is for
+# users with little history, and as the prior everyone is shrunk toward. These
+# weights stand in for it until the club has MIN_MATCHES matches with levels.
+FALLBACK_WEIGHTS = np.array([0.0, 2.0, 0.0])
+MIN_MATCHES = 10
+# Columns of the win_model_buckets RPC (migrations/005)
+BUCKET_COLUMNS = ["level_diff", "doubles", "won", "matches"]
+UPSET_THRESHOLD = 0.4
+
+
+def as_level(value):
+    """getCurrentLevel returns a message string when no level is set; map that to None"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _levels(df, col):
+    if col not in df.columns:
+        return np.full(len(df), np.nan)
+    return pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=float)
+
+
+def level_history(levels_df):
+    """A player_levels frame -> ((effective_date, level), ...) oldest first, hashable for comparisons"""
+    if levels_df is None or levels_df.empty:
+        return ()
+    levels = levels_df.dropna(subset=["effective_date", "level"]).sort_values("effective_date", kind="stable")
+    return tuple(zip(pd.to_datetime(levels["effective_date"]), levels["level"].astype(float)))
+
+
+def levels_on(dates, history):
+    """
+    The level in effect on each date, from a level_history(). Dates before the
+    first entry get the first level; with no history, NaN.
+    """
+    if not history:
+        return np.full(len(dates), np.nan)
+    starts = np.array([start.to_datetime64() for start, _ in history], dtype="datetime64[ns]")
+    levels = np.array([level for _, level in history])
+    which = np.searchsorted(starts, pd.to_datetime(dates).to_numpy(dtype="datetime64[ns]"), side="right") - 1
+    return levels[np.clip(which, 0, None)]
+
+
+def user_levels(df, history, current):
+    """
+    The user's level for each match: an archive rollup row's own `user_level`,
+    else the level in effect on the match date, else `current`
+    """
+    levels = levels_on(df["match_date"], history)
+    if "user_level" in df.columns:
+        own = pd.to_numeric(df["user_level"], errors="coerce").to_numpy(dtype=float)
+        levels = np.where(np.isnan(own), levels, own)
+    return np.where(np.isnan(levels), np.nan if current is None else current, levels)
+
+
+def match_features(df, user_level):
+    """
+    Build the design matrix for a frame of matches in one vectorized pass.
+    `user_level` is one level or one per match (see user_levels). Singles
+    compare the user's level with opponent 1; doubles compare team averages.
+    Rows with missing levels get NaN features (see `valid_rows`).
+    """
+    doubles = (df["match_type"] == "doubles").to_numpy()
+    opp1 = _levels(df, "opponent_1_level")
+    opp2 = _levels(df, "opponent_2_level")
+    partner = _levels(df, "player_partner_level")
+
+    team = np.where(doubles, (partner + user_level) / 2, user_level)
+    opponents = np.where(doubles, (opp1 + opp2) / 2, opp1)
+    return np.column_stack([np.ones(len(df)), team - opponents, doubles.astype(float)])
+
+
+def match_outcomes(df):
+    if "won" in df.columns:         # archive rollup rows carry their result
+        return df["won"].to_numpy(dtype=float)
+    return (df["user_team_score"] > df["opponent_team_score"]).to_numpy(dtype=float)
+
+
+def match_weights(df):
+    """Matches per row: 1, or the match count of an archive rollup row"""
+    if "weight" not in df.columns:
+        return np.ones(len(df))
+    return df["weight"].to_numpy(dtype=float)
+
+
+def valid_rows(X):
+    return ~np.isnan(X).any(axis=1)
+
+
+def _sigmoid(z):
+    # 1 / (1 + e^-z) without overflowing e^-z for large negative z
+    return np.exp(-np.logaddexp(0.0, -z))
+
+
+def _fit(X, y, counts, start, prior, l2=1.0, max_iter=25, tol=1e-6):
+    """
+    Weighted logistic regression by Newton's method, with an L2 penalty pulling
+    the weights toward `prior`; each row counts as `counts` matches
+    """
+    w = np.array(start, dtype=float)
+    penalty = l2 * np.eye(len(w))
+    for _ in range(max_iter):
+        p = _sigmoid(X @ w)
+        grad = X.T @ (counts * (p - y)) + l2 * (w - prior)
+        hess = (X * (counts * p * (1 - p))[:, None]).T @ X + penalty
+        step = np.linalg.solve(hess, grad)
+        w -= step
+        if np.abs(step).max() < tol:
+            break
+    return w
+
+
+def fit_global(buckets):
+    """
+    Global weights from every player's matches, counted into buckets of
+    (level_diff, doubles, won, matches): all the features depend on. Gives
+    FALLBACK_WEIGHTS while fewer than MIN_MATCHES matches have levels.
+    """
+    counts = buckets["matches"].to_numpy(dtype=float)
+    if counts.sum() < MIN_MATCHES:
+        return FALLBACK_WEIGHTS
+    X = np.column_stack([
+        np.ones(len(buckets)),
+        buckets["level_diff"].to_numpy(dtype=float),
+        buckets["doubles"].to_numpy(dtype=float),
+    ])
+    y = buckets["won"].to_numpy(dtype=float)
+    return _fit(X, y, counts, FALLBACK_WEIGHTS, FALLBACK_WEIGHTS)
+
+
+class WinModel:
+    """
+    Logistic model of P(win) from level differentials, fit by Newton's method with
+    an L2 penalty pulling the weights toward `prior`, the global model (so small
+    histories stay close to it). Each match is scored with the user's level at
+    the time (`history`); `user_level` is their current one, for new matches.
+    Instances are never mutated after fitting, so a cached model can be shared
+    across sessions.
+    """
+
+    def __init__(self, weights=None, user_level=None, trained_ids=frozenset(), matches=None,
+                 prior=FALLBACK_WEIGHTS, history=()):
+        self.prior = np.asarray(prior, dtype=float)
+        self.weights = self.prior if weights is None else np.asarray(weights, dtype=float)
+        self.user_level = user_level
+        self.history = history
+        self.trained_ids = trained_ids
+        # Archived matches are trained on through their rollups, which have no ids
+        self.matches = len(trained_ids) if matches is None else matches
+
+    @property
+    def is_global(self):
+        return self.matches < MIN_MATCHES
+
+    def predict_proba(self, X):
+        """Win probability for each row of a feature matrix"""
+        return _sigmoid(np.asarray(X, dtype=float) @ self.weights)
+
+    def win_probability(self, level_diff, doubles=False):
+        return float(self.predict_proba([[1.0, level_diff, float(doubles)]])[0])
+
+    def score(self, df):
+        """Expected win probability for every match in `df` (NaN where levels are missing)"""
+        if self.user_level is None or df.empty:
+            return np.full(len(df), np.nan)
+        X = match_features(df, user_levels(df, self.history, self.user_level))
+        ok = valid_rows(X)
+        proba = np.full(len(df), np.nan)
+        proba[ok] = self.predict_proba(X[ok])
+        return proba
+
+    def updated(self, df, user_level, history=(), prior=None, l2=1.0):
+        """
+        Return a model fit to `df`, with the user's current level and level
+        history. When `df` only adds matches to what this model was trained on
+        (the usual case after logging a match), Newton starts from the current
+        weights and converges in a step or two; otherwise it starts from the
+        prior, which is this model's unless a new one is given.
+
+        Archive rollup rows in `df` count as `weight` matches each, which fits
+        the same model as the archived matches themselves would.
+        """
+        prior = self.prior if prior is None else np.asarray(prior, dtype=float)
+        ids = frozenset(df["id"].dropna()) if "id" in df.columns else frozenset()
+        counts = match_weights(df)
+        matches = int(counts.sum())
+        same_inputs = (user_level == self.user_level and history == self.history
+                       and np.array_equal(prior, self.prior))
+        if same_inputs and ids == self.trained_ids and matches == self.matches:
+            return self
+        if user_level is None or matches < MIN_MATCHES:
+            return WinModel(prior, user_level, ids, matches, prior, history)
+
+        X = match_features(df, user_levels(df, history, user_level))
+        y = match_outcomes(df)
+        ok = valid_rows(X)
+        start = self.weights if same_inputs and self.trained_ids <= ids else prior
+        w = _fit(X[ok], y[ok], counts[ok], start, prior, l2)
+        return WinModel(w, user_level, ids, matches, prior, history)
@@ -0,0 +1,118 @@
+import queue
+import threading
+import time
+
+
+class WriteQueue:
+    """
+    Write-behind queue for new rows.
+
+    Items are dicts carrying at least `user_id` and `client_key`. A daemon thread
+    drains the queue in batches and hands each batch to `flush(batch)`; if that
+    raises a retryable error the whole batch is retried with exponential backoff.
+    Because every item carries an idempotency key, retrying a batch that partly
+    reached the server is safe. Batches that still fail are handed to
+    `on_failure(batch, error)` and remembered so the UI can report them.
+    """
+
+    def __init__(self, flush, on_failure=None, retryable=None,
+                 batch_size=50, linger=0.05, max_attempts=5, backoff=0.5):
+        self._flush = flush
+        self._on_failure = on_failure
+        self._retryable = retryable or (lambda error: True)
+        self.batch_size = batch_size
+        self.linger = linger              # seconds to wait for more items before flushing
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self._queue = queue.Queue()
+        self._pending = {}                # client_key -> item, until flushed or failed
+        self._failed = []                 # (item, error)
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._thread = threading.Thread(target=self._run, name="write-queue", daemon=True)
+        self._thread.start()
+
+    def __len__(self):
+        return len(self._pending)
+
+    def submit(self, item):
+        """Queue an item. Returns False if one with the same key is already pending."""
+        with self._lock:
+            if item["client_key"] in self._pending:
+                return False
+            self._pending[item["client_key"]] = item
+        self._queue.put(item)
+        return True
+
+    def pending(self, user_id):
+        """Items for this user that haven't reached the server yet"""
+        with self._lock:
+            return [item for item in self._pending.values() if item["user_id"] == user_id]
+
+    def take_failures(self, user_id):
+        """Pop the (item, error) pairs that failed for this user"""
+        with self._lock:
+            mine = [f for f in self._failed if f[0]["user_id"] == user_id]
+            self._failed = [f for f in self._failed if f[0]["user_id"] != user_id]
+        return mine
+
+    def wait(self, timeout=None):
+        """Block until nothing is pending. Returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._idle:
+            while self._pending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._idle.wait(remaining)
+        return True
+
+    # ─── Worker ──────────────────────────────────────────────────────────────────
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.linger
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _deliver(self, batch):
+        """Flush one batch with retries; returns the final error, or None"""
+        for attempt in range(self.max_attempts):
+            try:
+                self._flush(batch)
+                return None
+            except Exception as e:  # anything from the network layer; classified below
+                if not self._retryable(e) or attempt == self.max_attempts - 1:
+                    return e
+                time.sleep(self.backoff * 2 ** attempt)
+
+    def _settle(self, batch, error):
+        if error is not None and self._on_failure is not None:
+            try:
+                self._on_failure(batch, error)
+            except Exception:
+                pass
+        with self._idle:
+            for item in batch:
+                self._pending.pop(item["client_key"], None)
+                if error is not None:
+                    self._failed.append((item, error))
+            self._idle.notify_all()
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            error = self._deliver(batch)
+            if error is not None and len(batch) > 1 and not self._retryable(error):
+                # One bad row rejects the whole insert; retry the rows one by one
+                for item in batch:
+                    self._settle([item], self._deliver([item]))
+            else:
+                self._settle(batch, error)